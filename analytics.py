@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from seating import seat_allocation
+from timetable import master_timetable
+
+# Supervision hours above which a professor is reported as "Overload"
+MAX_PROFESSOR_HOURS = float(os.environ.get("EXAM_SCHEDULER_MAX_PROF_HOURS", 12))
+# Minutes a room can host exams on one exam day
+DAY_MINUTES = 8 * 60
+
+
+def build_professor_workload(snapshot, max_hours=MAX_PROFESSOR_HOURS):
+    master = master_timetable(snapshot)
+    professors = pd.DataFrame(snapshot.get("professors"), columns=["id", "nom"])
+    by_prof = master.groupby("prof_id")["Duration"].agg(["size", "sum"])
+
+    hours = professors["id"].map(by_prof["sum"]).fillna(0) / 60
+    return pd.DataFrame({
+        "professor": professors["nom"],
+        "exams": professors["id"].map(by_prof["size"]).fillna(0).astype("int64"),
+        "hours": hours.round(2),
+        "status": np.where(hours > max_hours, "Overload", "OK"),
+    })
+
+
+def professor_workload(snapshot, max_hours=MAX_PROFESSOR_HOURS):
+    """Supervised exams and hours per professor, flagged against ``max_hours``."""
+    return snapshot.derived(
+        ("professor_workload", max_hours),
+        lambda snap: build_professor_workload(snap, max_hours),
+    )
+
+
+def build_room_usage(snapshot):
+    master = master_timetable(snapshot)
+    rooms = pd.DataFrame(snapshot.get("rooms"), columns=["id", "nom", "capacite"])
+    # Every room an exam's students were seated in, not only the one it was booked in
+    allocation = seat_allocation(snapshot)
+    by_room = allocation.groupby("salle_id").agg(exams=("exam_id", "size"), minutes=("Duration", "sum"), peak=("Seats", "max"))
+
+    # Share of the session's exam days the room is busy
+    available = max(master["Date"].nunique(), 1) * DAY_MINUTES
+    minutes = rooms["id"].map(by_room["minutes"]).fillna(0)
+    peak = rooms["id"].map(by_room["peak"]).fillna(0)
+    return pd.DataFrame({
+        "room": rooms["nom"],
+        "capacity": rooms["capacite"],
+        "exams": rooms["id"].map(by_room["exams"]).fillna(0).astype("int64"),
+        "usage_rate": (minutes / available * 100).round(1),
+        "peak_demand": peak.astype("int64"),
+        "capacity_check": np.where(peak <= rooms["capacite"], "OK", "Over capacity"),
+    })
+
+
+def room_usage(snapshot):
+    """Usage rate and capacity check per room, computed once per version."""
+    return snapshot.derived("room_usage", build_room_usage)
@@ -18,4 +18,5 @@ Use the **sidebar** to navigate between pages:
 - 👨‍💼 Dean Dashboard
 - 🧑‍💻 Exam Admin
 - 🎓 Head of Department
+- 🧠 Memory Debug
 """)
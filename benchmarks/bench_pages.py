@@ -0,0 +1,237 @@
+"""Headless per-page benchmark against fixed synthetic datasets.
+
+    python benchmarks/bench_pages.py                   # compare with baseline.json
+    python benchmarks/bench_pages.py --update-baseline
+    python benchmarks/bench_pages.py --sizes 1 10 50 --pages 1_Exam_Schedule
+
+Every page runs through streamlit's AppTest on a local stand-in backend.
+For each dataset size it records the cold load (empty cache: fetch, joins
+and indexes included), the warm load of a new session, the median rerun
+latency of representative widget interactions and the peak Python memory
+of a cold load. Any figure worse than the baseline by more than the
+tolerance makes the script exit with status 1.
+
+The baseline records the machine it was measured on (CPU, Python and
+library versions). Timings are only gated on that same machine; elsewhere
+they are printed for information and only memory is compared. A change
+that intentionally adds page work re-records the baseline with
+--update-baseline in the same commit, so the gate keeps guarding the
+figures that follow it.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy  # noqa: E402
+import pandas  # noqa: E402
+import streamlit  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import local_backend  # noqa: E402
+import mock_data  # noqa: E402
+import synthetic_data  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = (1, 10)
+REPEATS = 3
+# Relative slowdown tolerated, and absolute noise floor below which it is ignored
+TOLERANCE = 0.5
+NOISE = {"cold_s": 0.05, "warm_s": 0.02, "rerun_s": 0.02, "peak_mb": 5.0}
+# Figures that only mean something on the machine the baseline was recorded on
+TIMINGS = ("cold_s", "warm_s", "rerun_s")
+
+
+def _pick(widget, index=1):
+    return widget.select_index(min(index, len(widget.options) - 1))
+
+
+# Page -> widget interactions replayed after each warm load
+SCENARIOS = {
+    "app": [],
+    "1_Exam_Schedule": [
+        lambda at: _pick(at.selectbox[0]),
+        lambda at: _pick(at.selectbox[2]),
+        lambda at: at.selectbox(key="schedule_sort").select("Professor"),
+        lambda at: at.selectbox[0].select_index(0),
+    ],
+    "2_Student_View": [
+        lambda at: at.text_input[0].input("sara"),
+        lambda at: _pick(at.selectbox[0], 2),
+        lambda at: at.text_input[0].input(""),
+    ],
+    "3_Professor_View": [
+        lambda at: _pick(at.selectbox[0]),
+        lambda at: _pick(at.selectbox[0], 2),
+    ],
+    "4_Conflicts": [
+        lambda at: at.radio[0].set_value("Professor"),
+        lambda at: at.radio[0].set_value("All"),
+    ],
+    "6_Dean_Dashboard": [
+        lambda at: _pick(at.selectbox[0]),
+        lambda at: at.radio[0].set_value("Approved"),
+    ],
+    "7_Exam_Admin": [
+        lambda at: at.number_input(key="admin_page").set_value(2),
+        lambda at: at.selectbox(key="admin_sort").select("Occupancy"),
+    ],
+    "8_Head_of_Department": [
+        lambda at: _pick(at.sidebar.selectbox[0]),
+        lambda at: at.radio[0].set_value("Validate"),
+    ],
+    "9_Memory_Debug": [],
+}
+
+
+def machine():
+    """What the timings depend on, stored next to them in the baseline."""
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            cpu = next(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    return {
+        "system": platform.system(),
+        "cpu": cpu,
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+    }
+
+
+def page_path(page):
+    return os.path.join(ROOT, "app.py" if page == "app" else os.path.join("pages", f"{page}.py"))
+
+
+def _run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def bench_page(page, url, repeats=REPEATS):
+    path = page_path(page)
+
+    cold, warm, rerun = [], [], []
+    for _ in range(repeats):
+        # Cold: nothing fetched or derived yet
+        mock_data.connect(url, ttl=0)
+        cold.append(_run(AppTest.from_file(path, default_timeout=300)))
+
+    for _ in range(repeats):
+        at = AppTest.from_file(path, default_timeout=300)
+        warm.append(_run(at))
+        for interact in SCENARIOS[page]:
+            interact(at)
+            rerun.append(_run(at))
+
+    mock_data.connect(url, ttl=0)
+    tracemalloc.start()
+    _run(AppTest.from_file(path, default_timeout=300))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "cold_s": round(statistics.median(cold), 4),
+        "warm_s": round(statistics.median(warm), 4),
+        "rerun_s": round(statistics.median(rerun), 4) if rerun else None,
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+
+def run(sizes=SIZES, pages=None, repeats=REPEATS):
+    results = {}
+    for size in sizes:
+        backend = local_backend.Backend(synthetic_data.generate(size, seed=0))
+        server, url = local_backend.serve(backend)
+        try:
+            # Pay the one-off imports before anything is timed
+            bench_page("app", url, repeats=1)
+            for page in pages or SCENARIOS:
+                results.setdefault(str(size), {})[page] = bench_page(page, url, repeats)
+                print(f"scale {size:>4}  {page:22} {results[str(size)][page]}", flush=True)
+        finally:
+            server.shutdown()
+    mock_data.store.stop_refresher()
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE, metrics=tuple(NOISE)):
+    """Human readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for size, pages in results.items():
+        for page, figures in pages.items():
+            reference = baseline.get(size, {}).get(page, {})
+            for metric, value in figures.items():
+                before = reference.get(metric)
+                if metric not in metrics or value is None or before is None:
+                    continue
+                if value > before * (1 + tolerance) and value - before > NOISE[metric]:
+                    regressions.append(f"scale {size} {page} {metric}: {before} -> {value}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=SIZES)
+    parser.add_argument("--pages", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) if size == int(size) else size for size in args.sizes]
+    results = run(sizes, args.pages, args.repeats)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        for size, pages in results.items():
+            baseline.setdefault(size, {}).update(pages)
+        baseline["machine"] = machine()
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline yet, run with --update-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    metrics = tuple(NOISE)
+    if baseline.get("machine") != machine():
+        print(f"baseline recorded on {baseline.get('machine')}")
+        print(f"this machine is      {machine()}")
+        print("timings are not comparable across machines: only memory is checked")
+        metrics = tuple(metric for metric in NOISE if metric not in TIMINGS)
+    regressions = compare(results, baseline, args.tolerance, metrics)
+    for line in regressions:
+        print("REGRESSION", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""Drive many concurrent simulated sessions through the pages of one process.
+
+    python benchmarks/load_test.py --sessions 200 --scale 10
+    python benchmarks/load_test.py --sessions 50 --mix student=1 --latency 0.05
+    python benchmarks/load_test.py --url http://127.0.0.1:8000   # running local_backend.py
+
+Each session is a streamlit AppTest running its scripts on its own thread,
+the way the server runs one script thread per browser tab, against the
+same process-wide data store. Sessions follow a journey (a student looking
+up their timetable, a professor checking their exams, staff going through
+the dashboards), with optional think time between reruns.
+
+Reports rerun latency percentiles per page, throughput, process RSS and
+how many requests reached the backend, per session as well as in total:
+with shared caching the latter should stay flat as sessions are added.
+
+AppTest is meant for one session at a time, so running many at once
+patches a few streamlit internals (see ``share_server_state``). Those
+change between releases: the script refuses to run outside
+``SUPPORTED_STREAMLIT`` rather than measure something else, and the range
+(pinned in requirements.txt too) is moved once the patches have been
+checked against a new release.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit  # noqa: E402
+from packaging.specifiers import SpecifierSet  # noqa: E402
+from packaging.version import Version  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import local_backend  # noqa: E402
+import mock_data  # noqa: E402
+import synthetic_data  # noqa: E402
+from bench_pages import SCENARIOS, page_path  # noqa: E402
+from data_loader import ENDPOINTS  # noqa: E402
+from schema import process_rss  # noqa: E402
+
+
+# Streamlit releases whose internals share_server_state() was checked against
+SUPPORTED_STREAMLIT = SpecifierSet(">=1.65,<1.66")
+
+_components = None
+
+
+def share_server_state():
+    """Make concurrent AppTests share what one streamlit server shares.
+
+    AppTest installs a mock ``Runtime`` singleton for the length of each run
+    and clears it afterwards, so with concurrent sessions one session's
+    clear would pull it from under the others: the last one installed is
+    kept and handed to everyone instead. Scripts are compiled up front into
+    one shared cache and components are discovered once, as the server does,
+    rather than once per session.
+    """
+    global _components
+    if Version(streamlit.__version__) not in SUPPORTED_STREAMLIT:
+        raise RuntimeError(
+            f"load_test.py patches streamlit internals and supports streamlit{SUPPORTED_STREAMLIT}, "
+            f"not {streamlit.__version__}: install a supported release or check the patches "
+            "against this one and update SUPPORTED_STREAMLIT"
+        )
+    # Internals, imported only once the release is known to have them
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = []
+
+    def current(cls):
+        if cls._instance is not None:
+            shared[:] = [cls._instance]
+        return shared[0] if shared else None
+
+    def instance(cls):
+        runtime = current(cls)
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: current(cls) is not None)
+
+    script_cache = ScriptCache()
+    for page in SCENARIOS:
+        script_cache.get_bytecode(page_path(page))
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    _components = BidiComponentManager()
+    _components.discover_and_register_components(start_file_watching=False)
+
+
+def open_page(page):
+    """A new session on ``page``."""
+    at = AppTest.from_file(page_path(page), default_timeout=600)
+    if _components is not None:
+        at._bidi_component_manager = _components
+    return at
+
+
+def _search_student(at, rng):
+    # Students type the start of their own name
+    first_name = rng.choice(synthetic_data.FIRST_NAMES)
+    at.text_input[0].input(first_name[: rng.randint(3, len(first_name))])
+
+
+def _pick_student(at, rng):
+    if at.selectbox:
+        at.selectbox[0].select_index(rng.randrange(len(at.selectbox[0].options)))
+
+
+def _pick_professor(at, rng):
+    at.selectbox[0].select_index(rng.randrange(len(at.selectbox[0].options)))
+
+
+def _scenario(page):
+    return [lambda at, rng, interact=interact: interact(at) for interact in SCENARIOS[page]]
+
+
+# Journey -> (page, interactions) visited in order
+JOURNEYS = {
+    "student": [
+        ("app", []),
+        ("2_Student_View", [_search_student, _pick_student]),
+    ],
+    "professor": [
+        ("3_Professor_View", [_pick_professor]),
+        ("1_Exam_Schedule", _scenario("1_Exam_Schedule")[:2]),
+    ],
+    "staff": [
+        ("1_Exam_Schedule", _scenario("1_Exam_Schedule")),
+        ("4_Conflicts", _scenario("4_Conflicts")),
+        ("6_Dean_Dashboard", _scenario("6_Dean_Dashboard")),
+        ("7_Exam_Admin", _scenario("7_Exam_Admin")),
+        ("8_Head_of_Department", _scenario("8_Head_of_Department")),
+    ],
+}
+# Exam-week publication: mostly students
+MIX = {"student": 0.85, "professor": 0.1, "staff": 0.05}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class RssSampler(threading.Thread):
+    """Peak process RSS, sampled every ``interval`` seconds until stopped."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = process_rss() or 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, process_rss() or 0)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run_session(journey, seed, think, start_gate, delay=0.0):
+    """Replay ``journey``; returns ``[(page, seconds), ...]`` and the error if any."""
+    rng = random.Random(seed)
+    timings = []
+    start_gate.wait()
+    time.sleep(delay)
+    try:
+        for page, interactions in JOURNEYS[journey]:
+            at = open_page(page)
+            for step in [None] + interactions:
+                if step is not None:
+                    step(at, rng)
+                if think:
+                    time.sleep(rng.uniform(0, think))
+                start = time.perf_counter()
+                at.run()
+                timings.append((page, time.perf_counter() - start))
+                if at.exception:
+                    raise RuntimeError(at.exception[0].message)
+    except Exception as exc:
+        return timings, RuntimeError(f"{journey} journey, {page}: {exc!r}")
+    return timings, None
+
+
+def backend_stats(url, backend=None):
+    if backend is not None:
+        return backend.stats()
+    with urllib.request.urlopen(url + "/_stats", timeout=10) as response:
+        return json.load(response)
+
+
+def load_test(url, sessions, mix=MIX, think=0.0, ramp=0.0, seed=0, backend=None, cold=True):
+    """Run ``sessions`` concurrent sessions against ``url`` and summarize them.
+
+    Sessions all start at once, or spread uniformly over ``ramp`` seconds.
+    """
+    rng = random.Random(seed)
+    journeys = rng.choices(list(mix), weights=list(mix.values()), k=sessions)
+    delays = sorted(rng.uniform(0, ramp) for _ in range(sessions))
+
+    share_server_state()
+    mock_data.connect(url, ttl=0)
+    # Pay streamlit's one-off imports before anything is timed
+    open_page("app").run()
+    if not cold:
+        # Every session finds the data and derived frames already built
+        _, error = run_session("staff", seed, 0, _open_gate())
+        if error is not None:
+            raise error
+    requests_before = backend_stats(url, backend)
+    rss_before = process_rss() or 0
+
+    sampler = RssSampler()
+    sampler.start()
+    gate = threading.Event()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+        futures = [
+            pool.submit(run_session, journey, seed + i, think, gate, delays[i]) for i, journey in enumerate(journeys)
+        ]
+        start = time.perf_counter()
+        gate.set()
+        results = [future.result() for future in futures]
+        wall = time.perf_counter() - start
+    sampler.stop()
+
+    requests_after = backend_stats(url, backend)
+    routes = set(ENDPOINTS.values())
+    backend_requests = sum(
+        count - requests_before.get(route, 0) for route, count in requests_after.items() if route in routes
+    )
+
+    by_page = {}
+    for timings, _ in results:
+        for page, seconds in timings:
+            by_page.setdefault(page, []).append(seconds)
+    latencies = [seconds for values in by_page.values() for seconds in values]
+    errors = [str(exc) for _, exc in results if exc is not None]
+
+    def summary(values):
+        return {
+            "reruns": len(values),
+            "p50_ms": round(1000 * percentile(values, 50), 1),
+            "p95_ms": round(1000 * percentile(values, 95), 1),
+            "p99_ms": round(1000 * percentile(values, 99), 1),
+            "mean_ms": round(1000 * statistics.fmean(values), 1),
+        }
+
+    return {
+        "sessions": sessions,
+        "journeys": {name: journeys.count(name) for name in mix},
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "latency": summary(latencies) if latencies else None,
+        "pages": {page: summary(values) for page, values in sorted(by_page.items())},
+        "rss_before_mb": round(rss_before / 1e6, 1),
+        "rss_peak_mb": round(sampler.peak / 1e6, 1),
+        "rss_per_session_kb": round((sampler.peak - rss_before) / 1e3 / sessions, 1),
+        "backend_requests": backend_requests,
+        "backend_requests_per_session": round(backend_requests / sessions, 3),
+        "errors": errors,
+    }
+
+
+def _open_gate():
+    gate = threading.Event()
+    gate.set()
+    return gate
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"unknown journey {name!r}, choose from {', '.join(JOURNEYS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def print_report(report):
+    print(f"{report['sessions']} sessions {report['journeys']} in {report['wall_s']}s, "
+          f"{report['throughput_rps']} reruns/s")
+    print(f"{'page':24} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for page, row in list(report["pages"].items()) + [("all", report["latency"])]:
+        if row:
+            print(f"{page:24} {row['reruns']:>7} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"RSS {report['rss_before_mb']} MB -> peak {report['rss_peak_mb']} MB "
+          f"({report['rss_per_session_kb']} kB per session)")
+    print(f"backend requests: {report['backend_requests']} "
+          f"({report['backend_requests_per_session']} per session)")
+    for error in report["errors"][:5]:
+        print("ERROR", error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--mix", type=parse_mix, default=MIX, help="e.g. student=0.8,professor=0.1,staff=0.1")
+    parser.add_argument("--think", type=float, default=0.0, help="max random seconds between reruns")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which session starts are spread")
+    parser.add_argument("--warm", action="store_true", help="build the shared caches before the sessions start")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="backend to use instead of an in-process local_backend")
+    parser.add_argument("--scale", type=float, default=1.0, help="synthetic dataset size for the local backend")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every local backend request")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    backend = server = None
+    url = args.url
+    if url is None:
+        backend = local_backend.Backend(synthetic_data.generate(args.scale, args.seed), latency=args.latency)
+        server, url = local_backend.serve(backend)
+    try:
+        report = load_test(url, args.sessions, args.mix, args.think, args.ramp, args.seed, backend, cold=not args.warm)
+    finally:
+        mock_data.store.stop_refresher()
+        if server is not None:
+            server.shutdown()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
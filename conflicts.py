@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from timetable import master_timetable
+
+# Conflict type -> (id column grouping the exams, column naming the group)
+GROUPINGS = {
+    "Formation": ("formation_id", "Formation"),
+    "Professor": ("prof_id", "Professor"),
+    "Room": ("salle_id", "Room"),
+}
+
+COLUMNS = [
+    "Type", "Resource", "exam_id", "Module", "Start", "End",
+    "other_exam_id", "Other Module", "Overlap (min)", "Department", "dept_id",
+]
+
+
+def _minutes(values):
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+def sweep(group, start, end):
+    """Overlapping intervals inside each group, in one sort-and-sweep pass.
+
+    ``group``, ``start`` and ``end`` are int64 arrays (times in minutes).
+    Intervals are sorted by (group, start) and each one is compared with
+    the latest end seen so far in its group. Returns the positions of every
+    interval that overlaps an earlier one, the position of that earlier
+    interval, and the overlap length.
+    """
+    n = len(group)
+    empty = np.empty(0, dtype=np.int64)
+    if n < 2:
+        return empty, empty, empty
+
+    order = np.lexsort((start, group))
+    g, s, e = group[order], start[order], end[order]
+    first = np.empty(n, dtype=bool)
+    first[0] = True
+    first[1:] = g[1:] != g[:-1]
+
+    # Lift each group into its own band of values so a single running
+    # maximum never carries an end time over from the previous group.
+    band = np.cumsum(first) - 1
+    base = min(s.min(), e.min())
+    span = e.max() - base + 1
+    lifted = (e - base) + band * span
+    running = np.maximum.accumulate(lifted)
+    latest_end = running - band * span + base
+    # Position of the interval that set the running maximum
+    holder = np.maximum.accumulate(np.where(lifted == running, np.arange(n), 0))
+
+    hit = np.flatnonzero(~first[1:] & (s[1:] < latest_end[:-1])) + 1
+    other = holder[hit - 1]
+    overlap = np.minimum(e[hit], latest_end[hit - 1]) - s[hit]
+    return order[hit], order[other], overlap
+
+
+def find_conflicts(timetable, kinds=tuple(GROUPINGS)):
+    """Every formation, professor and room double booking in ``timetable``.
+
+    Two exams conflict when their [start, start + duration) intervals
+    overlap. Each conflicting exam is reported once per grouping, paired
+    with the earlier exam it collides with.
+    """
+    start = _minutes(timetable["Start"].to_numpy())
+    end = _minutes(timetable["End"].to_numpy())
+
+    tables = []
+    for kind in kinds:
+        key, label = GROUPINGS[kind]
+        keys = timetable[key].to_numpy(dtype="float64")
+        valid = np.flatnonzero(~np.isnan(keys))
+        hit, other, overlap = sweep(keys[valid].astype(np.int64), start[valid], end[valid])
+        hit, other = valid[hit], valid[other]
+        rows = timetable.iloc[hit]
+        tables.append(pd.DataFrame({
+            "Type": kind,
+            "Resource": rows[label].to_numpy(),
+            "exam_id": rows["exam_id"].to_numpy(),
+            "Module": rows["Module"].to_numpy(),
+            "Start": rows["Start"].to_numpy(),
+            "End": rows["End"].to_numpy(),
+            "other_exam_id": timetable["exam_id"].to_numpy()[other],
+            "Other Module": timetable["Module"].to_numpy()[other],
+            "Overlap (min)": overlap,
+            "Department": rows["Department"].to_numpy(),
+            "dept_id": rows["dept_id"].to_numpy(),
+        }, columns=COLUMNS))
+
+    return pd.concat(tables, ignore_index=True).sort_values(["Start", "Type"], kind="stable").reset_index(drop=True)
+
+
+def patch_conflicts(previous, snapshot, delta):
+    """``previous`` swept again only in the formations, professors and rooms
+    that changed exams belong or belonged to.
+
+    Rows pairing a changed exam with an unchanged one point at the groups
+    the changed exam left; the groups it joined come from the new timetable.
+    """
+    if delta.collections != {"exam_schedule"}:
+        return None
+    master = master_timetable(snapshot)
+    changed = list(delta.ids("exam_schedule"))
+    involved = previous["exam_id"].isin(changed) | previous["other_exam_id"].isin(changed)
+    moved = master["exam_id"].isin(changed)
+
+    tables = []
+    for kind, (key, _) in GROUPINGS.items():
+        group_of = pd.Series(master[key].to_numpy(), index=master["exam_id"].to_numpy())
+        rows = previous[previous["Type"] == kind]
+        hit = involved[rows.index]
+        partners = np.concatenate([rows.loc[hit, "exam_id"].to_numpy(), rows.loc[hit, "other_exam_id"].to_numpy()])
+        groups = set(group_of.reindex(partners).dropna()) | set(master.loc[moved, key].dropna())
+        tables.append(rows[~hit & ~rows["exam_id"].map(group_of).isin(groups)])
+        tables.append(find_conflicts(master[master[key].isin(groups)], [kind]))
+
+    return pd.concat(tables, ignore_index=True).sort_values(["Start", "Type"], kind="stable").reset_index(drop=True)
+
+
+def exam_conflicts(snapshot):
+    """The conflict table of ``snapshot``, computed once per version."""
+    return snapshot.derived("exam_conflicts", lambda snap: find_conflicts(master_timetable(snap)), patch_conflicts)
+
+
+def department_conflicts(snapshot, department):
+    """The conflict table rows of one department (by name), kept per version."""
+    def build(snap):
+        conflicts = exam_conflicts(snap)
+        return conflicts[conflicts["Department"] == department]
+    return snapshot.derived(("department_conflicts", department), build)
+
+
+def conflicts_per_department(snapshot):
+    """``department`` / ``conflicts`` counts, every department included."""
+    def build(snap):
+        departments = pd.DataFrame(snap.get("departments"), columns=["id", "nom"])
+        counts = exam_conflicts(snap).groupby("dept_id").size()
+        return pd.DataFrame({
+            "department": departments["nom"],
+            "conflicts": departments["id"].map(counts).fillna(0).astype("int64"),
+        })
+    return snapshot.derived("conflicts_per_department", build)
@@ -0,0 +1,191 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from conflicts import exam_conflicts
+from filter_index import ALL
+from seating import exam_seating
+from timetable import formation_sizes, master_timetable
+
+# Dimension -> master timetable column holding its key
+DIMENSIONS = {
+    "Department": "dept_id",
+    "Date": "Date",
+    "Room": "salle_id",
+    "Formation": "formation_id",
+}
+
+# Measure -> how cells are combined when rolled up
+MEASURES = {
+    "exams": "sum",
+    # Students sitting the exams (formation size per exam)
+    "seats": "sum",
+    # Seats offered by the rooms the students were allocated
+    "capacity": "sum",
+    # Room minutes booked
+    "minutes": "sum",
+    # Supervision hours (exams with a professor)
+    "prof_hours": "sum",
+    # Conflict rows reported against the exams, all types / formation overlaps only
+    "conflicts": "sum",
+    "formation_conflicts": "sum",
+    # Largest formation sitting one exam
+    "peak_seats": "max",
+}
+COUNTS = ("exams", "seats", "capacity", "minutes", "conflicts", "formation_conflicts", "peak_seats")
+
+
+class Cube:
+    """Timetable measures aggregated over department × date × room × formation.
+
+    Only non-empty cells are stored: four arrays of member codes (-1 when an
+    exam has no room) and one array per measure, a few thousand entries
+    whatever the size of the timetable. A roll-up is one ``bincount`` of the
+    selected cells, so dashboards never go back to the timetable when a
+    filter changes; roll-ups are also kept per (dimension, slice).
+
+    ``members`` maps each dimension to its ``(key, label)`` pairs in display
+    order; members without exams still show up, with zero measures.
+
+    Distinct modules do not add up across cells, so the cube also keeps the
+    (cell, module) pairs and counts the modules of a slice from those.
+    """
+
+    def __init__(self, master, sizes, conflicts, seating, members):
+        self.members = members
+        self.labels = {dim: [label for _, label in pairs] for dim, pairs in members.items()}
+        self._codes_by_label = {
+            dim: {label: code for code, label in reversed(list(enumerate(labels)))}
+            for dim, labels in self.labels.items()
+        }
+
+        exam_codes = {
+            dim: pd.Index([key for key, _ in members[dim]]).get_indexer(master[column])
+            for dim, column in DIMENSIONS.items()
+        }
+        counts = conflicts.groupby("exam_id").size()
+        formation_counts = conflicts[conflicts["Type"] == "Formation"].groupby("exam_id").size()
+        seats = master["formation_id"].map(sizes).fillna(0).to_numpy(dtype="float64")
+        values = {
+            "exams": np.ones(len(master)),
+            "seats": seats,
+            "capacity": master["exam_id"].map(seating["Seat_Capacity"]).fillna(0).to_numpy(dtype="float64"),
+            "minutes": master["Duration"].to_numpy(dtype="float64"),
+            "prof_hours": np.where(master["prof_id"].notna(), master["Duration"].to_numpy(dtype="float64") / 60, 0.0),
+            "conflicts": master["exam_id"].map(counts).fillna(0).to_numpy(dtype="float64"),
+            "formation_conflicts": master["exam_id"].map(formation_counts).fillna(0).to_numpy(dtype="float64"),
+            "peak_seats": seats,
+        }
+
+        # One integer per exam naming its cell (codes shifted so -1 fits)
+        cell = np.zeros(len(master), dtype=np.int64)
+        for dim, code in exam_codes.items():
+            cell = cell * (len(members[dim]) + 1) + (code + 1)
+        cells, inverse = np.unique(cell, return_inverse=True)
+        self.codes = {}
+        for dim in reversed(DIMENSIONS):
+            size = len(members[dim]) + 1
+            self.codes[dim] = cells % size - 1
+            cells = cells // size
+        self.measures = {}
+        for measure, how in MEASURES.items():
+            if how == "max":
+                combined = np.zeros(len(self.codes["Date"]))
+                np.maximum.at(combined, inverse, values[measure])
+            else:
+                combined = np.bincount(inverse, weights=values[measure], minlength=len(self.codes["Date"]))
+            self.measures[measure] = combined
+
+        module_codes, modules = pd.factorize(master["module_id"])
+        pairs = np.unique(inverse * (len(modules) + 1) + (module_codes + 1))
+        self._module_cell = pairs // (len(modules) + 1)
+        self._module_code = pairs % (len(modules) + 1) - 1
+
+        self._rollups = {}
+        self._modules = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.codes["Date"])
+
+    def _mask(self, criteria):
+        """Cells matching every criterion (a label per dimension), or None when nothing is sliced."""
+        mask = None
+        for dim, label in criteria.items():
+            if label is None or label == ALL:
+                continue
+            code = self._codes_by_label[dim].get(label, -2)
+            match = self.codes[dim] == code
+            mask = match if mask is None else mask & match
+        return mask
+
+    def _slice(self, criteria):
+        return tuple(sorted((dim, label) for dim, label in criteria.items() if label is not None and label != ALL))
+
+    def rollup(self, by, **criteria):
+        """Measures per member of ``by`` over the cells matching ``criteria``.
+
+        ``cube.rollup("Room", Department="Informatique")`` gives one row per
+        room, indexed by its label, for that department's exams only.
+        """
+        key = (by, self._slice(criteria))
+        frame = self._rollups.get(key)
+        if frame is not None:
+            return frame
+        mask = self._mask(criteria)
+        codes = self.codes[by] if mask is None else self.codes[by][mask]
+        keep = codes >= 0
+        codes, size = codes[keep], len(self.labels[by])
+        data = {}
+        for measure, how in MEASURES.items():
+            values = self.measures[measure] if mask is None else self.measures[measure][mask]
+            if how == "max":
+                combined = np.zeros(size)
+                np.maximum.at(combined, codes, values[keep])
+            else:
+                combined = np.bincount(codes, weights=values[keep], minlength=size)
+            data[measure] = combined.astype("int64") if measure in COUNTS else combined.round(2)
+        frame = pd.DataFrame(data, index=pd.Index(self.labels[by], name=by))
+        with self._lock:
+            self._rollups[key] = frame
+        return frame
+
+    def modules(self, **criteria):
+        """Number of distinct modules examined in the cells matching ``criteria``; kept per slice."""
+        key = self._slice(criteria)
+        count = self._modules.get(key)
+        if count is not None:
+            return count
+        mask = self._mask(criteria)
+        codes = self._module_code if mask is None else self._module_code[mask[self._module_cell]]
+        count = len(np.unique(codes[codes >= 0]))
+        with self._lock:
+            self._modules[key] = count
+        return count
+
+    def total(self, **criteria):
+        """``{measure: value}`` over the cells matching ``criteria``."""
+        mask = self._mask(criteria)
+        totals = {}
+        for measure, how in MEASURES.items():
+            values = self.measures[measure] if mask is None else self.measures[measure][mask]
+            combined = values.max(initial=0) if how == "max" else values.sum()
+            totals[measure] = int(combined) if measure in COUNTS else round(float(combined), 2)
+        return totals
+
+
+def build_cube(snapshot):
+    master = master_timetable(snapshot)
+    members = {
+        "Department": [(d["id"], d["nom"]) for d in snapshot.get("departments")],
+        "Date": [(date, date) for date in sorted(master["Date"].dropna().unique())],
+        "Room": [(r["id"], r["nom"]) for r in snapshot.get("rooms")],
+        "Formation": [(f["id"], f["nom"]) for f in snapshot.get("formations")],
+    }
+    return Cube(master, formation_sizes(snapshot), exam_conflicts(snapshot), exam_seating(snapshot), members)
+
+
+def exam_cube(snapshot):
+    """The aggregate cube of ``snapshot``'s timetable, built once per version."""
+    return snapshot.derived("exam_cube", build_cube)
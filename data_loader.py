@@ -0,0 +1,263 @@
+import json
+import logging
+import re
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import timings
+
+logger = logging.getLogger(__name__)
+
+# ---------------- ENDPOINTS ----------------
+DEFAULT_URL = "https://exam-scheduler-v7yx.onrender.com"
+
+# Name exposed by mock_data -> backend route
+ENDPOINTS = {
+    "departments": "/departments",
+    "formations": "/formations",
+    "modules": "/modules",
+    "students": "/etudiants",
+    "rooms": "/lieu_examen",
+    "professors": "/professeurs",
+    "exam_schedule": "/examens",
+    "rooms_usage": "/analytics/room_usage",
+    "department_conflicts": "/analytics/department_conflicts",
+    "professor_workload": "/analytics/professor_workload",
+}
+
+# Change feed: GET /changes?since=<version> lists the inserts, updates and
+# deletes made after that version (served by local_backend.py)
+CHANGES = "/changes"
+
+# Collections streamed straight into typed columns (a DataFrame) instead of
+# being decoded into one Python dict per row: column -> "int" or "str".
+# Missing ints are stored as -1.
+COLUMNAR = {
+    "students": {"id": "int", "nom": "str", "formation_id": "int"},
+}
+
+# ---------------- SETTINGS ----------------
+# (connect, read) in seconds. The read timeout is generous because a
+# sleeping Render instance needs a while to answer its first request.
+TIMEOUT = (5, 60)
+RETRIES = 3
+BACKOFF = 0.5
+CHUNK_SIZE = 1 << 16
+
+
+@dataclass
+class FetchResult:
+    data: dict = field(default_factory=dict)
+    latencies: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    # ETag / Last-Modified sent back with each downloaded collection
+    validators: dict = field(default_factory=dict)
+    # Collections the backend answered with 304 Not Modified (absent from data)
+    not_modified: set = field(default_factory=set)
+    # Collections served from the local disk cache without a request
+    from_cache: set = field(default_factory=set)
+    # Change-feed version the downloaded data is at least as new as
+    sync_version: int = None
+
+    @property
+    def wall_time(self):
+        # Collections are fetched in parallel, so the slowest one is the cost
+        return max(self.latencies.values(), default=0.0)
+
+
+def make_session(pool_size=len(ENDPOINTS), retries=RETRIES):
+    """One keep-alive session shared by every fetch, with bounded retries."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# ---------------- STREAMING DECODE ----------------
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(chunks):
+    """Yield the items of a JSON array arriving as an iterable of text chunks.
+
+    Only the item being decoded and the unread tail of the current chunk
+    are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, opened = "", 0, False
+    for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if not opened:
+                if char != "[":
+                    raise ValueError("expected a JSON array")
+                opened, pos = True, pos + 1
+            elif char == ",":
+                pos += 1
+            elif char == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The item continues in the next chunk
+                    break
+                after = _WHITESPACE.match(buffer, end).end()
+                if after == len(buffer) or buffer[after] not in ",]":
+                    # A number cut by the chunk boundary decodes too ("12" of
+                    # "12345", "-0.5" of "-0.5e10"); every item is followed by
+                    # "," or "]", so wait until that has arrived
+                    break
+                pos = end
+                yield item
+    raise ValueError("truncated JSON array")
+
+
+def read_columns(items, schema):
+    """Pack decoded items into a DataFrame with one typed buffer per column.
+
+    Ints go to ``array`` buffers wrapped without copying by NumPy, strings
+    are interned so repeated values share one object.
+    """
+    buffers = {column: array("i") if kind == "int" else [] for column, kind in schema.items()}
+    interned = {}
+    for item in items:
+        for column, kind in schema.items():
+            value = item.get(column)
+            if kind == "int":
+                buffers[column].append(-1 if value is None else value)
+            else:
+                buffers[column].append(interned.setdefault(value, value))
+
+    columns = {}
+    for column, buffer in buffers.items():
+        if isinstance(buffer, array):
+            columns[column] = np.frombuffer(buffer, dtype=f"i{buffer.itemsize}")
+        else:
+            columns[column] = np.array(buffer, dtype=object)
+    return pd.DataFrame(columns, copy=False)
+
+
+def fetch(session, base_url, name, timeout=TIMEOUT, validators=None):
+    """GET one collection; returns ``(data, validators, seconds)``.
+
+    ``data`` is the decoded JSON, or a DataFrame for ``COLUMNAR`` collections.
+
+    When ``validators`` from a previous download are given the request is
+    conditional, and ``data`` is None if the backend answers 304.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    start = time.perf_counter()
+    streamed = name in COLUMNAR
+    with timings.span("fetch", name):
+        response = session.get(base_url + ENDPOINTS[name], headers=headers, timeout=timeout, stream=streamed)
+    if response.status_code == 304:
+        response.close()
+        return None, validators, time.perf_counter() - start
+    response.raise_for_status()
+    # Streamed bodies are still arriving while they are decoded
+    with timings.span("decode", name) as span:
+        if streamed:
+            response.encoding = response.encoding or "utf-8"
+            with response:
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE, decode_unicode=True)
+                data = read_columns(iter_json_array(chunks), COLUMNAR[name])
+        else:
+            data = response.json()
+        span.rows = len(data)
+    new_validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return data, new_validators, time.perf_counter() - start
+
+
+def fetch_all(base_url, names=None, session=None, timeout=TIMEOUT, validators=None):
+    """Fetch several collections concurrently and return them with their latency.
+
+    ``validators`` maps collection names to the ETag / Last-Modified of a
+    copy the caller already holds; those collections are revalidated with a
+    conditional GET and listed in ``not_modified`` when unchanged.
+
+    Raises the first error encountered once every request has finished, so a
+    partially loaded result is never handed out.
+    """
+    names = list(ENDPOINTS) if names is None else list(names)
+    session = session or make_session()
+    validators = validators or {}
+    result = FetchResult()
+
+    if not names:
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = {
+            name: pool.submit(timings.bind(fetch), session, base_url, name, timeout, validators.get(name))
+            for name in names
+        }
+        for name, future in futures.items():
+            try:
+                data, result.validators[name], result.latencies[name] = future.result()
+            except Exception as exc:
+                result.errors[name] = exc
+                continue
+            if data is None:
+                result.not_modified.add(name)
+            else:
+                result.data[name] = data
+
+    for name, seconds in sorted(result.latencies.items(), key=lambda item: -item[1]):
+        logger.info("fetched %s (%s) in %.3fs", name, ENDPOINTS[name], seconds)
+
+    if result.errors:
+        name, exc = next(iter(result.errors.items()))
+        logger.error("failed to fetch %s (%s): %s", name, ENDPOINTS[name], exc)
+        raise exc
+
+    return result
+
+
+def fetch_changes(session, base_url, since=None, timeout=TIMEOUT):
+    """Ask the change feed what changed after version ``since``.
+
+    Returns ``(version, changes)``: the feed's current version and its
+    changes in order, or None for the changes when ``since`` is too old to
+    be replayed (410 Gone). Without ``since`` only the version is asked
+    for. Raises ``requests.HTTPError`` when the backend has no feed (404).
+    """
+    params = {} if since is None else {"since": since}
+    with timings.span("fetch", "changes"):
+        response = session.get(base_url + CHANGES, params=params, timeout=timeout)
+    if response.status_code == 410:
+        return response.json().get("version"), None
+    response.raise_for_status()
+    with timings.span("decode", "changes") as span:
+        payload = response.json()
+        span.rows = len(payload["changes"])
+    return payload["version"], payload["changes"]
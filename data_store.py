@@ -0,0 +1,384 @@
+import logging
+import threading
+import time
+from functools import partial
+
+import pandas as pd
+import requests
+
+import delta_sync
+import timings
+from data_loader import COLUMNAR, ENDPOINTS, FetchResult, fetch_all, fetch_changes, make_session
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a snapshot is considered stale and rebuilt in the background
+DEFAULT_TTL = 300
+# Seconds to wait before trying again after a failed refresh
+RETRY_DELAY = 30
+
+# Collections read by the derived values being built on this thread
+_building = threading.local()
+
+
+def _same(a, b):
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        return isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame) and a.equals(b)
+    return a == b
+
+
+class Snapshot:
+    """One consistent version of the backend collections.
+
+    Collections are fetched lazily, the first time they are asked for, and
+    are never modified afterwards. Anything computed from them (joined
+    frames, indexes, ...) is memoized on the snapshot with ``derived`` so it
+    is built once per version and shared by every session.
+
+    A snapshot can also be derived from the previous one and a change-feed
+    ``Delta`` (see ``apply``), in which case only what the delta touches is
+    patched or rebuilt.
+    """
+
+    def __init__(self, version, loader, delta=None):
+        self.version = version
+        self.created_at = time.time()
+        self.latencies = {}
+        # Collections the backend confirmed unchanged while building this version
+        self.not_modified = set()
+        # Set when some collection came from the disk cache and still needs revalidating
+        self.stale = False
+        # Change-feed version the collections are at least as new as
+        self.sync_version = None
+        # Changes from the previous snapshot, when patched from it
+        self.delta = delta
+        self._loader = loader
+        self._data = {}
+        self._derived = {}
+        # Derived key -> collections it was built from
+        self._depends = {}
+        # Derived key -> (value, depends) of the previous version, patched on first use
+        self._patchable = {}
+        self._lock = threading.Lock()
+        self._locks = {name: threading.Lock() for name in ENDPOINTS}
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+    def loaded(self):
+        return sorted(self._data)
+
+    def get(self, name):
+        for depends in getattr(_building, "stack", ()):
+            depends.add(name)
+        if name not in self._data:
+            self.prefetch([name])
+        return self._data[name]
+
+    def prefetch(self, names):
+        """Fetch every missing collection in ``names`` in one concurrent batch."""
+        for name in names:
+            if name not in ENDPOINTS:
+                raise KeyError(f"unknown collection {name!r}")
+
+        # Locks are always taken in the same order so two batches never deadlock
+        missing = sorted({name for name in names if name not in self._data})
+        locks = [self._locks[name] for name in missing]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # Another caller may have filled some of them while we waited
+            missing = [name for name in missing if name not in self._data]
+            if missing:
+                result = self._loader(missing)
+                self.latencies.update(result.latencies)
+                self.not_modified.update(result.not_modified)
+                self.stale = self.stale or bool(result.from_cache)
+                if self.sync_version is None:
+                    self.sync_version = result.sync_version
+                self._data.update(result.data)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def derived_items(self):
+        """``(key, value)`` of everything derived so far."""
+        return list(self._derived.items())
+
+    def seed(self, key, value):
+        """Use ``value`` as the derived value ``key`` instead of building it here."""
+        self._depends[key] = frozenset()
+        self._derived[key] = value
+
+    def derived(self, key, build, patch=None):
+        """Return ``build(self)``, computing it at most once for this snapshot.
+
+        The collections read while building are recorded, so a snapshot
+        patched from a delta can keep every value the delta did not touch.
+        For the others, ``patch(previous_value, self, delta)`` is tried
+        first when given; it returns None to fall back to ``build``.
+        """
+        try:
+            value = self._derived[key]
+        except KeyError:
+            with self._lock:
+                lock = self._locks.setdefault(("derived", key), threading.Lock())
+            with lock:
+                if key not in self._derived:
+                    self._build(key, build, patch)
+            value = self._derived[key]
+        # Whatever is building on top of this value depends on the same collections
+        for depends in getattr(_building, "stack", ()):
+            depends.update(self._depends.get(key, ()))
+        return value
+
+    def _build(self, key, build, patch):
+        stack = _building.__dict__.setdefault("stack", [])
+        depends = set()
+        stack.append(depends)
+        try:
+            with timings.span("join", str(key)) as span:
+                value = None
+                previous, previous_depends = self._patchable.pop(key, (None, ()))
+                if patch is not None and previous is not None:
+                    value = patch(previous, self, self.delta)
+                    depends.update(previous_depends)
+                if value is None:
+                    value = build(self)
+                span.rows = len(value) if hasattr(value, "__len__") else None
+        finally:
+            stack.pop()
+        self._depends[key] = frozenset(depends)
+        self._derived[key] = value
+
+    def apply(self, delta, version, loader):
+        """The next snapshot: these collections patched with ``delta``.
+
+        Derived values built only from collections the delta leaves alone
+        are carried over as they are; the others are patched (or rebuilt)
+        the first time they are asked for.
+        """
+        snapshot = Snapshot(version, loader, delta=delta)
+        snapshot._data = dict(self._data)
+        snapshot._data.update(delta_sync.apply(self._data, delta))
+        snapshot.latencies = dict(self.latencies)
+        snapshot.sync_version = delta.version
+        touched = delta.collections
+        for key, value in self.derived_items():
+            depends = self._depends.get(key)
+            if depends is None:
+                # Still being built
+                continue
+            if depends & touched:
+                snapshot._patchable[key] = (value, depends)
+            else:
+                snapshot._derived[key] = value
+                snapshot._depends[key] = depends
+        return snapshot
+
+
+class DataStore:
+    """Process-wide holder of the current snapshot.
+
+    Readers always get the last good snapshot without waiting. A refresh
+    builds the next version off to the side (re-fetching only the
+    collections pages have actually used) and swaps it in with a single
+    assignment. Concurrent refresh requests share one in-flight fetch, and
+    a failed refresh leaves the previous snapshot in place.
+
+    With a ``DiskCache`` the first snapshot is served straight from disk and
+    revalidated right away with conditional GETs; collections the backend
+    reports as unchanged are not downloaded again.
+
+    With ``delta_sync`` a refresh first asks the backend's change feed what
+    changed since the current version and patches the snapshot with it. A
+    full reload remains the fallback when the feed cannot replay that far
+    back, and delta sync turns itself off against a backend without a feed.
+    """
+
+    def __init__(self, base_url, ttl=DEFAULT_TTL, session=None, cache=None, delta_sync=True):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.cache = cache
+        self.delta_sync = delta_sync
+        self.last_error = None
+        self._session = session or make_session()
+        self._current = Snapshot(0, partial(self._load, cold=True))
+        self._refresh_lock = threading.Lock()
+        self._refreshing = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self._next_attempt = 0.0
+
+    def _load(self, names, cold=False, previous=None):
+        """Loader behind a snapshot: disk first on a cold start, conditional GETs after."""
+        result = FetchResult()
+        if cold and self.cache:
+            for name in names:
+                records = self.cache.load(name, as_frame=name in COLUMNAR)
+                if records is not None:
+                    result.data[name] = records
+                    result.from_cache.add(name)
+        names = [name for name in names if name not in result.data]
+        if self.delta_sync and names:
+            # Everything downloaded from here on is at least this recent
+            result.sync_version = self._feed_version()
+
+        validators = {}
+        if self.cache:
+            validators = {name: self.cache.validators(name) for name in names}
+        fetched = fetch_all(self.base_url, names, session=self._session, validators=validators)
+
+        for name in fetched.not_modified:
+            if previous is not None and name in previous.loaded():
+                records = previous.get(name)
+            else:
+                records = self.cache.load(name, as_frame=name in COLUMNAR)
+            if records is None:
+                # The local copy vanished after we sent its validators
+                records = fetch_all(self.base_url, [name], session=self._session).data[name]
+            fetched.data[name] = records
+
+        if self.cache:
+            for name in set(fetched.data) - fetched.not_modified:
+                self.cache.save(name, fetched.data[name], fetched.validators[name])
+
+        result.data.update(fetched.data)
+        result.latencies.update(fetched.latencies)
+        result.validators.update(fetched.validators)
+        result.not_modified = fetched.not_modified
+        return result
+
+    def _feed_version(self):
+        try:
+            version, _ = fetch_changes(self._session, self.base_url)
+        except requests.RequestException as exc:
+            self._check_feed(exc)
+            return None
+        return version
+
+    def _check_feed(self, exc):
+        """Turn delta sync off if ``exc`` says the backend has no change feed."""
+        response = getattr(exc, "response", None)
+        if response is not None and response.status_code == 404:
+            logger.info("no change feed on %s, refreshing with full reloads", self.base_url)
+            self.delta_sync = False
+
+    @property
+    def latencies(self):
+        return self._current.latencies
+
+    def snapshot(self):
+        """The current snapshot; schedules a background refresh once it is stale."""
+        snapshot = self._current
+        expired = self.ttl and snapshot.loaded() and snapshot.age > self.ttl
+        if (snapshot.stale or expired) and time.time() >= self._next_attempt:
+            self.refresh()
+        return snapshot
+
+    def get(self, name):
+        return self.snapshot().get(name)
+
+    def prefetch(self, names):
+        self.snapshot().prefetch(names)
+
+    # ---------------- REFRESH ----------------
+    def refresh(self, wait=False):
+        """Start building the next snapshot unless one is already being built."""
+        with self._refresh_lock:
+            thread = self._refreshing
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._rebuild, name="snapshot-refresh", daemon=True)
+                self._refreshing = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _rebuild(self):
+        current = self._current
+        names = current.loaded()
+        if not names:
+            return
+        if self.delta_sync and current.sync_version is not None and not current.stale:
+            try:
+                if self._sync(current):
+                    self.last_error = None
+                    return
+            except Exception as exc:
+                logger.warning("delta sync failed, reloading in full: %s", exc)
+
+        snapshot = Snapshot(current.version + 1, partial(self._load, previous=current))
+        try:
+            snapshot.prefetch(names)
+        except Exception as exc:
+            self.last_error = exc
+            self._next_attempt = time.time() + RETRY_DELAY
+            logger.warning("refresh failed, keeping snapshot v%d: %s", current.version, exc)
+            return
+        self.last_error = None
+        # Later lazy loads must not keep the previous snapshot alive
+        snapshot._loader = self._load
+
+        unchanged = all(
+            name in snapshot.not_modified or _same(snapshot.get(name), current.get(name))
+            for name in names
+        )
+        if unchanged:
+            # Keep the current version, and everything derived from it
+            current.created_at = time.time()
+            current.stale = False
+            current.sync_version = snapshot.sync_version
+            logger.info("snapshot v%d revalidated, nothing changed", current.version)
+            return
+        # Collections first touched while we were fetching are carried over
+        # as-is; they will be refreshed on the next cycle.
+        for name in current.loaded():
+            snapshot._data.setdefault(name, current.get(name))
+        self._current = snapshot
+        logger.info("swapped in snapshot v%d (%d collections)", snapshot.version, len(names))
+
+    def _sync(self, current):
+        """Patch ``current`` from the change feed; False when a full reload is needed."""
+        try:
+            version, changes = fetch_changes(self._session, self.base_url, since=current.sync_version)
+        except requests.HTTPError as exc:
+            self._check_feed(exc)
+            if not self.delta_sync:
+                return False
+            raise
+        if changes is None:
+            logger.info("change feed cannot replay from version %s, reloading in full", current.sync_version)
+            return False
+
+        delta = delta_sync.Delta.from_changes(current.sync_version, version, changes)
+        if delta.collections - set(ENDPOINTS):
+            return False
+        if not delta.collections:
+            current.created_at = time.time()
+            current.sync_version = version
+            logger.info("snapshot v%d up to date with feed version %s", current.version, version)
+            return True
+
+        self._current = current.apply(delta, current.version + 1, self._load)
+        logger.info(
+            "patched snapshot v%d with %d changes to %s",
+            self._current.version, len(changes), ", ".join(sorted(delta.collections)),
+        )
+        return True
+
+    def start_refresher(self):
+        """Rebuild the snapshot every ``ttl`` seconds from a daemon thread."""
+        if not self.ttl or (self._refresher and self._refresher.is_alive()):
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="snapshot-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(RETRY_DELAY if self.last_error else self.ttl):
+            self.refresh(wait=True)
@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from data_loader import COLUMNAR, read_columns
+
+
+@dataclass
+class Delta:
+    """Net effect of a run of change-feed entries, per collection.
+
+    Items are matched on their ``id``. A later change to the same id
+    replaces an earlier one, so an insert followed by a delete leaves
+    nothing to apply.
+    """
+    since: int
+    version: int
+    # collection -> {id: item}
+    upserts: dict = field(default_factory=dict)
+    # collection -> set of ids
+    deletes: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_changes(cls, since, version, changes):
+        delta = cls(since, version)
+        for change in changes:
+            name, item_id = change["collection"], change["id"]
+            upserts = delta.upserts.setdefault(name, {})
+            deletes = delta.deletes.setdefault(name, set())
+            if change["op"] == "upsert":
+                deletes.discard(item_id)
+                upserts[item_id] = change["item"]
+            elif change["op"] == "delete":
+                upserts.pop(item_id, None)
+                deletes.add(item_id)
+            else:
+                raise ValueError(f"unknown change {change['op']!r}")
+        return delta
+
+    @property
+    def collections(self):
+        """Collections with at least one change."""
+        return {name for name in set(self.upserts) | set(self.deletes) if self.ids(name)}
+
+    def ids(self, name):
+        """Ids of ``name`` inserted, updated or deleted."""
+        return set(self.upserts.get(name, ())) | self.deletes.get(name, set())
+
+    def items(self, name):
+        """Inserted and updated items of ``name``."""
+        return list(self.upserts.get(name, {}).values())
+
+
+def patch_records(records, upserts, deletes):
+    """``records`` with updated items replaced in place, new ones appended and deleted ones dropped."""
+    patched, seen = [], set()
+    for record in records:
+        item_id = record.get("id")
+        if item_id in deletes:
+            continue
+        if item_id in upserts:
+            record = upserts[item_id]
+            seen.add(item_id)
+        patched.append(record)
+    patched.extend(item for item_id, item in upserts.items() if item_id not in seen)
+    return patched
+
+
+def patch_frame(frame, upserts, deletes, schema):
+    """Same as ``patch_records`` for a columnar collection; changed rows move to the end."""
+    changed = list(set(upserts) | deletes)
+    kept = frame[~frame["id"].isin(changed)]
+    if not upserts:
+        return kept.reset_index(drop=True)
+    return pd.concat([kept, read_columns(upserts.values(), schema)], ignore_index=True)
+
+
+def apply(collections, delta):
+    """Patched copies of the ``collections`` (name -> data) that ``delta`` touches."""
+    patched = {}
+    for name in delta.collections & set(collections):
+        upserts, deletes = delta.upserts.get(name, {}), delta.deletes.get(name, set())
+        if name in COLUMNAR:
+            patched[name] = patch_frame(collections[name], upserts, deletes, COLUMNAR[name])
+        else:
+            patched[name] = patch_records(collections[name], upserts, deletes)
+    return patched
@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "collections")
+
+
+class DiskCache:
+    """Local copy of each backend collection, stored as Parquet.
+
+    Every collection is kept in ``<name>.parquet`` next to a ``<name>.json``
+    sidecar holding the ETag / Last-Modified it was downloaded with, so a
+    restarted server can show data immediately and revalidate it with a
+    conditional GET. Files are replaced atomically; a reader never sees a
+    half-written collection.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name, ext):
+        return os.path.join(self.directory, f"{name}.{ext}")
+
+    def validators(self, name):
+        try:
+            with open(self._path(name, "json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(name, "parquet")):
+            return None
+        return meta.get("validators")
+
+    def load(self, name, as_frame=False):
+        """A cached collection (records, or a DataFrame), or None if it was never saved."""
+        try:
+            table = pq.read_table(self._path(name, "parquet"))
+        except (OSError, pa.ArrowException):
+            return None
+        return table.to_pandas() if as_frame else table.to_pylist()
+
+    def save(self, name, records, validators=None):
+        try:
+            if isinstance(records, pd.DataFrame):
+                table = pa.Table.from_pandas(records, preserve_index=False)
+            else:
+                table = pa.Table.from_pylist(records)
+        except (pa.ArrowException, TypeError, ValueError) as exc:
+            # Heterogeneous payloads can't be typed as columns; just skip them
+            logger.warning("not caching %s: %s", name, exc)
+            return False
+
+        tmp = self._path(name, f"{os.getpid()}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, self._path(name, "parquet"))
+
+        meta = {"validators": validators or {}, "saved_at": time.time(), "rows": table.num_rows}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(name, "json"))
+        return True
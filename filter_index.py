@@ -0,0 +1,97 @@
+import threading
+from functools import reduce
+
+import numpy as np
+
+import timings
+from grid import sort_positions
+from timetable import master_timetable
+
+# Value of a filter selectbox that means "don't filter on this column"
+ALL = "All"
+
+FILTER_COLUMNS = ("Department", "Formation", "Date", "Room")
+
+
+class FilterIndex:
+    """Inverted index of the master timetable for the filter bars.
+
+    ``frame`` is the timetable, already in start-time order. For every
+    filter column each value maps to the sorted row positions holding it, so
+    combining filters is an intersection of small integer arrays and the
+    result is still in display order.
+    """
+
+    def __init__(self, frame, columns=FILTER_COLUMNS):
+        self.frame = frame
+        self.postings = {
+            column: self.frame.groupby(column, sort=True, observed=True).indices for column in columns
+        }
+        self.options = {column: list(postings) for column, postings in self.postings.items()}
+        self.formations_by_department = {
+            department: sorted(group.unique().tolist())
+            for department, group in self.frame.groupby("Department", observed=True)["Formation"]
+        }
+        # (column, descending) -> positions of the whole timetable in that order
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the postings; the frame is the shared master timetable."""
+        return sum(rows.nbytes for postings in self.postings.values() for rows in postings.values())
+
+    def select(self, **criteria):
+        """Row positions matching every criterion, or None when nothing is filtered.
+
+        Criteria set to ``ALL`` (or None) are ignored, e.g.
+        ``index.select(Department="Informatique", Date=ALL)``.
+        """
+        lists = []
+        for column, value in criteria.items():
+            if value is None or value == ALL:
+                continue
+            lists.append(self.postings[column].get(value, np.empty(0, dtype=np.intp)))
+        if not lists:
+            return None
+        lists.sort(key=len)
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+
+    def rows(self, positions):
+        """The rows at ``positions`` (every row when None), in start-time order."""
+        if positions is None:
+            return self.frame.copy(deep=False)
+        return self.frame.take(positions)
+
+    def sort_positions(self, column, descending=False, positions=None):
+        """Positions in ``rows(positions)`` ordered by ``column``.
+
+        The whole timetable is sorted once per column; a filtered selection
+        keeps its rows of that order, which is a linear pass.
+        """
+        key = (column, descending)
+        order = self._orders.get(key)
+        if order is None:
+            order = sort_positions(self.frame, column, descending)
+            with self._lock:
+                self._orders[key] = order
+        if positions is None:
+            return order
+        selected = np.zeros(len(self.frame), dtype=bool)
+        selected[positions] = True
+        return np.searchsorted(positions, order[selected[order]])
+
+    def sorter(self, **criteria):
+        """``order`` for ``grid.paginated_dataframe`` over ``filter(**criteria)``."""
+        return lambda column, descending: self.sort_positions(column, descending, self.select(**criteria))
+
+    def filter(self, **criteria):
+        with timings.span("filter", "filter_index") as span:
+            frame = self.rows(self.select(**criteria))
+            span.rows = len(frame)
+        return frame
+
+
+def filter_index(snapshot):
+    """The filter index of ``snapshot``'s master timetable, built once per version."""
+    return snapshot.derived("filter_index", lambda snap: FilterIndex(master_timetable(snap)))
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+from timetable import master_timetable
+
+# Formations whose timetable is kept ready per snapshot
+MAX_FORMATIONS = 512
+
+DISPLAY_COLUMNS = ["Module", "Date", "Time", "Room", "Professor", "Duration"]
+
+
+@dataclass(frozen=True)
+class FormationTimetable:
+    formation_id: int
+    version: int
+    module_count: int
+    # Display-ready exams, sorted by date and time
+    exams: pd.DataFrame
+
+    @property
+    def total_exams(self):
+        return len(self.exams)
+
+    @property
+    def exam_days(self):
+        return self.exams["Date"].nunique()
+
+
+class FormationTimetables:
+    """Per-formation exam timetables of one snapshot, built on demand.
+
+    Students inherit every exam of their formation, so all students of a
+    formation share one entry. Entries are kept in an LRU of
+    ``MAX_FORMATIONS`` formations.
+    """
+
+    def __init__(self, snapshot, maxsize=MAX_FORMATIONS):
+        self.version = snapshot.version
+        self.maxsize = maxsize
+        master = master_timetable(snapshot)
+        self._master = master
+        self._rows = master.groupby("formation_id", observed=True).indices
+        modules = pd.DataFrame(snapshot.get("modules"), columns=["id", "formation_id"])
+        self._module_counts = modules.groupby("formation_id").size().to_dict()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the cached entries; the master timetable is shared."""
+        with self._lock:
+            entries = list(self._cache.values())
+        rows = sum(positions.nbytes for positions in self._rows.values())
+        return rows + sum(int(entry.exams.memory_usage(deep=True).sum()) for entry in entries)
+
+    def get(self, formation_id):
+        with self._lock:
+            entry = self._cache.get(formation_id)
+            if entry is not None:
+                self._cache.move_to_end(formation_id)
+                return entry
+
+        entry = self._build(formation_id)
+        with self._lock:
+            self._cache[formation_id] = entry
+            self._cache.move_to_end(formation_id)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return entry
+
+    def carry_over(self, previous, skip=()):
+        """Reuse the entries of ``previous`` (an earlier version), except the formations in ``skip``."""
+        with previous._lock:
+            entries = [(key, entry) for key, entry in previous._cache.items() if key not in skip]
+        with self._lock:
+            for formation_id, entry in entries:
+                self._cache[formation_id] = replace(entry, version=self.version)
+
+    def _build(self, formation_id):
+        rows = self._rows.get(formation_id, [])
+        # The master timetable is already in chronological order
+        exams = self._master[DISPLAY_COLUMNS].take(rows).rename(columns={"Duration": "Duration (min)"})
+        return FormationTimetable(
+            formation_id=formation_id,
+            version=self.version,
+            module_count=self._module_counts.get(formation_id, 0),
+            exams=exams.reset_index(drop=True),
+        )
+
+
+def patch_formation_timetables(previous, snapshot, delta):
+    """A new cache keeping the entries of every formation whose exams did not change."""
+    timetables = FormationTimetables(snapshot, previous.maxsize)
+    if delta.collections == {"exam_schedule"}:
+        changed = list(delta.ids("exam_schedule"))
+        affected = set()
+        for master in (previous._master, timetables._master):
+            affected.update(master.loc[master["exam_id"].isin(changed), "formation_id"].tolist())
+        timetables.carry_over(previous, skip=affected)
+    return timetables
+
+
+def formation_timetable(snapshot, formation_id):
+    """The cached timetable of ``formation_id`` in ``snapshot``."""
+    return snapshot.derived("formation_timetables", FormationTimetables, patch_formation_timetables).get(formation_id)
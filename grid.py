@@ -0,0 +1,78 @@
+import math
+from functools import partial
+
+import numpy as np
+import streamlit as st
+
+import timings
+
+PAGE_SIZES = (25, 50, 100, 250)
+DEFAULT_PAGE_SIZE = 50
+# Sort choice that keeps the frame's own order (chronological for timetables)
+DEFAULT_ORDER = "Date & Time"
+
+
+def sort_positions(frame, column, descending=False):
+    """Row positions of ``frame`` ordered by ``column``; ties keep their order."""
+    values = frame[column].reset_index(drop=True)
+    order = values.sort_values(ascending=not descending, kind="stable", na_position="last")
+    return order.index.to_numpy()
+
+
+def snapshot_order(snapshot, frame_of):
+    """``order`` for ``paginated_dataframe`` over ``frame_of(snapshot)``, sorted once per version and column."""
+    def order(column, descending):
+        return snapshot.derived(
+            ("sort_positions", frame_of.__name__, column, descending),
+            lambda snap: sort_positions(frame_of(snap), column, descending),
+        )
+    return order
+
+
+def paginated_dataframe(frame, key, columns=None, total_label="exams", order=None):
+    """Show one page of ``frame``, sorted and sliced on the server.
+
+    Only the visible page is serialized and sent to the browser, so the
+    rerun payload stays bounded however many rows ``frame`` has. ``key``
+    namespaces the widgets when a page shows several grids.
+
+    ``order(column, descending)`` gives the sorted row positions of
+    ``frame``; pages pass a memoized one (``snapshot_order``,
+    ``FilterIndex.sorter``) so a sort is not redone on every rerun.
+    """
+    columns = list(columns or frame.columns)
+    total = len(frame)
+
+    c_sort, c_dir, c_size, c_page = st.columns([2, 1, 1, 1])
+    with c_sort:
+        sort_column = st.selectbox("Sort by", [DEFAULT_ORDER] + columns, key=f"{key}_sort")
+    with c_dir:
+        descending = st.toggle("Descending", key=f"{key}_desc")
+    with c_size:
+        page_size = st.selectbox(
+            "Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_size"
+        )
+
+    pages = max(1, math.ceil(total / page_size))
+    # Filters may have shrunk the frame since the page number was chosen
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    with c_page:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    if sort_column == DEFAULT_ORDER:
+        positions = np.arange(start, stop)
+        if descending:
+            positions = total - 1 - positions
+    else:
+        positions = (order or partial(sort_positions, frame))(sort_column, descending)[start:stop]
+
+    with timings.span("render", key, rows=len(positions)):
+        st.dataframe(frame.take(positions)[columns], use_container_width=True, hide_index=True)
+    if total:
+        st.caption(f"Showing {start + 1}–{stop} of {total} {total_label}")
+    else:
+        st.caption(f"No {total_label} to show")
@@ -0,0 +1,177 @@
+"""Local stand-in for the exam scheduler backend.
+
+    python local_backend.py --scale 10 --latency 0.05 --port 8000
+    EXAM_SCHEDULER_URL=http://127.0.0.1:8000 streamlit run app.py
+
+Serves synthetic (or saved) collections on the same routes as the real
+backend, with ETag revalidation and configurable per-request latency.
+``/_stats`` returns how many times each route was requested.
+
+Edits made with ``Backend.apply`` are also published on a change feed,
+``/changes?since=<version>``, answered with 410 Gone once the requested
+version is older than the changes kept.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import synthetic_data
+from data_loader import CHANGES, ENDPOINTS
+
+# Changes kept on the feed; older versions must reload in full
+MAX_CHANGES = 10_000
+
+
+class Backend:
+    """The payloads served, pre-encoded once, plus request counters and the change feed."""
+
+    def __init__(self, data, latency=0.0, jitter=0.0, max_changes=MAX_CHANGES):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = Counter()
+        self.version = 0
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._payloads = {}
+        self._changes = deque(maxlen=max_changes)
+        # Oldest version the feed can still bring up to date
+        self._floor = 0
+        for name, payload in data.items():
+            self.set(name, payload)
+
+    def _publish(self, name, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self._payloads[name] = payload
+        self._bodies[ENDPOINTS[name]] = (body, etag)
+
+    def set(self, name, payload):
+        """Replace one collection wholesale; feed readers have to reload."""
+        with self._lock:
+            self._publish(name, payload)
+            self.version += 1
+            self._floor = self.version
+
+    def apply(self, name, upserts=(), deletes=()):
+        """Insert / update items (matched on ``id``) and delete ids of one collection.
+
+        Returns the new feed version.
+        """
+        with self._lock:
+            items = {item["id"]: item for item in self._payloads[name]}
+            for item_id in deletes:
+                items.pop(item_id, None)
+            for item in upserts:
+                items[item["id"]] = item
+            self._publish(name, list(items.values()))
+            self.version += 1
+            for item_id in deletes:
+                self._changes.append({"version": self.version, "collection": name, "op": "delete", "id": item_id})
+            for item in upserts:
+                self._changes.append({"version": self.version, "collection": name, "op": "upsert", "id": item["id"], "item": item})
+            if len(self._changes) == self._changes.maxlen:
+                # Part of the oldest version kept may have been dropped
+                self._floor = max(self._floor, self._changes[0]["version"])
+            return self.version
+
+    def changes(self, since=None):
+        """``(version, changes after since)``; changes is None when they are no longer all kept."""
+        with self._lock:
+            self.requests[CHANGES] += 1
+            if since is None:
+                return self.version, []
+            if since < self._floor or since > self.version:
+                return self.version, None
+            return self.version, [change for change in self._changes if change["version"] > since]
+
+    def get(self, route):
+        with self._lock:
+            self.requests[route] += 1
+            return self._bodies.get(route)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.requests)
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            route = url.path
+            if route == "/_stats":
+                return self._send(200, json.dumps(backend.stats()).encode("utf-8"))
+            if route == CHANGES:
+                since = parse_qs(url.query).get("since")
+                version, changes = backend.changes(int(since[0]) if since else None)
+                if changes is None:
+                    return self._send(410, json.dumps({"detail": "Gone", "version": version}).encode("utf-8"))
+                return self._send(200, json.dumps({"version": version, "changes": changes}).encode("utf-8"))
+
+            entry = backend.get(route)
+            if entry is None:
+                return self._send(404, b'{"detail": "Not Found"}')
+            backend.delay()
+            body, etag = entry
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", etag)
+            return self._send(200, body, etag)
+
+        def _send(self, status, body, etag=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(backend, host="127.0.0.1", port=0):
+    """Start serving ``backend`` on a daemon thread; returns ``(server, url)``."""
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="local-backend", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="synthetic dataset size (1 = today's faculty)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", help="serve JSON files saved by synthetic_data.py instead")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per request")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    data = synthetic_data.load(args.data) if args.data else synthetic_data.generate(args.scale, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(Backend(data, args.latency, args.jitter)))
+    server.daemon_threads = True
+    print(f"Serving {len(data['exam_schedule'])} exams on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,94 @@
-import requests
+import os
 
-url = "https://exam-scheduler-v7yx.onrender.com"
+from data_loader import DEFAULT_URL, ENDPOINTS
+from data_store import DEFAULT_TTL, DataStore
+from disk_cache import DEFAULT_DIR, DiskCache
+from shared_snapshot import SharedStore
 
-# 1. Departments (7 total)
-departments =  requests.get(url+"/departments").json()
+# Point EXAM_SCHEDULER_URL at local_backend.py to run every page offline
+url = os.environ.get("EXAM_SCHEDULER_URL", DEFAULT_URL)
 
-# 2. Formations (A distinct set of formations linked to departments)
-# Formations have 6-9 modules typically.
-formations = requests.get(url+"/formations").json()
-
-# 3. Modules (Linked to Formations)
-modules = requests.get(url+"/modules").json()
-# 4. Students (Linked to Formations - Inherit modules automatically)
-students =  requests.get(url+"/etudiants").json()
+# Collections are fetched lazily: `from mock_data import rooms` downloads
+# /lieu_examen the first time any page asks for it and reuses it afterwards.
+#
+# ---------------- ACADEMIC STRUCTURE ----------------
+# departments   -> /departments   (7 total)
+# formations    -> /formations    (linked to departments, 6-9 modules each)
+# modules       -> /modules       (linked to formations)
+# students      -> /etudiants     (linked to formations, inherit its modules;
+#                                  streamed into a DataFrame: id, nom, formation_id;
+#                                  `student_records` is the old list of dicts)
+#
 # ---------------- RESOURCES ----------------
+# rooms         -> /lieu_examen   (limited to 20 students max in exam mode)
+# professors    -> /professeurs
+#
+# ---------------- EXAM SCHEDULE ----------------
+# exam_schedule -> /examens       (exams are scheduled per MODULE)
+#
+# ---------------- ANALYTICS ----------------
+# rooms_usage, department_conflicts, professor_workload -> /analytics/*
 
-# Rooms with capacities
-# Rooms limited to 20 students max (Exam mode)
-rooms = requests.get(url+"/lieu_examen").json()
+# The data is shared by every session of the Streamlit process and rebuilt
+# in the background every EXAM_SCHEDULER_TTL seconds (0 disables refreshes).
+# Each collection is also kept on disk (EXAM_SCHEDULER_CACHE_DIR) so a
+# restart shows the last copy at once and only re-downloads what changed.
+# Refreshes apply the backend's change feed when it has one
+# (EXAM_SCHEDULER_DELTA_SYNC=0 forces full reloads).
+#
+# When several Streamlit processes run side by side, set
+# EXAM_SCHEDULER_SHARED_DIR and run `python shared_snapshot.py` once: the
+# processes then map the snapshot it publishes there instead of each
+# fetching and holding their own copy.
+shared_dir = os.environ.get("EXAM_SCHEDULER_SHARED_DIR")
+if shared_dir:
+    store = SharedStore(shared_dir)
+else:
+    store = DataStore(
+        url,
+        ttl=int(os.environ.get("EXAM_SCHEDULER_TTL", DEFAULT_TTL)),
+        cache=DiskCache(os.environ.get("EXAM_SCHEDULER_CACHE_DIR", DEFAULT_DIR)),
+        delta_sync=os.environ.get("EXAM_SCHEDULER_DELTA_SYNC", "1") != "0",
+    )
+store.start_refresher()
 
-professors = requests.get(url+"/professeurs").json()
 
+def connect(base_url, ttl=DEFAULT_TTL, cache=None):
+    """Serve every page from another backend (local_backend.py, benchmarks)."""
+    global store, url
+    store.stop_refresher()
+    url = base_url
+    store = DataStore(base_url, ttl=ttl, cache=cache)
+    store.start_refresher()
+    return store
+
+
+def snapshot():
+    """The current data version; pin it once per rerun for consistent reads."""
+    return store.snapshot()
+
+
+def prefetch(*names):
+    """Download several collections concurrently ahead of their first use."""
+    store.prefetch(names)
 
-# ---------------- EXAM SCHEDULE ----------------
 
-# Exams are scheduled per MODULE.
-exam_schedule = requests.get(url+"/examens").json()
+def refresh(wait=False):
+    """Rebuild the snapshot now instead of waiting for the TTL."""
+    return store.refresh(wait=wait)
 
-# ---------------- ANALYTICS MOCK DATA ----------------
 
-rooms_usage = requests.get(url+"/analytics/room_usage").json()
+def __getattr__(name):
+    if name in ENDPOINTS:
+        return store.get(name)
+    if name == "student_records":
+        # ``students`` as the list of dicts the backend sends, built once per version
+        return store.snapshot().derived("student_records", lambda snap: snap.get("students").to_dict("records"))
+    if name == "fetch_latencies":
+        # Seconds spent on each endpoint by the current snapshot
+        return store.latencies
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-department_conflicts = requests.get(url+"/analytics/department_conflicts").json()
 
-professor_workload = requests.get(url+"/analytics/professor_workload").json()
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(ENDPOINTS) | {"student_records", "fetch_latencies"})
@@ -1,96 +1,73 @@
-import streamlit as st
 import pandas as pd
-from mock_data import (
-    students, 
-    formations, 
-    modules, 
-    exam_schedule, 
-    rooms, 
-    professors
-)
+import streamlit as st
+import mock_data
+import timings
+from formation_cache import formation_timetable
+from student_load import student_load
+from student_search import MAX_MATCHES, student_index
 
 st.set_page_config(layout="wide")
+timings.start_rerun()
 st.title("👨‍🎓 Student View")
 
 # ---------------- PREPARE DATA ----------------
-df_students = pd.DataFrame(students)
-df_formations = pd.DataFrame(formations)
-df_modules = pd.DataFrame(modules)
-df_exams = pd.DataFrame(exam_schedule)
-df_rooms = pd.DataFrame(rooms)
-df_professors = pd.DataFrame(professors)
+# Name index over the whole roster, built once per data version
+snapshot = mock_data.snapshot()
+students = student_index(snapshot)
 
 # ---------------- STUDENT SELECTION ----------------
 st.subheader("🎯 Select Student")
 
-student_map = {s["nom"]: s["id"] for s in students}
-selected_student_name = st.selectbox("Choose a student", list(student_map.keys()))
-selected_student_id = student_map[selected_student_name]
+# Only a bounded page of matches is sent to the browser
+query = st.text_input("Search student", placeholder="Type a name or a student id")
+matches, total_matches = students.search(query)
+
+if not matches:
+    st.warning("No student matches this search.")
+    timings.show_panel()
+    st.stop()
+
+if total_matches > MAX_MATCHES:
+    st.caption(f"Showing the first {MAX_MATCHES} of {total_matches} matches, keep typing to narrow the list.")
+
+selected_student_id = st.selectbox("Choose a student", matches, format_func=students.name)
 
-student_info = df_students[df_students["id"] == selected_student_id].iloc[0]
+student_info = students.get(selected_student_id)
+selected_student_name = student_info["nom"]
 formation_id = student_info["formation_id"]
-formation_name = df_formations[df_formations["id"] == formation_id]["nom"].iloc[0]
+formation_name = students.formation_name(formation_id)
 
 st.info(f"🎓 **Enrolled in:** {formation_name}")
 
 # ---------------- RETRIEVE EXAMS ----------------
-# 1. Get modules for this formation
-student_modules = df_modules[df_modules["formation_id"] == formation_id]
+# Students inherit their formation's exams, so the timetable is cached per
+# formation and shared by every student enrolled in it.
+timetable = formation_timetable(snapshot, formation_id)
 
-if student_modules.empty:
+if timetable.module_count == 0:
     st.warning("No modules found for this formation.")
+elif timetable.total_exams == 0:
+    st.warning("No exams scheduled for your modules yet.")
 else:
-    # Rename 'nom' to 'Module' to avoid conflicts
-    student_modules_renamed = student_modules.rename(columns={"nom": "Module"})
-
-    # Merge exams with modules
-    my_exams = pd.merge(
-        df_exams, 
-        student_modules_renamed, 
-        left_on="module_id", 
-        right_on="id",
-        suffixes=("_exam", "_module")
-    )
-
-    if my_exams.empty:
-        st.warning("No exams scheduled for your modules yet.")
-    else:
-        # Merge with Rooms
-        df_rooms_renamed = df_rooms.rename(columns={"nom": "Room"})
-        my_exams = pd.merge(
-            my_exams,
-            df_rooms_renamed,
-            left_on="salle_id",
-            right_on="id",
-            how="left",
-            suffixes=("", "_room")
-        )
-
-        # Merge with Professors
-        df_profs_renamed = df_professors.rename(columns={"nom": "Professor"})
-        my_exams = pd.merge(
-            my_exams,
-            df_profs_renamed,
-            left_on="prof_id",
-            right_on="id",
-            how="left",
-            suffixes=("", "_prof")
-        )
-
-        # ---------------- FORMAT DISPLAY ----------------
-        my_exams["Date"] = pd.to_datetime(my_exams["date_heure"]).dt.date
-        my_exams["Time"] = pd.to_datetime(my_exams["date_heure"]).dt.time
-        my_exams["Duration (min)"] = my_exams["duree_minutes"]
+    # ---------------- DISPLAY ----------------
+    st.subheader(f"📅 Exam Schedule for {selected_student_name}")
+    with timings.span("render", "student_timetable", rows=timetable.total_exams):
+        st.dataframe(timetable.exams, use_container_width=True)
 
-        display_df = my_exams[["Module", "Date", "Time", "Room", "Professor", "Duration (min)"]]
-        display_df = display_df.sort_values(by=["Date", "Time"])
+    # ---------------- METRICS ----------------
+    st.subheader("📊 Overview")
+    c1, c2 = st.columns(2)
+    c1.metric("Total Exams", timetable.total_exams)
+    c2.metric("Exam Days", timetable.exam_days)
 
-        # ---------------- DISPLAY ----------------
-        st.subheader(f"📅 Exam Schedule for {selected_student_name}")
-        st.dataframe(display_df, use_container_width=True)
+    # Computed for the whole roster once per data version; this is a lookup
+    load = student_load(snapshot).student(selected_student_id)
+    if load is not None:
+        c3, c4, c5, c6 = st.columns(4)
+        c3.metric("Most Exams in a Day", load["Max Exams/Day"])
+        c4.metric("Back-to-Back Exams", load["Back-to-Back"])
+        min_gap = load["Min Gap (min)"]
+        c5.metric("Shortest Rest", "—" if pd.isna(min_gap) else f"{int(min_gap)} min")
+        c6.metric("Session Span (days)", load["Span (days)"])
 
-        # ---------------- METRICS ----------------
-        st.subheader("📊 Overview")
-        c1, c2 = st.columns(2)
-        c1.metric("Total Exams", len(display_df))
-        c2.metric("Exam Days", display_df["Date"].nunique())
+timings.show_panel()
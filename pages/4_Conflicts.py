@@ -1,17 +1,21 @@
 import streamlit as st
-import pandas as pd
-from mock_data import (
-    department_conflicts,
-    professor_workload
-)
+import mock_data
+import timings
+from analytics import professor_workload
+from conflicts import conflicts_per_department, exam_conflicts
 
 st.set_page_config(layout="wide")
+timings.start_rerun()
 
 st.title("⚠️ Conflicts & Alerts")
 
 # ---------------- PREPARE DATA ----------------
-df_conflicts = pd.DataFrame(department_conflicts)
-df_workload = pd.DataFrame(professor_workload)
+# Overlapping exams and professor hours are computed locally from the
+# timetable, once per data version
+snapshot = mock_data.snapshot()
+df_conflicts = conflicts_per_department(snapshot)
+df_exam_conflicts = exam_conflicts(snapshot)
+df_workload = professor_workload(snapshot)
 
 # ---------------- SUMMARY ----------------
 st.subheader("📊 Conflict Summary")
@@ -37,6 +41,20 @@ else:
         use_container_width=True
     )
 
+    # Students (formation), professors and rooms booked for overlapping exams
+    st.subheader("🔍 Overlapping Exams")
+    conflict_type = st.radio("Conflict type", ["All", "Formation", "Professor", "Room"], horizontal=True)
+    shown = df_exam_conflicts
+    if conflict_type != "All":
+        with timings.span("filter", "conflict_type") as span:
+            shown = shown[shown["Type"] == conflict_type]
+            span.rows = len(shown)
+    with timings.span("render", "exam_conflicts", rows=len(shown)):
+        st.dataframe(
+            shown.drop(columns=["exam_id", "other_exam_id", "dept_id"]),
+            use_container_width=True
+        )
+
 # ---------------- PROFESSOR OVERLOAD ----------------
 st.subheader("👨‍🏫 Professor Workload Issues")
 
@@ -47,3 +65,5 @@ if overloaded_df.empty:
 else:
     st.warning("⚠️ Some professors are exceeding their hour limits.")
     st.dataframe(overloaded_df, use_container_width=True)
+
+timings.show_panel()
@@ -1,49 +1,27 @@
 import streamlit as st
-import pandas as pd
-from mock_data import (
-    exam_schedule,
-    rooms_usage,
-    department_conflicts,
-    professor_workload,
-    departments,
-    modules,
-    formations,
-    rooms,
-    professors
-)
+import mock_data
+import timings
+from analytics import room_usage
+from cube import exam_cube
+from filter_index import ALL, filter_index
+from grid import paginated_dataframe
+from student_load import student_load
 
 st.set_page_config(layout="wide")
+timings.start_rerun()
 
 st.title("👨‍💼 Vice-Dean / Dean – Strategic Dashboard")
 
 # ---------------- PREPARE DATA ----------------
-print(rooms_usage)
-df_rooms_usage = pd.DataFrame(rooms_usage)
-df_conflicts = pd.DataFrame(department_conflicts)
-df_workload = pd.DataFrame(professor_workload)
-
-# Build the enriched EDT for display
-df_exams = pd.DataFrame(exam_schedule)
-df_modules = pd.DataFrame(modules)
-df_formations = pd.DataFrame(formations)
-df_depts = pd.DataFrame(departments)
-df_rooms = pd.DataFrame(rooms)
-df_profs = pd.DataFrame(professors)
-
-# Joins
-master_df = pd.merge(df_exams, df_modules, left_on="module_id", right_on="id")
-master_df = pd.merge(master_df, df_formations, left_on="formation_id", right_on="id", suffixes=("", "_form"))
-master_df = pd.merge(master_df, df_depts, left_on="dept_id", right_on="id", suffixes=("", "_dept"))
-master_df = pd.merge(master_df, df_rooms, left_on="salle_id", right_on="id", suffixes=("", "_salle"))
-master_df = pd.merge(master_df, df_profs, left_on="prof_id", right_on="id", suffixes=("", "_prof"))
-
-master_df = master_df.rename(columns={
-    "nom_dept": "Department",
-    "date_heure": "Date",
-    "nom": "Module",
-    "nom_salle": "Room"
-})
-master_df["Date"] = pd.to_datetime(master_df["Date"]).dt.date
+# Every figure is read from the aggregate cube, built once per data version
+snapshot = mock_data.snapshot()
+cube = exam_cube(snapshot)
+totals = cube.total()
+df_rooms_usage = room_usage(snapshot)
+df_conflicts = cube.rollup("Department")
+
+# Enriched EDT for display, shared with the other pages and indexed for filtering
+index = filter_index(snapshot)
 
 
 # ---------------- KPIs ----------------
@@ -51,11 +29,11 @@ st.subheader("📌 Global Strategic KPIs")
 
 c1, c2, c3, c4 = st.columns(4)
 
-total_conflicts = df_conflicts["conflicts"].sum()
+total_conflicts = totals["conflicts"]
 avg_room_usage = int(df_rooms_usage["usage_rate"].mean())
-total_hours = df_workload["hours"].sum()
+total_hours = totals["prof_hours"]
 
-c1.metric("Total Departments", len(departments))
+c1.metric("Total Departments", len(snapshot.get("departments")))
 c2.metric("Pending Conflicts", total_conflicts)
 c3.metric("Avg Room Usage (%)", f"{avg_room_usage}%")
 c4.metric("Total Professor Hours", total_hours)
@@ -66,26 +44,30 @@ st.subheader("📅 Global Exam Timetable (Read-Only)")
 col1, col2 = st.columns(2)
 
 with col1:
-    dept_options = ["All"] + sorted(master_df["Department"].unique().tolist())
+    dept_options = [ALL] + index.options["Department"]
     selected_department = st.selectbox("Filter by Department", dept_options)
 
 with col2:
-    date_options = ["All"] + sorted(master_df["Date"].unique().tolist())
+    date_options = [ALL] + index.options["Date"]
     selected_date = st.selectbox("Filter by Date", date_options)
 
-filtered_edt = master_df.copy()
-
-if selected_department != "All":
-    filtered_edt = filtered_edt[filtered_edt["Department"] == selected_department]
+filtered_edt = index.filter(Department=selected_department, Date=selected_date)
 
-if selected_date != "All":
-    filtered_edt = filtered_edt[filtered_edt["Date"] == selected_date]
-
-st.dataframe(
-    filtered_edt[["Department", "Module", "Date", "Room"]], 
-    use_container_width=True
+paginated_dataframe(
+    filtered_edt,
+    key="dean_edt",
+    columns=["Department", "Module", "Date", "Room"],
+    order=index.sorter(Department=selected_department, Date=selected_date),
 )
 
+# Figures of the current selection, sliced from the cube
+selection = cube.total(Department=selected_department, Date=selected_date)
+s1, s2, s3, s4 = st.columns(4)
+s1.metric("Exams", selection["exams"])
+s2.metric("Seat Demand", selection["seats"])
+s3.metric("Professor Hours", selection["prof_hours"])
+s4.metric("Conflicts", selection["conflicts"])
+
 # ---------------- ROOM OCCUPATION ----------------
 st.subheader("🏫 Global Room & Playing Fields")
 
@@ -96,16 +78,38 @@ with c_chart:
 
 with c_data:
     st.caption("Detailed Usage")
-    st.dataframe(df_rooms_usage[["room", "usage_rate", "capacity_check"]], use_container_width=True)
+    with timings.span("render", "room_usage", rows=len(df_rooms_usage)):
+        st.dataframe(df_rooms_usage[["room", "usage_rate", "capacity_check"]], use_container_width=True)
 
 # ---------------- CONFLICTS BY DEPARTMENT ----------------
 st.subheader("⚠️ Conflict Analysis")
 
 if total_conflicts > 0:
-    st.bar_chart(df_conflicts.set_index("department")["conflicts"])
+    st.bar_chart(df_conflicts["conflicts"])
 else:
     st.success("No conflicts reported across any department.")
 
+# ---------------- STUDENT LOAD ----------------
+st.subheader("🧑‍🎓 Student Load")
+
+# Every student of a formation sits the same exams, so loads are per formation
+load = student_load(snapshot)
+l1, l2, l3 = st.columns(3)
+l1.metric("Students with 2+ Exams a Day", load.students_with("Max Exams/Day", 2))
+l2.metric("Students with Back-to-Back Exams", load.students_with("Back-to-Back", 1))
+l3.metric("Students with Overlapping Exams", int(load.distribution("Min Gap (min)")["Overlap"]))
+
+c_day, c_gap = st.columns(2)
+with c_day:
+    st.caption("Students by most exams in one day")
+    st.bar_chart(load.distribution("Max Exams/Day"))
+with c_gap:
+    st.caption("Students by shortest rest between two exams")
+    st.bar_chart(load.distribution("Min Gap (min)"))
+
+st.caption("Heaviest formations")
+st.dataframe(load.worst(), use_container_width=True)
+
 # ---------------- FINAL VALIDATION ----------------
 st.subheader("✅ Final Exam Timetable Validation")
 
@@ -121,3 +125,5 @@ elif decision == "Rejected":
     st.error("❌ The exam timetable has been rejected. Adjustments are required.")
 else:
     st.warning("⏳ The exam timetable is currently under review.")
+
+timings.show_panel()
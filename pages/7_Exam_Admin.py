@@ -1,106 +1,275 @@
+import datetime
+import json
+import tempfile
+import time
+
 import streamlit as st
-import pandas as pd
-from mock_data import (
-    students,
-    formations,
-    modules,
-    exam_schedule,
-    rooms,
-    professors
-)
+import mock_data
+import timings
+import solver
+import what_if
+from grid import paginated_dataframe, snapshot_order
+from seating import admin_timetable, seat_allocation
+from student_export import export_zip
 
 st.set_page_config(layout="wide")
+timings.start_rerun()
 st.title("🏫 Exam Administration Dashboard")
 
 # ---------------- PREPARE DATA ----------------
-df_students = pd.DataFrame(students)
-df_formations = pd.DataFrame(formations)
-df_modules = pd.DataFrame(modules)
-df_exams = pd.DataFrame(exam_schedule)
-df_rooms = pd.DataFrame(rooms)
-df_professors = pd.DataFrame(professors)
-
-# ---------------- CALCULATE FORMATION SIZE ----------------
-# عدد الطلاب لكل formation
-formation_sizes = df_students.groupby("formation_id").size().reset_index(name="Formation_Size")
-
-# دمج مع df_formations
-df_formations = pd.merge(df_formations, formation_sizes, left_on="id", right_on="formation_id", how="left")
-df_formations["Formation_Size"] = df_formations["Formation_Size"].fillna(0)
-
-# ---------------- ENRICH EXAMS ----------------
-# Merge exams with modules
-df_modules_renamed = df_modules.rename(columns={"nom": "Module"})
-master_df = pd.merge(
-    df_exams,
-    df_modules_renamed,
-    left_on="module_id",
-    right_on="id",
-    suffixes=("_exam", "_module")
-)
-
-# Merge with formations to get Formation_Size
-master_df = pd.merge(
-    master_df,
-    df_formations[["id", "nom", "Formation_Size"]],
-    left_on="formation_id",
-    right_on="id",
-    how="left",
-    suffixes=("", "_formation")
-)
-
-# Merge with rooms to get capacity
-df_rooms_renamed = df_rooms.rename(columns={"nom": "Room"})
-master_df = pd.merge(
-    master_df,
-    df_rooms_renamed[["id", "Room", "capacite"]],
-    left_on="salle_id",
-    right_on="id",
-    how="left",
-    suffixes=("", "_room")
-)
-
-# Merge with professors
-df_professors_renamed = df_professors.rename(columns={"nom": "Professor"})
-master_df = pd.merge(
-    master_df,
-    df_professors_renamed[["id", "Professor"]],
-    left_on="prof_id",
-    right_on="id",
-    how="left",
-    suffixes=("", "_prof")
-)
-
-# ---------------- CALCULATE OCCUPANCY ----------------
-master_df["Occupancy"] = master_df["Formation_Size"] / master_df["capacite"]
-
-# ---------------- FORMAT DATE & TIME ----------------
-master_df["Date"] = pd.to_datetime(master_df["date_heure"]).dt.date
-master_df["Time"] = pd.to_datetime(master_df["date_heure"]).dt.time
-master_df["Duration (min)"] = master_df["duree_minutes"]
+# Timetable with formation sizes (عدد الطلاب لكل formation), seat allocation and
+# occupancy, joined once per data version and shared by every session. Each
+# formation is spread over as many free rooms as it needs at its time slot.
+snapshot = mock_data.snapshot()
+master_df = admin_timetable(snapshot)
 
 # ---------------- DISPLAY ----------------
 st.subheader("📅 Exam Schedule Overview")
-display_df = master_df[[
+display_cols = [
     "Module",
-    "nom",
-    "Room",
+    "Formation",
+    "Room List",
     "Professor",
     "Date",
     "Time",
     "Duration (min)",
     "Formation_Size",
-    "capacite",
-    "Occupancy"
-]].copy()
-display_df = display_df.rename(columns={"nom": "Formation", "capacite": "Capacity"})
-display_df = display_df.sort_values(by=["Date", "Time"])
-
-st.dataframe(display_df, use_container_width=True)
+    "Capacity",
+    "Occupancy",
+    "Invigilators",
+    "Unseated"
+]
+paginated_dataframe(master_df, key="admin", columns=display_cols, order=snapshot_order(snapshot, admin_timetable))
 
 # ---------------- METRICS ----------------
 st.subheader("📊 Key Metrics")
 c1, c2, c3 = st.columns(3)
-c1.metric("Total Exams", len(display_df))
-c2.metric("Total Students", int(df_students.shape[0]))
+c1.metric("Total Exams", len(master_df))
+c2.metric("Total Students", len(snapshot.get("students")))
 c3.metric("Avg Occupancy (%)", f"{(master_df['Occupancy'].mean()*100):.2f}%")
+c4, c5, c6 = st.columns(3)
+c4.metric("Rooms Allocated", int(master_df["Rooms"].sum()))
+c5.metric("Invigilators Needed", int(master_df["Invigilators"].sum()))
+c6.metric("Unseated Students", int(master_df["Unseated"].sum()))
+
+with st.expander("🪑 Seat allocation per room"):
+    paginated_dataframe(
+        seat_allocation(snapshot),
+        key="seating",
+        columns=["Module", "Formation", "Room", "Capacity", "Seats", "Seat From", "Seat To",
+                 "First Student", "Last Student", "Invigilators", "Start", "End"],
+        total_label="room allocations",
+        order=snapshot_order(snapshot, seat_allocation),
+    )
+
+# ---------------- LOCAL SOLVER ----------------
+# Repairs (or rebuilds) the timetable on this machine; nothing is sent to the backend
+st.subheader("🧮 Timetable Solver")
+session_days = solver.DEFAULT_DAYS
+if len(master_df):
+    session_days = (master_df["Start"].max().normalize() - master_df["Start"].min().normalize()).days + 1
+solver_modes = {"repair": "Repair current schedule", "generate": "Generate from scratch"}
+with st.form("solver_form"):
+    c1, c2, c3 = st.columns(3)
+    solver_mode = c1.radio("Mode", list(solver_modes), format_func=solver_modes.get, key="solver_mode")
+    # A published session longer than 60 days can still be repaired on its own span
+    solver_days = c2.number_input(
+        "Exam days", min_value=1, max_value=max(60, session_days), value=session_days, key="solver_days"
+    )
+    solver_limit = c3.number_input(
+        "Time limit (s)", min_value=1, max_value=120, value=int(solver.TIME_LIMIT), key="solver_limit"
+    )
+    run_solver = st.form_submit_button("Run solver")
+
+if run_solver:
+    with st.spinner("Solving..."):
+        try:
+            problem = solver.build_problem(snapshot, days=solver_days)
+        except ValueError as error:
+            # e.g. no rooms or no professors yet: the rest of the page still renders
+            st.error(f"❌ The solver cannot run on this data: {error}.")
+        else:
+            st.session_state["solver_result"] = (snapshot.version, solver.solve(problem, solver_mode, solver_limit))
+
+solver_result = st.session_state.get("solver_result")
+if solver_result is not None:
+    solved_version, solution = solver_result
+    if solved_version != snapshot.version:
+        st.caption(f"Computed on data version {solved_version}; the data has changed since.")
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("Penalty", f"{solution.penalty:.0f}", f"{solution.penalty - solution.initial_penalty:.0f}", delta_color="inverse")
+    s2.metric("Exams Moved", solution.moved)
+    s3.metric("Iterations", solution.iterations)
+    s4.metric("Solve Time (s)", f"{solution.seconds:.2f}")
+    st.dataframe(
+        [
+            {"Term": term, "Before": solution.initial_breakdown[term], "After": solution.breakdown[term]}
+            for term in solver.WEIGHTS
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    paginated_dataframe(solver.changes(snapshot, solution), key="solver", total_label="changed exams")
+    st.download_button(
+        "⬇️ Download proposed schedule (JSON)",
+        json.dumps(solution.exams, ensure_ascii=False),
+        file_name=f"proposed_schedule_v{solved_version}.json",
+        mime="application/json",
+        on_click="ignore",
+        key="solver_download",
+    )
+
+# ---------------- WHAT-IF EDITOR ----------------
+# Changes stay in this session until exported; each is scored against the timelines it touches
+st.subheader("🧪 What-if Editor")
+timelines = what_if.timeline_index(snapshot)
+# Exams deleted since a change was made drop out of the change set
+changes = [c for c in st.session_state.get("what_if_changes", []) if c.exam_id in timelines]
+st.session_state["what_if_changes"] = changes
+
+
+def reset_what_if_fields():
+    for key in [k for k in st.session_state if str(k).startswith("what_if_field_")]:
+        del st.session_state[key]
+
+
+def add_change(change):
+    st.session_state["what_if_changes"] = st.session_state["what_if_changes"] + [change]
+
+
+def undo_change():
+    st.session_state["what_if_changes"] = st.session_state["what_if_changes"][:-1]
+    reset_what_if_fields()
+
+
+def clear_changes():
+    st.session_state["what_if_changes"] = []
+    reset_what_if_fields()
+
+
+def show_impact(impact):
+    i1, i2, i3, i4 = st.columns(4)
+    i1.metric("New Conflicts", len(impact.new))
+    i2.metric("Resolved Conflicts", len(impact.resolved))
+    i3.metric("Professors Affected", len(impact.hours))
+    i4.metric("Rooms Affected", len(impact.rooms))
+    for title, frame in [
+        ("New conflicts", impact.new),
+        ("Resolved conflicts", impact.resolved),
+        ("Occupancy changes", impact.occupancy),
+        ("Professor hours", impact.hours),
+        ("Room usage", impact.rooms),
+    ]:
+        if len(frame):
+            st.markdown(f"**{title}**")
+            st.dataframe(frame, use_container_width=True, hide_index=True)
+
+
+# Exams are picked within one formation, so only that formation's exams are sent to the browser
+what_if_formations = timelines.names["Formation"]
+p1, p2 = st.columns([1, 2])
+what_if_formation = p1.selectbox(
+    "Formation", sorted(what_if_formations, key=what_if_formations.get), format_func=what_if_formations.get,
+    key="what_if_formation",
+)
+what_if_exam = p2.selectbox(
+    "Exam", timelines.exams_of("Formation", what_if_formation), format_func=timelines.label,
+    key=f"what_if_exam_{what_if_formation}",
+)
+if what_if_exam is not None:
+    current = timelines.current(what_if_exam, changes)
+    rooms = [None] + list(timelines.room_names)
+    professors = [None] + list(timelines.professor_names)
+    w1, w2, w3, w4, w5 = st.columns(5)
+    new_date = w1.date_input("Date", current.start.date(), key=f"what_if_field_date_{what_if_exam}")
+    new_time = w2.time_input(
+        "Start", current.start.time(), step=datetime.timedelta(minutes=15), key=f"what_if_field_time_{what_if_exam}"
+    )
+    # Bounds widened to the published duration so an unusual exam still opens unchanged
+    new_duration = w3.number_input(
+        "Duration (min)", min_value=min(15, current.duration), max_value=max(480, current.duration), step=15,
+        value=current.duration, key=f"what_if_field_duration_{what_if_exam}",
+    )
+    new_room = w4.selectbox(
+        "Room", rooms, index=rooms.index(current.salle_id) if current.salle_id in rooms else 0,
+        format_func=lambda room: timelines.room_names.get(room, "—"), key=f"what_if_field_room_{what_if_exam}",
+    )
+    new_prof = w5.selectbox(
+        "Professor", professors, index=professors.index(current.prof_id) if current.prof_id in professors else 0,
+        format_func=lambda prof: timelines.professor_names.get(prof, "—"), key=f"what_if_field_prof_{what_if_exam}",
+    )
+    candidate = what_if.Change(
+        what_if_exam, datetime.datetime.combine(new_date, new_time), int(new_duration), new_room, new_prof
+    )
+    if candidate != current:
+        start = time.perf_counter()
+        impact = timelines.evaluate(changes + [candidate], baseline=changes)
+        st.caption(f"This change, scored in {(time.perf_counter() - start) * 1000:.1f} ms")
+        show_impact(impact)
+        st.button("➕ Add to change set", on_click=add_change, args=(candidate,), key="what_if_add")
+
+if changes:
+    start = time.perf_counter()
+    impact = timelines.evaluate(changes)
+    st.markdown(f"**Change set: {len(changes)} change(s)**")
+    st.caption(f"Compared to the published timetable, scored in {(time.perf_counter() - start) * 1000:.1f} ms")
+    st.dataframe(
+        [
+            {
+                "Exam": timelines.label(c.exam_id),
+                "Start": c.start.strftime("%Y-%m-%d %H:%M"),
+                "Duration": c.duration,
+                "Room": timelines.room_names.get(c.salle_id, "—"),
+                "Professor": timelines.professor_names.get(c.prof_id, "—"),
+            }
+            for c in changes
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    show_impact(impact)
+    b1, b2, b3 = st.columns(3)
+    b1.button("↩️ Undo last change", on_click=undo_change, key="what_if_undo")
+    b2.button("🗑️ Clear change set", on_click=clear_changes, key="what_if_clear")
+    b3.download_button(
+        "⬇️ Download change set (JSON)",
+        json.dumps(timelines.export(changes), ensure_ascii=False),
+        file_name=f"what_if_v{snapshot.version}.json",
+        mime="application/json",
+        on_click="ignore",
+        key="what_if_download",
+    )
+
+# ---------------- STUDENT TIMETABLES EXPORT ----------------
+# One CSV and one .ics per student, zipped; only built once the download is clicked
+# and spooled to disk past EXPORT_SPOOL_BYTES while it is written
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+st.subheader("📦 Student Timetables Export")
+formation_names = {f["id"]: f["nom"] for f in snapshot.get("formations")}
+export_formations = st.multiselect(
+    "Formations",
+    list(formation_names),
+    format_func=formation_names.get,
+    placeholder="All formations",
+    key="export_formations",
+)
+
+
+def build_export(formation_ids=export_formations or None):
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as spool:
+        export_zip(snapshot, spool, formation_ids)
+        spool.seek(0)
+        # streamlit serves downloads from memory: the finished zip is the one copy held there
+        return spool.read()
+
+
+st.download_button(
+    "⬇️ Download timetables (CSV + iCalendar)",
+    build_export,
+    file_name=f"student_timetables_v{snapshot.version}.zip",
+    mime="application/zip",
+    on_click="ignore",
+    key="export_download",
+)
+
+timings.show_panel()
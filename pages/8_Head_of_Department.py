@@ -1,72 +1,45 @@
 import streamlit as st
-import pandas as pd
-from mock_data import (
-    exam_schedule,
-    modules,
-    formations,
-    departments,
-    rooms,
-    professors,
-    department_conflicts
-)
+import mock_data
+import timings
+from conflicts import department_conflicts
+from cube import exam_cube
+from filter_index import filter_index
+from grid import paginated_dataframe
+from student_load import student_load
 
 st.set_page_config(layout="wide")
+timings.start_rerun()
 
 st.title("🎓 Head of Department")
 
 # ---------------- PREPARE DATA ----------------
-# Load raw data
-df_exams = pd.DataFrame(exam_schedule)
-df_modules = pd.DataFrame(modules)
-df_formations = pd.DataFrame(formations)
-df_depts = pd.DataFrame(departments)
-df_rooms = pd.DataFrame(rooms)
-df_profs = pd.DataFrame(professors)
-
-# Joins
-master_df = pd.merge(df_exams, df_modules, left_on="module_id", right_on="id")
-# Join formations with suffix to avoid 'name' collision
-master_df = pd.merge(master_df, df_formations, left_on="formation_id", right_on="id", suffixes=("", "_form"))
-# Join depts with suffix
-master_df = pd.merge(master_df, df_depts, left_on="dept_id", right_on="id", suffixes=("", "_dept"))
-# Join rooms with suffix
-master_df = pd.merge(master_df, df_rooms, left_on="salle_id", right_on="id", suffixes=("", "_salle"))
-# Join profs with suffix
-master_df = pd.merge(master_df, df_profs, left_on="prof_id", right_on="id", suffixes=("", "_prof"))
-
-# Rename columns for clear usage
-master_df = master_df.rename(columns={
-    "nom_dept": "Department",
-    "nom_form": "Formation",
-    "nom": "Module",
-    "nom_salle": "Room",
-    "nom_prof": "Professor",
-    "date_heure": "Date",
-    "duree_minutes": "Duration"
-})
-master_df["Time"] = pd.to_datetime(master_df["Date"]).dt.time
-master_df["Date"] = pd.to_datetime(master_df["Date"]).dt.date
+# Timetable index and aggregate cube, built once per data version and shared by every page
+snapshot = mock_data.snapshot()
+index = filter_index(snapshot)
+cube = exam_cube(snapshot)
 
 
 # ---------------- DEPARTMENT SELECTION ----------------
 st.sidebar.header("Configuration")
-dept_list = sorted(master_df["Department"].unique().tolist())
+dept_list = index.options["Department"]
 selected_dept = st.sidebar.selectbox("Select your Department", dept_list)
 
-# Filter data for this department
-dept_df = master_df[master_df["Department"] == selected_dept]
+dept_df = index.filter(Department=selected_dept)
+by_formation = cube.rollup("Formation", Department=selected_dept)
 
 st.subheader(f"Department Management: {selected_dept}")
 
 # ---------------- TABS ----------------
-tab1, tab2, tab3 = st.tabs(["✅ Validation", "📊 Statistics", "⚠️ Conflicts by Formation"])
+tab1, tab2, tab3, tab4 = st.tabs(["✅ Validation", "📊 Statistics", "⚠️ Conflicts by Formation", "🧑‍🎓 Student Load"])
 
 with tab1:
     st.header("Timetable Validation")
     
-    st.dataframe(
-        dept_df[["Formation", "Module", "Date", "Time", "Room", "Professor", "Duration"]].sort_values(["Date", "Time"]),
-        use_container_width=True
+    paginated_dataframe(
+        dept_df,
+        key="hod_validation",
+        columns=["Formation", "Module", "Date", "Time", "Room", "Professor", "Duration"],
+        order=index.sorter(Department=selected_dept),
     )
     
     col1, col2 = st.columns(2)
@@ -85,54 +58,71 @@ with tab2:
     
     c1, c2, c3 = st.columns(3)
     
-    num_formations = dept_df["Formation"].nunique()
-    num_modules = dept_df["Module"].nunique()
-    num_exams = len(dept_df)
+    num_formations = int((by_formation["exams"] > 0).sum())
+    num_modules = cube.modules(Department=selected_dept)
+    num_exams = int(by_formation["exams"].sum())
     
     c1.metric("Formations", num_formations)
     c2.metric("Modules", num_modules)
     c3.metric("Total Exams", num_exams)
     
     # Chart: Exams per Formation
-    exams_per_form = dept_df["Formation"].value_counts().reset_index()
-    exams_per_form.columns = ["Formation", "Exam Count"]
+    exams_per_form = by_formation.loc[by_formation["exams"] > 0, ["exams"]]
+    exams_per_form.columns = ["Exam Count"]
     
-    st.bar_chart(exams_per_form.set_index("Formation"))
+    st.bar_chart(exams_per_form)
 
 with tab3:
     st.header("Conflicts by Formation")
     
-    # Simulate conflict detection logic for the selected department
-    # For now, we simulate this based on the 'department_conflicts' mock data
-    # but theoretically we would check overlap here.
-    
-    # 1. Simple Check: Do any exams in the SAME formation overlap?
-    # (Mock logic: grouping by formation, date, time and counting > 1)
-    
-    conflicts_found = []
-    
-    for formation in dept_df["Formation"].unique():
-        form_exams = dept_df[dept_df["Formation"] == formation]
-        # Check for duplicates in Date + Time
-        overlaps = form_exams[form_exams.duplicated(subset=["Date", "Time"], keep=False)]
-        
-        if not overlaps.empty:
-            conflicts_found.append({
-                "Formation": formation,
-                "Type": "Time Overlap",
-                "Details": f"{len(overlaps)} exams at the same time"
-            })
-            
-    # Also pull from the global mock data
-    mock_conflict = next((item for item in department_conflicts if item["department"] == selected_dept), None)
-    
-    if mock_conflict and mock_conflict["conflicts"] > 0:
-        st.warning(f"Central system detects {mock_conflict['conflicts']} conflicts for this department.")
+    # Exams of this department whose time slots overlap another exam of the
+    # same formation, professor or room (counted in the cube once per data version)
+    dept_conflict_count = int(by_formation["conflicts"].sum())
+
+    if dept_conflict_count == 0:
+        st.success("No overlapping exams detected for this department.")
     else:
-        st.success("No major conflicts reported by the central system.")
+        st.warning(f"{dept_conflict_count} conflicts detected for this department.")
+
+    form_conflicts = by_formation.loc[by_formation["formation_conflicts"] > 0, ["formation_conflicts"]]
 
-    if conflicts_found:
+    if not form_conflicts.empty:
         st.error("Conflicts detected within formations:")
-        st.table(pd.DataFrame(conflicts_found))
+        summary = form_conflicts.reset_index().rename(columns={"formation_conflicts": "Overlapping Exams"})
+        summary["Type"] = "Time Overlap"
+        st.table(summary)
     else:
         st.info("No direct time overlaps detected in formations.")
+
+    if dept_conflict_count:
+        dept_conflicts = department_conflicts(snapshot, selected_dept)
+        with timings.span("render", "department_conflicts", rows=len(dept_conflicts)):
+            st.dataframe(
+                dept_conflicts.drop(columns=["exam_id", "other_exam_id", "dept_id", "Department"]),
+                use_container_width=True
+            )
+
+with tab4:
+    st.header("Student Load")
+
+    load = student_load(snapshot)
+    l1, l2, l3 = st.columns(3)
+    l1.metric("Students with 2+ Exams a Day", load.students_with("Max Exams/Day", 2, department=selected_dept))
+    l2.metric("Students with Back-to-Back Exams", load.students_with("Back-to-Back", 1, department=selected_dept))
+    l3.metric(
+        "Students with Overlapping Exams",
+        int(load.distribution("Min Gap (min)", department=selected_dept)["Overlap"]),
+    )
+
+    c_day, c_gap = st.columns(2)
+    with c_day:
+        st.caption("Students by most exams in one day")
+        st.bar_chart(load.distribution("Max Exams/Day", department=selected_dept))
+    with c_gap:
+        st.caption("Students by shortest rest between two exams")
+        st.bar_chart(load.distribution("Min Gap (min)", department=selected_dept))
+
+    st.caption("Heaviest formations")
+    st.dataframe(load.worst(department=selected_dept).drop(columns=["Department"]), use_container_width=True)
+
+timings.show_panel()
@@ -0,0 +1,34 @@
+import streamlit as st
+import mock_data
+import timings
+from schema import memory_report, process_rss
+
+st.set_page_config(layout="wide")
+timings.start_rerun()
+
+st.title("🧠 Memory Debug")
+
+# ---------------- PREPARE DATA ----------------
+# Everything listed here is shared by every session of this process, so
+# these numbers (and the process RSS) should not grow with the session count.
+snapshot = mock_data.snapshot()
+report = memory_report(snapshot)
+rss = process_rss()
+
+# ---------------- METRICS ----------------
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Snapshot Version", snapshot.version)
+c2.metric("Snapshot Age (s)", int(snapshot.age))
+c3.metric("Cached Data (MB)", f"{report['Bytes'].sum() / 1e6:.2f}")
+c4.metric("Process RSS (MB)", f"{rss / 1e6:.1f}" if rss else "n/a")
+
+# ---------------- CACHED FRAMES ----------------
+st.subheader("📦 Cached Collections & Derived Frames")
+st.dataframe(report, use_container_width=True, hide_index=True)
+
+st.caption(
+    "Indexes built on top of the master timetable only count their own "
+    "arrays; the timetable itself is listed once."
+)
+
+timings.show_panel()
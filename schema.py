@@ -0,0 +1,105 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# ---------------- SCHEMA ----------------
+# Foreign keys fit comfortably in 32 bits
+ID_COLUMNS = ("id", "exam_id", "module_id", "formation_id", "dept_id", "salle_id", "prof_id")
+# Labels repeated across many rows are stored once as categories
+LABEL_COLUMNS = ("Department", "Formation", "Module", "Professor", "Room", "Date", "Time")
+# Whole numbers that turn float while a value is missing
+COUNT_COLUMNS = ("Capacity", "Duration")
+
+
+def compact(frame):
+    """Cast ``frame`` to the shared compact dtypes, in place, and return it.
+
+    Id columns without missing values become int32, counts without missing
+    values int64, and repeated labels become categoricals. Timestamps are
+    parsed to datetime64 by whoever builds the frame, once.
+    """
+    for column in ID_COLUMNS:
+        if column in frame and frame[column].notna().all():
+            frame[column] = frame[column].astype(np.int32)
+    for column in COUNT_COLUMNS:
+        if column in frame and frame[column].notna().all():
+            frame[column] = frame[column].astype(np.int64)
+    for column in LABEL_COLUMNS:
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+def concat(frames):
+    """Stack compact frames with the same columns, keeping labels categorical.
+
+    Categories are merged instead of letting ``pd.concat`` fall back to
+    plain objects when they differ.
+    """
+    columns = frames[0].columns
+    labels = [column for column in columns if column in LABEL_COLUMNS]
+    combined = pd.concat([frame.drop(columns=labels) for frame in frames], ignore_index=True)
+    for column in labels:
+        parts = [frame[column] for frame in frames]
+        try:
+            combined[column] = union_categoricals(parts, ignore_order=True)
+        except TypeError:
+            # Categories of different dtypes, e.g. an all-missing column
+            combined[column] = pd.concat([part.astype(object) for part in parts], ignore_index=True).astype("category")
+    return combined[columns]
+
+
+# ---------------- MEMORY ----------------
+def nbytes(value):
+    """Approximate resident bytes of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "nbytes"):
+        # Indexes report what they hold on top of the shared master timetable
+        return int(value.nbytes)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def rows(value):
+    return len(value) if hasattr(value, "__len__") else None
+
+
+def memory_report(snapshot):
+    """One row per collection and derived structure cached on ``snapshot``."""
+    entries = []
+    for name in snapshot.loaded():
+        value = snapshot.get(name)
+        entries.append(("collection", name, type(value).__name__, rows(value), nbytes(value)))
+    for key, value in snapshot.derived_items():
+        entries.append(("derived", str(key), type(value).__name__, rows(value), nbytes(value)))
+    report = pd.DataFrame(entries, columns=["Kind", "Name", "Type", "Rows", "Bytes"])
+    report["MB"] = (report["Bytes"] / 1e6).round(2)
+    return report.sort_values("Bytes", ascending=False, ignore_index=True)
+
+
+def process_rss():
+    """Current resident set size of this process in bytes (None if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
@@ -0,0 +1,189 @@
+"""Seats for every exam, spread over as many free rooms as its formation needs.
+
+Exams are taken by start time. At each start, every exam keeps the room it
+is booked in (when free) and the rest of its students go to the smallest
+free room that holds them all, or else the largest free room, over and
+over. Free capacities are kept in one sorted list, so each pick is a
+binary search. A room is free again once the exam it hosts has ended;
+rooms of capacity 0 are never handed out.
+
+Students of a formation are numbered in id order; each room gets a
+contiguous range of those seat numbers.
+"""
+import bisect
+import os
+
+import numpy as np
+import pandas as pd
+
+from timetable import formation_sizes, master_timetable
+
+# Students one invigilator can watch; every room students sit in needs at least one
+STUDENTS_PER_INVIGILATOR = int(os.environ.get("EXAM_SCHEDULER_STUDENTS_PER_INVIGILATOR", 20))
+
+COLUMNS = [
+    "exam_id", "Module", "Formation", "salle_id", "Room", "Capacity", "Seats", "Seat From", "Seat To",
+    "First Student", "Last Student", "Invigilators", "Start", "End", "Duration",
+]
+
+
+def _minutes(values):
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+def allocate(starts, ends, demands, booked, capacities):
+    """Rooms and seat counts for each exam.
+
+    ``starts`` / ``ends`` are minutes, ``demands`` the students sitting each
+    exam and ``booked`` the position (in ``capacities``) of the room each
+    exam is booked in, -1 for none. Exams must be sorted by start.
+    Returns ``(exam, room, seats)`` position arrays, one entry per room used.
+    """
+    # Rooms without a seat stay busy for good, so no 0-seat row is produced for them
+    busy_until = np.where(capacities > 0, np.iinfo(np.int64).min, np.iinfo(np.int64).max)
+    exams, rooms, seats = [], [], []
+    boundaries = np.flatnonzero(np.diff(starts)) + 1
+    for group in np.split(np.arange(len(starts)), boundaries):
+        if not len(group):
+            continue
+        start = starts[group[0]]
+        free = busy_until <= start
+        # Booked rooms first, for the exam that booked them
+        primary = {}
+        for exam in group:
+            room = booked[exam]
+            if room >= 0 and free[room]:
+                primary[exam] = room
+                free[room] = False
+        order = np.flatnonzero(free)
+        order = order[np.argsort(capacities[order], kind="stable")]
+        caps, positions = capacities[order].tolist(), order.tolist()
+
+        # Largest cohorts first while the big rooms are still there
+        for exam in group[np.argsort(-demands[group], kind="stable")]:
+            remaining = demands[exam]
+            if exam in primary:
+                room = primary[exam]
+                taken = min(remaining, capacities[room])
+                exams.append(exam), rooms.append(room), seats.append(taken)
+                busy_until[room] = ends[exam]
+                remaining -= taken
+            while remaining > 0 and caps:
+                i = bisect.bisect_left(caps, remaining)
+                if i == len(caps):
+                    i -= 1
+                cap, room = caps.pop(i), positions.pop(i)
+                taken = min(remaining, cap)
+                exams.append(exam), rooms.append(room), seats.append(taken)
+                busy_until[room] = ends[exam]
+                remaining -= taken
+    return np.array(exams, dtype=np.int64), np.array(rooms, dtype=np.int64), np.array(seats, dtype=np.int64)
+
+
+def build_seat_allocation(snapshot):
+    master = master_timetable(snapshot)
+    rooms = pd.DataFrame(snapshot.get("rooms"), columns=["id", "nom", "capacite"])
+    capacities = rooms["capacite"].fillna(0).to_numpy(dtype=np.int64)
+    demands = master["formation_id"].map(formation_sizes(snapshot)).fillna(0).to_numpy(dtype=np.int64)
+    booked = pd.Index(rooms["id"]).get_indexer(master["salle_id"])
+
+    # The master timetable is sorted by start already
+    starts = _minutes(master["Start"].to_numpy())
+    exam, room, seats = allocate(starts, _minutes(master["End"].to_numpy()), demands, booked, capacities)
+
+    # Seat ranges run on in allocation order within each exam
+    order = np.lexsort((np.arange(len(exam)), exam))
+    exam, room, seats = exam[order], room[order], seats[order]
+    first = np.ones(len(exam), dtype=bool)
+    first[1:] = exam[1:] != exam[:-1]
+    seat_to = np.cumsum(seats)
+    seat_to -= np.repeat(seat_to[first] - seats[first], np.diff(np.append(np.flatnonzero(first), len(exam))))
+    seat_from = seat_to - seats + 1
+
+    # Student ids of those seats: students sorted by (formation, id)
+    students = snapshot.get("students")
+    ids = students["id"].to_numpy()
+    formations = students["formation_id"].to_numpy()
+    by_formation = np.lexsort((ids, formations))
+    sorted_ids, sorted_formations = ids[by_formation], formations[by_formation]
+    formation = master["formation_id"].to_numpy()[exam]
+    offset = np.searchsorted(sorted_formations, formation)
+    seated = seats > 0
+    # One spare entry so empty rooms (no seat) still index something
+    lookup = np.append(sorted_ids, 0)
+    first_student = lookup[np.minimum(offset + seat_from - 1, len(ids))]
+    last_student = lookup[np.minimum(offset + seat_to - 1, len(ids))]
+
+    rows = master.iloc[exam]
+    return pd.DataFrame({
+        "exam_id": rows["exam_id"].to_numpy(),
+        "Module": rows["Module"].array,
+        "Formation": rows["Formation"].array,
+        "salle_id": rooms["id"].to_numpy()[room],
+        "Room": rooms["nom"].to_numpy()[room],
+        "Capacity": capacities[room],
+        "Seats": seats,
+        "Seat From": np.where(seated, seat_from, 0),
+        "Seat To": np.where(seated, seat_to, 0),
+        "First Student": pd.Series(first_student).where(seated).astype("Int64"),
+        "Last Student": pd.Series(last_student).where(seated).astype("Int64"),
+        # Nobody to watch in a room no student sits in
+        "Invigilators": np.where(seats > 0, -(-seats // STUDENTS_PER_INVIGILATOR), 0),
+        "Start": rows["Start"].to_numpy(),
+        "End": rows["End"].to_numpy(),
+        "Duration": rows["Duration"].to_numpy(),
+    }, columns=COLUMNS)
+
+
+def seat_allocation(snapshot):
+    """One row per (exam, room) used, with the seat range it holds; built once per version."""
+    return snapshot.derived("seat_allocation", build_seat_allocation)
+
+
+def build_exam_seating(snapshot):
+    master = master_timetable(snapshot)
+    allocation = seat_allocation(snapshot)
+    per_exam = allocation.groupby("exam_id").agg(
+        Rooms=("salle_id", "size"),
+        Seated=("Seats", "sum"),
+        Seat_Capacity=("Capacity", "sum"),
+        Invigilators=("Invigilators", "sum"),
+    )
+    demand = master["formation_id"].map(formation_sizes(snapshot)).fillna(0).astype("int64")
+    per_exam = per_exam.reindex(master["exam_id"].to_numpy(), fill_value=0)
+    per_exam["Unseated"] = demand.to_numpy() - per_exam["Seated"].to_numpy()
+    # Rooms of one exam are contiguous in the allocation
+    exam_ids = allocation["exam_id"].to_numpy()
+    first = np.ones(len(exam_ids), dtype=bool)
+    first[1:] = exam_ids[1:] != exam_ids[:-1]
+    bounds = np.append(np.flatnonzero(first), len(exam_ids))
+    names = allocation["Room"].tolist()
+    room_list = pd.Series(
+        [", ".join(names[a:b]) for a, b in zip(bounds[:-1], bounds[1:])], index=exam_ids[bounds[:-1]], dtype=object
+    )
+    per_exam["Room List"] = room_list.reindex(per_exam.index).fillna("")
+    return per_exam
+
+
+def exam_seating(snapshot):
+    """Rooms, seats, invigilators and unseated students per exam id, built once per version."""
+    return snapshot.derived("exam_seating", build_exam_seating)
+
+
+def build_admin_timetable(snapshot):
+    master = master_timetable(snapshot)
+    master["Formation_Size"] = master["formation_id"].map(formation_sizes(snapshot)).fillna(0)
+    master = master.join(exam_seating(snapshot), on="exam_id")
+    master["Capacity"] = master["Seat_Capacity"]
+    # No seat offered (no free room, or rooms of capacity 0): occupancy is unknown, not infinite
+    master["Occupancy"] = master["Formation_Size"] / master["Capacity"].where(master["Capacity"] > 0)
+    master["Duration (min)"] = master["Duration"]
+    return master
+
+
+def admin_timetable(snapshot):
+    """The master timetable with formation size, seat allocation and occupancy per exam, built once per version.
+
+    Shared by every Exam Admin session: treat it as read-only.
+    """
+    return snapshot.derived("admin_timetable", build_admin_timetable)
@@ -0,0 +1,302 @@
+"""Snapshot shared by several Streamlit processes through memory-mapped Arrow files.
+
+    python shared_snapshot.py --dir /dev/shm/exam_scheduler
+    EXAM_SCHEDULER_SHARED_DIR=/dev/shm/exam_scheduler streamlit run app.py --server.port 8501
+    EXAM_SCHEDULER_SHARED_DIR=/dev/shm/exam_scheduler streamlit run app.py --server.port 8502
+
+One publisher process talks to the backend (change feed and disk cache
+included) and writes every collection, plus the derived frames every page
+starts from, as uncompressed Arrow IPC files. Each version goes to its own
+``v<version>`` directory; ``manifest.json``, replaced atomically once every
+file is in place, names the current one.
+
+Worker processes never call the backend. They map the files read-only and
+wrap them as DataFrames without copying numeric and date columns, so the
+bulk of the data lives once in the page cache whatever the worker count.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+import timings
+from conflicts import exam_conflicts
+from data_loader import DEFAULT_URL, ENDPOINTS, FetchResult
+from data_store import DEFAULT_TTL, RETRY_DELAY, DataStore, Snapshot
+from disk_cache import DEFAULT_DIR as CACHE_DIR, DiskCache
+from timetable import formation_sizes, master_timetable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "shared")
+MANIFEST = "manifest.json"
+# Versions kept on disk; older ones are deleted (workers still mapping them keep their pages)
+KEEP = 3
+# Seconds between two looks at the manifest from a worker
+POLL = 5
+# Seconds a worker waits for a first version to be published
+WAIT = 60
+
+# Derived frames built once by the publisher: key -> function building it on a snapshot
+DERIVED = {
+    "master_timetable": master_timetable,
+    "exam_conflicts": exam_conflicts,
+    "formation_sizes": formation_sizes,
+}
+
+_VERSION_DIR = re.compile(r"^v(\d+)$")
+
+
+# ---------------- FILES ----------------
+def _to_table(value):
+    """``(table, kind)`` for a collection or derived value."""
+    if isinstance(value, pd.Series):
+        return pa.Table.from_pandas(value.to_frame(name="value")), "series"
+    if isinstance(value, pd.DataFrame):
+        return pa.Table.from_pandas(value), "frame"
+    return pa.Table.from_pylist(value), "records"
+
+
+def _write(directory, name, value):
+    """Write ``value`` to ``directory``; returns its manifest entry."""
+    try:
+        table, kind = _to_table(value)
+    except (pa.ArrowException, TypeError, ValueError):
+        # Heterogeneous payloads can't be typed as columns; they stay JSON
+        path = os.path.join(directory, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        return {"file": os.path.basename(path), "kind": "json", "rows": len(value)}
+
+    # Uncompressed, or the buffers could not be used in place
+    path = os.path.join(directory, f"{name}.arrow")
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return {"file": os.path.basename(path), "kind": kind, "rows": table.num_rows}
+
+
+def _map(directory, entry):
+    """The file behind ``entry``, mapped (Arrow) or decoded (JSON)."""
+    path = os.path.join(directory, entry["file"])
+    if entry["kind"] == "json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def _wrap(value, kind):
+    """A mapped table as the type the rest of the app expects."""
+    if kind == "frame":
+        # split_blocks keeps each column on its own buffer instead of
+        # consolidating (copying) same-typed columns into one block
+        return value.to_pandas(split_blocks=True)
+    if kind == "series":
+        return value.to_pandas(split_blocks=True)["value"].rename(None)
+    if kind == "records":
+        return value.to_pylist()
+    return value
+
+
+# ---------------- PUBLISHER ----------------
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(snapshot, directory, keep=KEEP):
+    """Write ``snapshot`` as the next version in ``directory``; returns its manifest.
+
+    Readers only ever see complete versions: files go to a temporary
+    directory renamed into place, then the manifest is swapped.
+    """
+    os.makedirs(directory, exist_ok=True)
+    snapshot.prefetch(list(ENDPOINTS))
+    try:
+        version = read_manifest(directory)["version"] + 1
+    except (OSError, ValueError, KeyError):
+        version = 1
+
+    path = f"v{version:06d}"
+    tmp = os.path.join(directory, f"{path}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    collections = {name: _write(tmp, name, snapshot.get(name)) for name in ENDPOINTS}
+    derived = {key: _write(tmp, key, build(snapshot)) for key, build in DERIVED.items()}
+    os.replace(tmp, os.path.join(directory, path))
+
+    manifest = {
+        "version": version,
+        "path": path,
+        "published_at": time.time(),
+        "sync_version": snapshot.sync_version,
+        "collections": collections,
+        "derived": derived,
+    }
+    tmp = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+    _clean(directory, keep)
+    return manifest
+
+
+def _clean(directory, keep):
+    versions = sorted(
+        (int(match.group(1)), name)
+        for name in os.listdir(directory)
+        if (match := _VERSION_DIR.match(name))
+    )
+    for _, name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+# ---------------- WORKERS ----------------
+def open_snapshot(directory, manifest):
+    """The snapshot described by ``manifest``, served from its mapped files.
+
+    Every file is mapped up front, so the version stays readable after the
+    publisher deletes it. Collections are wrapped on first use, like
+    fetched ones; the published derived frames are seeded right away.
+    """
+    root = os.path.join(directory, manifest["path"])
+    collections = manifest["collections"]
+    mapped = {name: _map(root, entry) for name, entry in collections.items()}
+
+    def load(names):
+        result = FetchResult(sync_version=manifest.get("sync_version"))
+        for name in names:
+            if name not in mapped:
+                raise KeyError(f"{name!r} is not in shared snapshot v{manifest['version']}")
+            start = time.perf_counter()
+            with timings.span("decode", name) as span:
+                result.data[name] = _wrap(mapped[name], collections[name]["kind"])
+                span.rows = len(result.data[name])
+            result.latencies[name] = time.perf_counter() - start
+        return result
+
+    snapshot = Snapshot(manifest["version"], load)
+    snapshot.created_at = manifest["published_at"]
+    snapshot.sync_version = manifest.get("sync_version")
+    for key, entry in manifest["derived"].items():
+        snapshot.seed(key, _wrap(_map(root, entry), entry["kind"]))
+    return snapshot
+
+
+class SharedStore:
+    """Read-only stand-in for ``DataStore`` serving what a publisher wrote to ``directory``.
+
+    The manifest is looked at again at most every ``poll`` seconds; a new
+    version is swapped in as soon as it is seen.
+    """
+
+    def __init__(self, directory, poll=POLL, wait=WAIT):
+        self.directory = directory
+        self.poll = poll
+        self.wait = wait
+        self.last_error = None
+        self._current = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _check(self):
+        with self._lock:
+            if time.time() < self._next_check and self._current is not None:
+                return
+            self._next_check = time.time() + self.poll
+            deadline = time.time() + self.wait
+            while True:
+                try:
+                    manifest = read_manifest(self.directory)
+                    if self._current is None or manifest["version"] != self._current.version:
+                        self._current = open_snapshot(self.directory, manifest)
+                        logger.info("mapped shared snapshot v%d", manifest["version"])
+                    self.last_error = None
+                    return
+                except (OSError, ValueError, KeyError, pa.ArrowException) as exc:
+                    self.last_error = exc
+                    if self._current is not None:
+                        logger.warning("keeping shared snapshot v%d: %s", self._current.version, exc)
+                        return
+                    if time.time() >= deadline:
+                        raise FileNotFoundError(
+                            f"no snapshot published in {self.directory}; start `python shared_snapshot.py`"
+                        ) from exc
+                    time.sleep(0.5)
+
+    @property
+    def latencies(self):
+        return self.snapshot().latencies
+
+    def snapshot(self):
+        if self._current is None or time.time() >= self._next_check:
+            self._check()
+        return self._current
+
+    def get(self, name):
+        return self.snapshot().get(name)
+
+    def prefetch(self, names):
+        self.snapshot().prefetch(names)
+
+    def refresh(self, wait=False):
+        """Look for a newer published version now."""
+        self._next_check = 0.0
+        self.snapshot()
+
+    # The publisher refreshes; nothing runs in the background here
+    def start_refresher(self):
+        pass
+
+    def stop_refresher(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=os.environ.get("EXAM_SCHEDULER_SHARED_DIR", DEFAULT_DIR))
+    parser.add_argument("--url", default=os.environ.get("EXAM_SCHEDULER_URL", DEFAULT_URL))
+    parser.add_argument("--interval", type=float, default=DEFAULT_TTL, help="seconds between two refreshes")
+    parser.add_argument("--keep", type=int, default=KEEP, help="versions kept on disk")
+    parser.add_argument("--once", action="store_true", help="publish one version and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Refreshes are driven from here rather than by the store's own thread
+    store = DataStore(
+        args.url,
+        ttl=0,
+        cache=DiskCache(os.environ.get("EXAM_SCHEDULER_CACHE_DIR", CACHE_DIR)),
+        delta_sync=os.environ.get("EXAM_SCHEDULER_DELTA_SYNC", "1") != "0",
+    )
+    published = None
+    while True:
+        snapshot = store.snapshot()
+        delay = args.interval
+        if snapshot is not published:
+            try:
+                manifest = publish(snapshot, args.dir, args.keep)
+                published = snapshot
+                logger.info("published v%d to %s", manifest["version"], args.dir)
+            except Exception as exc:
+                logger.warning("publish failed: %s", exc)
+                delay = RETRY_DELAY
+        if args.once:
+            return 0 if published is not None else 1
+        if published is snapshot and snapshot.stale:
+            # Served from the disk cache: revalidate right away
+            delay = 0
+        time.sleep(delay)
+        store.refresh(wait=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
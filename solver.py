@@ -0,0 +1,540 @@
+"""Build or repair the exam timetable locally.
+
+    python solver.py --mode repair --out proposed.json
+    python solver.py --mode generate --days 10 --time-limit 20 --out proposed.json
+
+One exam per module is placed on a grid of days x daily slots (the slot
+times the current schedule uses) and given a professor of its department
+and enough rooms for its formation.
+
+- A greedy colouring of the formation / professor conflict graph builds a
+  first timetable: the most constrained exams are placed first, each on
+  the slot that adds the least penalty.
+- Local search then moves the exams still involved in a violation to the
+  best other slot (or hands them to the best other professor), scoring
+  every candidate at once from per-slot count arrays.
+
+An exam counts against every slot that starts before it ends, not only
+its own: slot times closer together than the exams are long still clash.
+
+Penalty terms (see ``WEIGHTS``): formation and professor overlaps, rooms
+needed beyond those available in a slot, professor hours above
+``MAX_PROFESSOR_HOURS``, a formation sitting more than one exam a day and,
+when repairing, every exam moved away from its current slot.
+
+The result is a list of exams in the backend's ``/examens`` shape; nothing
+is sent anywhere.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from analytics import MAX_PROFESSOR_HOURS
+from timetable import build_master_timetable, formation_sizes, master_timetable
+
+# Used when the current schedule has no exams to take slot times from
+DEFAULT_TIMES = (datetime.time(8, 30), datetime.time(10, 45), datetime.time(13, 30), datetime.time(15, 45))
+DEFAULT_DAYS = 12
+DEFAULT_DURATION = 90
+TIME_LIMIT = 10.0
+# Local search iterations without a better timetable before giving up
+PATIENCE = 20_000
+
+# Penalty per unit of each violation
+WEIGHTS = {
+    "formation_overlap": 1000.0,   # per extra exam of a formation in a slot
+    "professor_overlap": 1000.0,   # per extra exam of a professor in a slot
+    "room_overflow": 100.0,        # per room missing in a slot
+    "professor_load": 10.0,        # per hour above the professor limit
+    "exams_per_day": 5.0,          # per extra exam of a formation in a day
+    "moved": 1.0,                  # per exam moved away from its slot (repair)
+}
+
+
+@dataclass
+class Problem:
+    """Arrays describing the exams to place; exams, formations, professors and slots are positions."""
+    exam_ids: np.ndarray
+    module_ids: np.ndarray
+    formation: np.ndarray
+    professor: np.ndarray
+    # Rooms each exam needs for its formation's students
+    rooms: np.ndarray
+    hours: np.ndarray
+    durations: np.ndarray
+    # Slot each exam has in the current schedule, -1 if none
+    current: np.ndarray
+    slot_starts: list
+    slots_per_day: int
+    n_rooms: int
+    n_formations: int
+    prof_ids: np.ndarray
+    # Professor positions an exam can be handed to
+    candidates: list
+    room_ids: list
+    room_capacities: list
+    max_hours: float = MAX_PROFESSOR_HOURS
+    weights: dict = field(default_factory=lambda: dict(WEIGHTS))
+
+    @property
+    def n_slots(self):
+        return len(self.slot_starts)
+
+    @property
+    def n_days(self):
+        return self.n_slots // self.slots_per_day
+
+    @property
+    def slot_minutes(self):
+        return np.array(self.slot_starts, dtype="datetime64[m]").astype(np.int64)
+
+    def reach(self):
+        """``(until, code)``: exam ``e`` started on slot ``s`` covers slots
+        ``s`` to ``until[code[e], s] - 1``, those starting before it ends."""
+        minutes = self.slot_minutes
+        durations, code = np.unique(self.durations, return_inverse=True)
+        until = np.searchsorted(minutes, minutes + durations[:, None], side="left")
+        # An exam holds at least its own slot
+        return np.maximum(until, np.arange(1, self.n_slots + 1)), code
+
+
+@dataclass
+class Solution:
+    exams: list
+    slots: np.ndarray
+    professors: np.ndarray
+    penalty: float
+    breakdown: dict
+    initial_penalty: float
+    initial_breakdown: dict
+    iterations: int
+    seconds: float
+    moved: int
+
+
+# ---------------- PROBLEM ----------------
+def build_problem(snapshot, days=None, start=None, max_hours=MAX_PROFESSOR_HOURS):
+    """The ``Problem`` of scheduling every module of ``snapshot``.
+
+    Modules already scheduled keep their exam id, duration and professor as
+    a starting point; ``start`` and ``days`` default to the span of the
+    current schedule.
+    """
+    modules = pd.DataFrame(snapshot.get("modules"), columns=["id", "formation_id"])
+    formations = pd.DataFrame(snapshot.get("formations"), columns=["id", "dept_id"])
+    professors = pd.DataFrame(snapshot.get("professors"), columns=["id", "dept_id"])
+    rooms = pd.DataFrame(snapshot.get("rooms"), columns=["id", "capacite"])
+    exams = pd.DataFrame(
+        snapshot.get("exam_schedule"), columns=["id", "module_id", "prof_id", "salle_id", "date_heure", "duree_minutes"]
+    )
+    if rooms.empty or professors.empty:
+        raise ValueError("rooms and professors are needed to build a timetable")
+
+    # One exam per module; extra exams of a module are left out
+    exams = exams.drop_duplicates("module_id")
+    exams["start"] = pd.to_datetime(exams["date_heure"])
+    modules = modules[modules["formation_id"].isin(formations["id"])].reset_index(drop=True)
+    scheduled = modules["id"].map(exams.set_index("module_id")["id"])
+
+    times = sorted(set(exams["start"].dt.time)) or list(DEFAULT_TIMES)
+    if start is None:
+        start = exams["start"].min().date() if len(exams) else datetime.date.today() + datetime.timedelta(days=1)
+    if days is None:
+        days = (exams["start"].max().date() - start).days + 1 if len(exams) else DEFAULT_DAYS
+    slot_starts = [
+        datetime.datetime.combine(start + datetime.timedelta(days=day), t) for day in range(days) for t in times
+    ]
+    slot_of = pd.Series(np.arange(len(slot_starts)), index=pd.DatetimeIndex(slot_starts))
+
+    by_module = exams.set_index("module_id")
+    current = modules["id"].map(by_module["start"]).map(slot_of).fillna(-1).to_numpy(dtype=np.int64)
+    durations = modules["id"].map(by_module["duree_minutes"]).fillna(DEFAULT_DURATION).to_numpy(dtype=np.int64)
+
+    # New exams get ids after the largest existing one
+    next_id = int(exams["id"].max()) + 1 if len(exams) else 1
+    missing = scheduled.isna().to_numpy()
+    exam_ids = scheduled.to_numpy(dtype="float64")
+    exam_ids[missing] = np.arange(next_id, next_id + missing.sum())
+
+    formation_index = {f: i for i, f in enumerate(formations["id"].tolist())}
+    formation = modules["formation_id"].map(formation_index).to_numpy(dtype=np.int64)
+    dept_of_formation = formations["dept_id"].to_numpy()
+
+    prof_ids = professors["id"].to_numpy()
+    prof_index = {p: i for i, p in enumerate(prof_ids.tolist())}
+    by_dept = {dept: np.flatnonzero(professors["dept_id"].to_numpy() == dept) for dept in set(professors["dept_id"])}
+    everyone = np.arange(len(prof_ids))
+    candidates = [by_dept.get(dept_of_formation[f], everyone) for f in range(len(formations))]
+    candidates = [c if len(c) else everyone for c in candidates]
+
+    sizes = formation_sizes(snapshot)
+    seats = modules["formation_id"].map(sizes).fillna(0).to_numpy()
+    room_capacity = float(rooms["capacite"].mean()) or 1.0
+    needed = np.maximum(1, np.ceil(seats / room_capacity)).astype(np.int64)
+
+    professor = modules["id"].map(by_module["prof_id"]).map(prof_index).to_numpy(dtype="float64")
+    professor = np.where(np.isnan(professor), -1, professor).astype(np.int64)
+    hours = durations / 60
+    # Exams without a (known) professor go to the least loaded one of their department
+    load = np.bincount(professor[professor >= 0], weights=hours[professor >= 0], minlength=len(prof_ids))
+    for e in np.flatnonzero(professor < 0):
+        pool = candidates[formation[e]]
+        professor[e] = pool[np.argmin(load[pool])]
+        load[professor[e]] += hours[e]
+
+    order = rooms.sort_values("capacite", ascending=False, kind="stable")
+    return Problem(
+        exam_ids=exam_ids.astype(np.int64),
+        module_ids=modules["id"].to_numpy(),
+        formation=formation,
+        professor=professor,
+        rooms=needed,
+        hours=hours,
+        durations=durations,
+        current=current,
+        slot_starts=slot_starts,
+        slots_per_day=len(times),
+        n_rooms=len(rooms),
+        n_formations=len(formations),
+        prof_ids=prof_ids,
+        candidates=[candidates[f] for f in formation],
+        room_ids=order["id"].tolist(),
+        room_capacities=order["capacite"].tolist(),
+        max_hours=max_hours,
+    )
+
+
+# ---------------- PENALTY ----------------
+def _covering(keys, n_keys, slots, until, n_slots, weights=None):
+    """``(n_keys, n_slots)`` sums of ``weights`` (1 by default) of the exams covering each slot, per key."""
+    weights = np.ones(len(slots)) if weights is None else weights
+    steps = np.zeros((n_keys, n_slots + 1))
+    np.add.at(steps, (keys, slots), weights)
+    np.add.at(steps, (keys, until), -weights)
+    return np.rint(np.cumsum(steps, axis=1)[:, :-1]).astype(np.int64)
+
+
+def penalty(problem, slots, professors):
+    """``(total, {term: violations})`` of a complete assignment, vectorized."""
+    n_slots, n_days = problem.n_slots, problem.n_days
+    day = slots // problem.slots_per_day
+    reach, code = problem.reach()
+    until = reach[code, slots]
+    formation_slot = _covering(problem.formation, problem.n_formations, slots, until, n_slots)
+    professor_slot = _covering(professors, len(problem.prof_ids), slots, until, n_slots)
+    formation_day = np.bincount(problem.formation * n_days + day, minlength=problem.n_formations * n_days)
+    rooms = _covering(np.zeros(len(slots), dtype=np.int64), 1, slots, until, n_slots, problem.rooms)[0]
+    hours = np.bincount(professors, weights=problem.hours, minlength=len(problem.prof_ids))
+
+    breakdown = {
+        "formation_overlap": int(np.maximum(formation_slot - 1, 0).sum()),
+        "professor_overlap": int(np.maximum(professor_slot - 1, 0).sum()),
+        "room_overflow": int(np.maximum(rooms - problem.n_rooms, 0).sum()),
+        "professor_load": round(float(np.maximum(hours - problem.max_hours, 0).sum()), 2),
+        "exams_per_day": int(np.maximum(formation_day - 1, 0).sum()),
+        "moved": int(((problem.current >= 0) & (slots != problem.current)).sum()),
+    }
+    total = sum(problem.weights[term] * value for term, value in breakdown.items())
+    return total, breakdown
+
+
+class _State:
+    """Count arrays of an assignment, kept up to date move by move.
+
+    Counts are per slot covered: an exam adds to every slot from its own
+    to the last one starting before it ends.
+    """
+
+    def __init__(self, problem, slots, professors):
+        self.p = problem
+        self.slots = slots
+        self.professors = professors
+        n_slots, n_days = problem.n_slots, problem.n_days
+        self.formation_slot = np.zeros((problem.n_formations, n_slots), dtype=np.int64)
+        self.professor_slot = np.zeros((len(problem.prof_ids), n_slots), dtype=np.int64)
+        self.formation_day = np.zeros((problem.n_formations, n_days), dtype=np.int64)
+        self.rooms = np.zeros(n_slots, dtype=np.int64)
+        self.hours = np.zeros(len(problem.prof_ids))
+        self.slot_day = np.arange(n_slots) // problem.slots_per_day
+        self.reach, self.code = problem.reach()
+        for e in np.flatnonzero(slots >= 0):
+            self.add(e, slots[e], professors[e])
+
+    def covered(self, e, slot):
+        """Slots exam ``e`` holds when it starts on ``slot``."""
+        return slice(slot, self.reach[self.code[e], slot])
+
+    def add(self, e, slot, professor, sign=1):
+        p = self.p
+        held = self.covered(e, slot)
+        self.formation_slot[p.formation[e], held] += sign
+        self.professor_slot[professor, held] += sign
+        self.formation_day[p.formation[e], self.slot_day[slot]] += sign
+        self.rooms[held] += sign * p.rooms[e]
+        self.hours[professor] += sign * p.hours[e]
+
+    def remove(self, e):
+        self.add(e, self.slots[e], self.professors[e], sign=-1)
+
+    def slot_costs(self, e):
+        """Penalty of putting exam ``e`` (currently removed) on each slot."""
+        p, w = self.p, self.p.weights
+        f, prof = p.formation[e], self.professors[e]
+        until = self.reach[self.code[e]]
+
+        def held(per_slot):
+            # Sum of ``per_slot`` over the slots the exam holds from each start
+            total = np.concatenate([[0], np.cumsum(per_slot)])
+            return total[until] - total[:-1]
+
+        cost = w["formation_overlap"] * held(self.formation_slot[f] >= 1)
+        cost = cost + w["professor_overlap"] * held(self.professor_slot[prof] >= 1)
+        cost = cost + w["exams_per_day"] * (self.formation_day[f][self.slot_day] >= 1)
+        over = np.maximum(self.rooms + p.rooms[e] - p.n_rooms, 0) - np.maximum(self.rooms - p.n_rooms, 0)
+        cost = cost + w["room_overflow"] * held(over)
+        if p.current[e] >= 0:
+            cost = cost + w["moved"] * (np.arange(p.n_slots) != p.current[e])
+        return cost
+
+    def professor_costs(self, e, candidates):
+        """Penalty of giving exam ``e`` (currently removed) to each of ``candidates``."""
+        p, w = self.p, self.p.weights
+        busy = (self.professor_slot[candidates, self.covered(e, self.slots[e])] >= 1).sum(axis=1)
+        hours = self.hours[candidates]
+        over = np.maximum(hours + p.hours[e] - p.max_hours, 0) - np.maximum(hours - p.max_hours, 0)
+        return w["professor_overlap"] * busy + w["professor_load"] * over
+
+    def clashes(self, e):
+        """Whether exam ``e``'s professor has another exam in the slots it holds."""
+        return bool((self.professor_slot[self.professors[e], self.covered(e, self.slots[e])] > 1).any())
+
+    def violating(self):
+        """Exams involved in at least one violation (moves excluded)."""
+        p, slots, profs = self.p, self.slots, self.professors
+        until = self.reach[self.code, slots]
+
+        def held(over, rows):
+            # Whether ``over`` is set in any slot each exam holds, on its row
+            total = np.zeros((len(over), p.n_slots + 1), dtype=np.int64)
+            np.cumsum(over, axis=1, out=total[:, 1:])
+            return total[rows, until] > total[rows, slots]
+
+        bad = held(self.formation_slot > 1, p.formation)
+        bad |= held(self.professor_slot > 1, profs)
+        bad |= self.formation_day[p.formation, self.slot_day[slots]] > 1
+        bad |= held((self.rooms > p.n_rooms)[None], np.zeros(len(slots), dtype=np.int64))
+        bad |= self.hours[profs] > p.max_hours
+        return np.flatnonzero(bad)
+
+
+# ---------------- SEARCH ----------------
+def greedy(problem, rng):
+    """Place every exam, most constrained first (largest formation / professor
+    exam counts), on the cheapest slot given those already placed."""
+    n = len(problem.exam_ids)
+    degree = np.bincount(problem.formation)[problem.formation] + np.bincount(problem.professor)[problem.professor]
+    order = np.lexsort((rng.random(n), -problem.rooms, -degree))
+    slots = np.full(n, -1, dtype=np.int64)
+    state = _State(problem, slots, problem.professor.copy())
+    for e in order:
+        # Ties go to the emptiest slot, then at random
+        cost = state.slot_costs(e) + state.rooms * 1e-3 + rng.random(problem.n_slots) * 1e-6
+        slots[e] = int(np.argmin(cost))
+        state.add(e, slots[e], state.professors[e])
+    return slots
+
+
+def local_search(problem, slots, professors, rng, time_limit=TIME_LIMIT, max_iterations=None, patience=PATIENCE):
+    """Improve ``slots`` / ``professors`` in place; returns the iterations run.
+
+    Stops when nothing is violated any more, at the time limit, or after
+    ``patience`` iterations without a better assignment; the best one seen
+    is what is left in the arrays.
+    """
+    state = _State(problem, slots, professors)
+    deadline = time.perf_counter() + time_limit
+    iterations = since_best = 0
+    # Penalty relative to the start, and the best seen so far
+    cost = best = 0.0
+    best_slots, best_professors = slots.copy(), professors.copy()
+    tabu = {}
+    while time.perf_counter() < deadline and (max_iterations is None or iterations < max_iterations):
+        violating = state.violating()
+        if not len(violating) or since_best >= patience:
+            break
+        iterations += 1
+        since_best += 1
+        e = int(violating[rng.integers(len(violating))])
+        if tabu.get(e, -1) >= iterations:
+            continue
+
+        # Best other slot, ties broken at random
+        state.remove(e)
+        costs = state.slot_costs(e)
+        noisy = costs + rng.random(problem.n_slots) * 1e-3
+        noisy[slots[e]] = np.inf
+        target = int(np.argmin(noisy))
+        # Accept improvements, sideways moves, and now and then a worse one
+        if costs[target] <= costs[slots[e]] or rng.random() < 0.02:
+            cost += costs[target] - costs[slots[e]]
+            slots[e] = target
+            tabu[e] = iterations + 5
+        state.add(e, slots[e], professors[e])
+
+        if state.clashes(e) or state.hours[professors[e]] > problem.max_hours:
+            candidates = problem.candidates[e]
+            state.remove(e)
+            costs = state.professor_costs(e, candidates)
+            pick = int(np.argmin(costs + rng.random(len(candidates)) * 1e-3))
+            here = costs[candidates == professors[e]][0]
+            if costs[pick] < here:
+                cost += costs[pick] - here
+                professors[e] = candidates[pick]
+            state.add(e, slots[e], professors[e])
+
+        if cost < best - 1e-9:
+            best, since_best = cost, 0
+            best_slots[:], best_professors[:] = slots, professors
+
+    if cost > best:
+        slots[:], professors[:] = best_slots, best_professors
+    return iterations
+
+
+def assign_rooms(problem, slots):
+    """First room of each exam, handing out free rooms largest first, slot by slot.
+
+    A room stays busy until the exam it hosts has ended, as in
+    ``seating.allocate``.
+    """
+    minutes = problem.slot_minutes
+    busy_until = np.full(problem.n_rooms, np.iinfo(np.int64).min)
+    first = np.empty(len(slots), dtype=np.int64)
+    for slot in np.unique(slots):
+        exams = np.flatnonzero(slots == slot)
+        # Room positions are in decreasing capacity already
+        free = np.flatnonzero(busy_until <= minutes[slot]).tolist()
+        for e in exams[np.argsort(-problem.rooms[exams], kind="stable")]:
+            end = minutes[slot] + problem.durations[e]
+            taken, free = free[:problem.rooms[e]], free[problem.rooms[e]:]
+            if not taken:
+                # No room left: share the one freed first; the penalty reported it
+                taken = [int(np.argmin(busy_until))]
+            first[e] = problem.room_ids[taken[0]]
+            busy_until[taken] = np.maximum(busy_until[taken], end)
+    return first
+
+
+def solve(problem, mode="repair", time_limit=TIME_LIMIT, seed=0, max_iterations=None):
+    """Timetable for ``problem``: the current one repaired, or a new one generated."""
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    if mode == "repair":
+        slots = problem.current.copy()
+        unplaced = slots < 0
+        if unplaced.any():
+            # Unscheduled exams (or off the grid) are placed greedily around the rest
+            state = _State(problem, slots, problem.professor.copy())
+            for e in np.flatnonzero(unplaced):
+                slots[e] = int(np.argmin(state.slot_costs(e) + state.rooms * 1e-3))
+                state.add(e, slots[e], problem.professor[e])
+    elif mode == "generate":
+        # Still reported, but a new timetable is free to move anything
+        problem = replace(problem, weights=dict(problem.weights, moved=0.0))
+        slots = greedy(problem, rng)
+    else:
+        raise ValueError(f"unknown mode {mode!r}")
+
+    professors = problem.professor.copy()
+    initial_penalty, initial_breakdown = penalty(problem, slots, professors)
+    remaining = max(time_limit - (time.perf_counter() - start), 0)
+    iterations = local_search(problem, slots, professors, rng, remaining, max_iterations)
+    total, breakdown = penalty(problem, slots, professors)
+
+    rooms = assign_rooms(problem, slots)
+    exams = [
+        {
+            "id": int(problem.exam_ids[e]),
+            "module_id": int(problem.module_ids[e]),
+            "prof_id": int(problem.prof_ids[professors[e]]),
+            "salle_id": int(rooms[e]),
+            "date_heure": problem.slot_starts[slots[e]].isoformat(),
+            "duree_minutes": int(problem.durations[e]),
+        }
+        for e in range(len(slots))
+    ]
+    return Solution(
+        exams=exams,
+        slots=slots,
+        professors=professors,
+        penalty=total,
+        breakdown=breakdown,
+        initial_penalty=initial_penalty,
+        initial_breakdown=initial_breakdown,
+        iterations=iterations,
+        seconds=time.perf_counter() - start,
+        moved=breakdown["moved"],
+    )
+
+
+def changes(snapshot, solution):
+    """Exams of ``solution`` that differ from ``snapshot``'s schedule, current and proposed side by side."""
+    current = master_timetable(snapshot)
+    proposed = build_master_timetable(snapshot, exams=solution.exams)
+    both = proposed.merge(
+        current[["exam_id", "Start", "Room", "Professor"]], on="exam_id", how="left", suffixes=("", " (current)")
+    )
+    changed = both[
+        (both["Start"] != both["Start (current)"])
+        | (both["Professor"].astype(str) != both["Professor (current)"].astype(str))
+    ]
+    return pd.DataFrame({
+        "Module": changed["Module"].astype(str),
+        "Formation": changed["Formation"].astype(str),
+        "Current": changed["Start (current)"].dt.strftime("%Y-%m-%d %H:%M").fillna("not scheduled"),
+        "Proposed": changed["Start"].dt.strftime("%Y-%m-%d %H:%M"),
+        "Current Professor": changed["Professor (current)"].astype(str),
+        "Proposed Professor": changed["Professor"].astype(str),
+        "Proposed Room": changed["Room"].astype(str),
+    }).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("repair", "generate"), default="repair")
+    parser.add_argument("--days", type=int, help="exam days (default: the current session's)")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="first exam day, YYYY-MM-DD")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds of local search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="backend to read from instead of EXAM_SCHEDULER_URL")
+    parser.add_argument("--out", help="write the proposed /examens payload to this JSON file")
+    args = parser.parse_args(argv)
+
+    import mock_data
+
+    if args.url:
+        mock_data.connect(args.url, ttl=0)
+    problem = build_problem(mock_data.snapshot(), days=args.days, start=args.start)
+    solution = solve(problem, args.mode, args.time_limit, args.seed)
+    mock_data.store.stop_refresher()
+
+    print(f"{len(solution.exams)} exams on {problem.n_days} days x {problem.slots_per_day} slots, "
+          f"{solution.iterations} iterations in {solution.seconds:.2f}s")
+    print(f"{'term':20} {'before':>8} {'after':>8}")
+    for term in WEIGHTS:
+        print(f"{term:20} {solution.initial_breakdown[term]:>8} {solution.breakdown[term]:>8}")
+    print(f"{'penalty':20} {solution.initial_penalty:>8.0f} {solution.penalty:>8.0f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(solution.exams, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Every student's exam timetable as CSV and iCalendar files, in bulk.
+
+    python student_export.py --out timetables.zip
+    python student_export.py --out timetables.zip --formation 3 --formation 7
+    python student_export.py --split exports/ --workers 8      # one zip per formation
+
+Students inherit every exam of their formation, so each formation is
+rendered once (CSV rows and VEVENTs, memoized on the snapshot) and a
+student's files are that rendering with their name put in. The zip is
+written entry by entry to the output stream: memory stays bounded by one
+formation whatever the number of students.
+
+The single zip (``--out`` and Exam Admin) is written in one process.
+Nearly all of its time goes to the zip writer deflating and framing each
+entry, which has to happen where the archive is written; rendering in a
+pool would only add the cost of sending every entry back. ``--split``
+writes separate archives, so that one runs on a process pool.
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from timetable import master_timetable
+
+CSV_HEADER = ["Student ID", "Student", "Module", "Date", "Start", "End", "Room", "Professor", "Duration (min)"]
+INDEX_HEADER = ["Student ID", "Student", "Formation", "Exams", "CSV", "iCalendar"]
+PRODID = "-//exam_scheduler//Student exam timetable//FR"
+UNASSIGNED = "Unassigned"
+
+
+@dataclass(frozen=True)
+class FormationExport:
+    formation_id: int
+    name: str
+    exams: int
+    # CSV rows without the student columns, each ending with a newline
+    rows: tuple
+    # VEVENT blocks, CRLF terminated
+    events: str
+
+
+# ---------------- RENDERING ----------------
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def _ics_text(value):
+    # RFC 5545 TEXT escaping
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Split ``line`` into 75-octet lines continued with a leading space (RFC 5545 3.1)."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never cut a multi-byte character in two
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _slug(text):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(text)).strip("_") or "_"
+
+
+def _text(column):
+    # Exams without a room or professor get an empty field, not "nan"
+    return column.astype(object).where(column.notna(), "").tolist()
+
+
+def _columns(master):
+    """The master timetable columns the exports use, formatted once as lists."""
+    start, end = master["Start"].dt, master["End"].dt
+    return {
+        "exam_id": master["exam_id"].tolist(),
+        "module": master["Module"].tolist(),
+        "room": _text(master["Room"]),
+        "professor": _text(master["Professor"]),
+        "duration": master["Duration"].tolist(),
+        "date": start.strftime("%Y-%m-%d").tolist(),
+        "start": start.strftime("%H:%M").tolist(),
+        "end": end.strftime("%H:%M").tolist(),
+        "ics_start": start.strftime("%Y%m%dT%H%M%S").tolist(),
+        "ics_end": end.strftime("%Y%m%dT%H%M%S").tolist(),
+    }
+
+
+def render_formation(formation_id, name, columns, positions, stamp):
+    """The ``FormationExport`` of one formation from its rows (``positions``) of the master timetable."""
+    rows, events = [], []
+    for i in positions:
+        module, room, professor, duration = (
+            columns["module"][i], columns["room"][i], columns["professor"][i], columns["duration"][i]
+        )
+        rows.append(_csv_line([module, columns["date"][i], columns["start"][i], columns["end"][i], room, professor, duration]))
+        events.append(
+            "BEGIN:VEVENT\r\n"
+            f"UID:exam-{columns['exam_id'][i]}@exam-scheduler\r\n"
+            f"DTSTAMP:{stamp}\r\n"
+            # Floating local times: the exam happens at that wall-clock time
+            f"DTSTART:{columns['ics_start'][i]}\r\n"
+            f"DTEND:{columns['ics_end'][i]}\r\n"
+            + _fold(f"SUMMARY:{_ics_text(module)}")
+            + (_fold(f"LOCATION:{_ics_text(room)}") if room else "")
+            + _fold(f"DESCRIPTION:{_ics_text(' – '.join(filter(None, [name, professor, f'{duration} min'])))}")
+            + "END:VEVENT\r\n"
+        )
+    return FormationExport(formation_id, name, len(rows), tuple(rows), "".join(events))
+
+
+def build_formation_exports(snapshot):
+    master = master_timetable(snapshot)
+    columns = _columns(master)
+    names = {f["id"]: f["nom"] for f in snapshot.get("formations")}
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(snapshot.created_at))
+    exports = {}
+    # The master timetable is already in chronological order
+    for formation_id, positions in master.groupby("formation_id", observed=True).indices.items():
+        formation_id = int(formation_id)
+        name = names.get(formation_id, str(formation_id))
+        exports[formation_id] = render_formation(formation_id, name, columns, positions.tolist(), stamp)
+    for formation_id, name in names.items():
+        if formation_id not in exports:
+            exports[formation_id] = FormationExport(formation_id, name, 0, (), "")
+    return exports
+
+
+def formation_exports(snapshot):
+    """``{formation_id: FormationExport}`` for every formation, built once per snapshot."""
+    return snapshot.derived("formation_exports", build_formation_exports)
+
+
+def student_csv(formation, student_id, name):
+    prefix = _csv_line([student_id, name])[:-1] + ","
+    return _csv_line(CSV_HEADER) + "".join(prefix + row for row in formation.rows)
+
+
+def student_ics(formation, name):
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        f"PRODID:{PRODID}\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        + _fold(f"X-WR-CALNAME:{_ics_text(f'Examens – {name}')}")
+        + formation.events
+        + "END:VCALENDAR\r\n"
+    )
+
+
+# ---------------- ZIP ----------------
+def _students_by_formation(snapshot, formation_ids=None):
+    """``{formation_id: [(student_id, name), ...]}``, students in id order."""
+    students = snapshot.get("students")
+    ids = students["id"].to_numpy()
+    formations = students["formation_id"].to_numpy()
+    if formation_ids is not None:
+        keep = np.isin(formations, list(formation_ids))
+        ids, formations = ids[keep], formations[keep]
+        names = students["nom"].to_numpy()[keep]
+    else:
+        names = students["nom"].to_numpy()
+    order = np.lexsort((ids, formations))
+    grouped = {}
+    for student_id, name, formation_id in zip(ids[order].tolist(), names[order].tolist(), formations[order].tolist()):
+        grouped.setdefault(formation_id, []).append((student_id, name))
+    return grouped
+
+
+def write_formation(archive, formation, students, folder=""):
+    """Add the CSV and .ics file of each of ``students`` to ``archive``; returns their index rows."""
+    index = []
+    for student_id, name in students:
+        base = f"{folder}{student_id}_{_slug(name)}"
+        archive.writestr(f"{base}.csv", student_csv(formation, student_id, name))
+        archive.writestr(f"{base}.ics", student_ics(formation, name))
+        index.append([student_id, name, formation.name, formation.exams, f"{base}.csv", f"{base}.ics"])
+    return index
+
+
+def _write_index(archive, index):
+    with archive.open("students.csv", "w") as f:
+        text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        writer = csv.writer(text, lineterminator="\n")
+        writer.writerow(INDEX_HEADER)
+        writer.writerows(index)
+        text.flush()
+        text.detach()
+
+
+def _formation(exports, formation_id):
+    # Students whose formation is unknown still get (empty) files
+    return exports.get(formation_id) or FormationExport(formation_id, UNASSIGNED, 0, (), "")
+
+
+def export_zip(snapshot, out, formation_ids=None):
+    """Write the timetables of every student (of ``formation_ids``) into the zip ``out``.
+
+    ``out`` is a path or a writable binary file. Each formation gets a
+    folder with one ``<id>_<name>.csv`` and ``.ics`` per student, and
+    ``students.csv`` at the root lists every file. Returns counts.
+    """
+    exports = formation_exports(snapshot)
+    grouped = _students_by_formation(snapshot, formation_ids)
+    index = []
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for formation_id, students in grouped.items():
+            formation = _formation(exports, formation_id)
+            index += write_formation(archive, formation, students, folder=f"{_slug(formation.name)}/")
+        _write_index(archive, index)
+    return {"students": len(index), "formations": len(grouped), "files": 2 * len(index) + 1}
+
+
+def _export_formation(job):
+    formation, students, path = job
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        _write_index(archive, write_formation(archive, formation, students))
+    return path
+
+
+def export_per_formation(snapshot, directory, formation_ids=None, workers=None):
+    """One ``<formation>.zip`` per formation in ``directory``, written by a process pool.
+
+    A single zip can only be written by one process; separate archives
+    can be built side by side. Returns the paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    exports = formation_exports(snapshot)
+    jobs = []
+    for formation_id, students in _students_by_formation(snapshot, formation_ids).items():
+        formation = _formation(exports, formation_id)
+        jobs.append((formation, students, os.path.join(directory, f"{formation_id}_{_slug(formation.name)}.zip")))
+    # Largest formations first so no worker is left with a long tail
+    jobs.sort(key=lambda job: -len(job[1]))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_export_formation, jobs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="zip file with every student")
+    target.add_argument("--split", metavar="DIR", help="write one zip per formation to DIR instead")
+    parser.add_argument("--formation", type=int, action="append", help="only this formation id (repeatable)")
+    parser.add_argument("--workers", type=int, help="processes used with --split (default: one per CPU)")
+    parser.add_argument("--url", help="backend to export from instead of EXAM_SCHEDULER_URL")
+    args = parser.parse_args(argv)
+
+    import mock_data
+
+    if args.url:
+        mock_data.connect(args.url, ttl=0)
+    snapshot = mock_data.snapshot()
+    start = time.perf_counter()
+    if args.out:
+        summary = export_zip(snapshot, args.out, args.formation)
+        print(f"{summary['students']} students from {summary['formations']} formations "
+              f"written to {args.out} in {time.perf_counter() - start:.1f}s")
+    else:
+        paths = export_per_formation(snapshot, args.split, args.formation, args.workers)
+        print(f"{len(paths)} formation archives written to {args.split} in {time.perf_counter() - start:.1f}s")
+    mock_data.store.stop_refresher()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""How hard the timetable is on students: exams per day, back-to-back exams,
+rest gaps and session span, for the whole roster at once.
+
+Students sit every exam of their formation, so the metrics are computed on
+a formation × exam incidence (CSR: ``indptr`` / ``indices`` into the master
+timetable, each formation's exams in start order) with segment operations
+over all formations together. The work grows with formations and exams, not
+with students; a student's metrics are their formation's row.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from timetable import master_timetable
+
+# Largest rest (minutes) between two exams of the same day that still counts as back-to-back
+BACK_TO_BACK_MINUTES = int(os.environ.get("EXAM_SCHEDULER_BACK_TO_BACK_MINUTES", 60))
+DAY = 24 * 60
+
+# Minimum rest gap buckets, in minutes, for the distribution charts
+GAP_BINS = [-np.inf, 0, 30, 60, 120, 240, DAY, np.inf]
+GAP_LABELS = ["Overlap", "< 30 min", "30–60 min", "1–2 h", "2–4 h", "4–24 h", "≥ 1 day"]
+
+COLUMNS = ["Formation", "Department", "Students", "Exams", "Max Exams/Day", "Back-to-Back", "Min Gap (min)", "Span (days)"]
+
+
+def _minutes(values):
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+class StudentLoad:
+    """Load metrics of every formation, and of every student through their formation.
+
+    ``formations`` is indexed by formation id with the ``COLUMNS`` above;
+    ``student(student_id)`` is two dict/list lookups. Distributions and
+    rankings are kept per department once asked for; callers must treat
+    them as read-only.
+    """
+
+    def __init__(self, master, students, formations, departments):
+        formation_ids = np.array([f["id"] for f in formations])
+        n = len(formation_ids)
+        lookup = pd.Index(formation_ids)
+
+        # Incidence: the master timetable is in start order, so a stable sort
+        # by formation keeps each formation's exams chronological
+        codes = lookup.get_indexer(master["formation_id"])
+        kept = np.flatnonzero(codes >= 0)
+        order = kept[np.argsort(codes[kept], kind="stable")]
+        counts = np.bincount(codes[kept], minlength=n)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.indices = order
+
+        f = codes[order]
+        start = _minutes(master["Start"].to_numpy())[order]
+        end = _minutes(master["End"].to_numpy())[order]
+        day = start // DAY
+
+        # Exams per (formation, day): lengths of the runs of equal (f, day)
+        new_run = np.ones(len(f), dtype=bool)
+        new_run[1:] = (f[1:] != f[:-1]) | (day[1:] != day[:-1])
+        run_length = np.diff(np.append(np.flatnonzero(new_run), len(f)))
+        max_per_day = np.zeros(n, dtype=np.int64)
+        np.maximum.at(max_per_day, f[new_run], run_length)
+
+        # Consecutive exams of a formation. The rest before an exam runs from
+        # the latest end among the formation's earlier exams, which need not
+        # be the previous one when a long exam overlaps several
+        same = f[1:] == f[:-1]
+        pair_f = f[1:][same]
+        offset = end.min() if len(end) else 0
+        width = (end.max() - offset + 1) if len(end) else 1
+        # f is sorted, so one running maximum restarts at every formation
+        latest_end = np.maximum.accumulate(f * width + (end - offset)) - f * width + offset
+        gap = (start[1:] - latest_end[:-1])[same]
+        same_day = (day[1:] == day[:-1])[same]
+        back_to_back = np.bincount(pair_f, weights=same_day & (gap <= BACK_TO_BACK_MINUTES), minlength=n)
+        min_gap = np.full(n, np.inf)
+        np.minimum.at(min_gap, pair_f, gap)
+        min_gap[np.isinf(min_gap)] = np.nan
+
+        has_exams = counts > 0
+        span = np.zeros(n, dtype=np.int64)
+        span[has_exams] = day[self.indptr[1:][has_exams] - 1] - day[self.indptr[:-1][has_exams]] + 1
+
+        student_codes = lookup.get_indexer(students["formation_id"])
+        department_names = {d["id"]: d["nom"] for d in departments}
+        self.formations = pd.DataFrame({
+            "Formation": [f["nom"] for f in formations],
+            "Department": [department_names.get(f.get("dept_id")) for f in formations],
+            "Students": np.bincount(student_codes[student_codes >= 0], minlength=n),
+            "Exams": counts,
+            "Max Exams/Day": max_per_day,
+            "Back-to-Back": back_to_back.astype("int64"),
+            "Min Gap (min)": min_gap,
+            "Span (days)": span,
+        }, index=pd.Index(formation_ids, name="formation_id"), columns=COLUMNS)
+
+        self._student_codes = student_codes
+        self._records = self.formations.reset_index().to_dict("records")
+        self._position = {student_id: pos for pos, student_id in enumerate(students["id"].tolist())}
+        # (query, arguments, department) -> result, for the dashboards' reruns
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def exams(self, formation_id):
+        """Master timetable positions of ``formation_id``'s exams, in start order."""
+        code = self.formations.index.get_loc(formation_id)
+        return self.indices[self.indptr[code]:self.indptr[code + 1]]
+
+    def student(self, student_id):
+        """The load metrics of one student, or None for an unknown student or formation."""
+        pos = self._position.get(student_id)
+        if pos is None or self._student_codes[pos] < 0:
+            return None
+        return self._records[self._student_codes[pos]]
+
+    def _cached(self, key, build):
+        """``build()``, kept per key: a snapshot's loads never change."""
+        result = self._results.get(key)
+        if result is None:
+            result = build()
+            with self._lock:
+                self._results[key] = result
+        return result
+
+    def _select(self, department=None):
+        def build():
+            frame = self.formations
+            if department is not None:
+                frame = frame[frame["Department"] == department]
+            return frame[frame["Students"] > 0]
+        return self._cached(("select", department), build)
+
+    def distribution(self, metric, department=None):
+        """Number of students per value of ``metric`` (min gaps are bucketed)."""
+        def build():
+            frame = self._select(department)
+            if metric == "Min Gap (min)":
+                values = pd.cut(frame[metric], GAP_BINS, labels=GAP_LABELS, right=False)
+                return frame["Students"].groupby(values, observed=False).sum().rename("Students")
+            return frame.groupby(metric)["Students"].sum()
+        return self._cached(("distribution", metric, department), build)
+
+    def students_with(self, metric, at_least, department=None):
+        def build():
+            frame = self._select(department)
+            return int(frame.loc[frame[metric] >= at_least, "Students"].sum())
+        return self._cached(("students_with", metric, at_least, department), build)
+
+    def worst(self, limit=20, department=None):
+        """Formations with the heaviest load first: most exams a day, most back-to-back, shortest rest."""
+        def build():
+            return self._select(department).sort_values(
+                ["Max Exams/Day", "Back-to-Back", "Min Gap (min)", "Students"],
+                ascending=[False, False, True, False],
+                na_position="last",
+            ).head(limit)
+        return self._cached(("worst", limit, department), build)
+
+
+def build_student_load(snapshot):
+    return StudentLoad(
+        master_timetable(snapshot),
+        snapshot.get("students"),
+        snapshot.get("formations"),
+        snapshot.get("departments"),
+    )
+
+
+def student_load(snapshot):
+    """The ``StudentLoad`` of ``snapshot``, built once per version."""
+    return snapshot.derived("student_load", build_student_load)
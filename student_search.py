@@ -0,0 +1,98 @@
+import sys
+import unicodedata
+
+import numpy as np
+
+import timings
+
+# Most matches handed to the student selectbox at once
+MAX_MATCHES = 50
+
+
+def normalize(text):
+    """Lower-case ``text`` and strip accents so "Élodie" matches "elo"."""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class StudentIndex:
+    """Prefix index over student names with O(1) id lookups.
+
+    Every word of every name is stored in one sorted token array next to
+    the position of its student, so a prefix is a binary-searched range and
+    a multi-word query intersects the ranges of its words.
+    """
+
+    def __init__(self, students, formations):
+        # ``students`` is the columnar /etudiants frame; names are shared, not copied
+        self.ids = students["id"].to_numpy()
+        self.names = students["nom"].tolist()
+        self.formation_ids = students["formation_id"].to_numpy()
+        self._position = {student_id: pos for pos, student_id in enumerate(self.ids.tolist())}
+        self._formation_names = {f["id"]: f["nom"] for f in formations}
+
+        tokens, owners = [], []
+        for pos, name in enumerate(self.names):
+            for token in set(normalize(name).split()):
+                tokens.append(token)
+                owners.append(pos)
+        order = np.argsort(np.array(tokens, dtype=object), kind="stable")
+        self._tokens = np.array(tokens, dtype=object)[order]
+        self._owners = np.array(owners, dtype=np.int64)[order]
+        # Alphabetical order of the students, used to rank matches
+        self._alphabetical = np.argsort(np.array([normalize(n) for n in self.names], dtype=object), kind="stable")
+        self._rank = np.empty(len(self.names), dtype=np.int64)
+        self._rank[self._alphabetical] = np.arange(len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        arrays = (self.ids, self.formation_ids, self._owners, self._rank, self._alphabetical)
+        tokens = self._tokens.nbytes + sum(sys.getsizeof(token) for token in self._tokens)
+        return sum(a.nbytes for a in arrays) + tokens + sys.getsizeof(self._position) * 2
+
+    def _prefix(self, word):
+        lo = np.searchsorted(self._tokens, word, side="left")
+        hi = np.searchsorted(self._tokens, word + "\uffff", side="left")
+        return np.unique(self._owners[lo:hi])
+
+    def matches(self, query):
+        """Positions of every student matching ``query``, alphabetically."""
+        words = normalize(query).split()
+        if not words:
+            return self._alphabetical
+        positions = self._prefix(words[0])
+        for word in words[1:]:
+            positions = np.intersect1d(positions, self._prefix(word), assume_unique=True)
+        # isdecimal, not isdigit: "²" is a digit int() cannot parse
+        query = query.strip()
+        if query.isdecimal() and int(query) in self._position:
+            positions = np.union1d(positions, [self._position[int(query)]])
+        return positions[np.argsort(self._rank[positions], kind="stable")]
+
+    def search(self, query, limit=MAX_MATCHES):
+        """Ids of the first ``limit`` students matching ``query`` and the total match count."""
+        with timings.span("filter", "student_search") as span:
+            positions = self.matches(query)
+            span.rows = len(positions)
+        return self.ids[positions[:limit]].tolist(), len(positions)
+
+    def get(self, student_id):
+        pos = self._position[student_id]
+        return {"id": student_id, "nom": self.names[pos], "formation_id": int(self.formation_ids[pos])}
+
+    def name(self, student_id):
+        return self.names[self._position[student_id]]
+
+    def formation_name(self, formation_id):
+        return self._formation_names.get(formation_id)
+
+
+def student_index(snapshot):
+    """The student search index of ``snapshot``, built once per version."""
+    def build(snap):
+        snap.prefetch(["students", "formations"])
+        return StudentIndex(snap.get("students"), snap.get("formations"))
+    return snapshot.derived("student_index", build)
@@ -0,0 +1,209 @@
+"""Synthetic faculty datasets in the exact shapes served by the backend.
+
+    python synthetic_data.py --scale 10 --out data/scale10
+
+``scale=1`` is roughly today's faculty; every count except the seven
+departments grows linearly with it.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+
+from data_loader import ENDPOINTS
+
+DEPARTMENTS = [
+    "Informatique", "Mathématiques", "Physique", "Chimie",
+    "Biologie", "Sciences de la Terre", "Génie Civil",
+]
+LEVELS = ["L1", "L2", "L3", "M1", "M2"]
+FIRST_NAMES = [
+    "Amine", "Yasmine", "Karim", "Sara", "Mehdi", "Lina", "Walid", "Nour",
+    "Sofiane", "Imane", "Rayan", "Meriem", "Anis", "Ines", "Bilal", "Amel",
+]
+LAST_NAMES = [
+    "Benali", "Haddad", "Mansouri", "Boudiaf", "Cherif", "Khelifi", "Saidi",
+    "Bouzid", "Ferhat", "Hamidi", "Larbi", "Meziane", "Rahmani", "Toumi",
+]
+
+# Rooms hold 20 students in exam mode
+ROOM_CAPACITY = 20
+SLOTS = [(8, 30), (10, 45), (13, 30), (15, 45)]
+DURATIONS = [90, 90, 120]
+
+
+def generate(scale=1.0, seed=0, start_date=datetime.date(2026, 1, 11), exam_days=12, conflict_rate=0.02):
+    """Return ``{collection name: payload}`` for every backend endpoint.
+
+    Each formation's modules are spread over distinct slots, so the only
+    overlaps are the ``conflict_rate`` share of exams deliberately moved
+    onto a slot their formation already uses.
+    """
+    rng = random.Random(seed)
+    per_dept = max(1, round(5 * scale))
+
+    departments = [{"id": i + 1, "nom": name} for i, name in enumerate(DEPARTMENTS)]
+
+    formations = []
+    for dept in departments:
+        for i in range(per_dept):
+            formations.append({
+                "id": len(formations) + 1,
+                "nom": f"{LEVELS[i % len(LEVELS)]} {dept['nom']} G{i // len(LEVELS) + 1}",
+                "dept_id": dept["id"],
+            })
+
+    # Formations have 6-9 modules
+    modules = []
+    for formation in formations:
+        for i in range(rng.randint(6, 9)):
+            modules.append({
+                "id": len(modules) + 1,
+                "nom": f"Module {i + 1} – {formation['nom']}",
+                "formation_id": formation["id"],
+            })
+
+    students = []
+    for formation in formations:
+        for _ in range(rng.randint(25, 55)):
+            students.append({
+                "id": len(students) + 1,
+                "nom": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {len(students) + 1:06d}",
+                "formation_id": formation["id"],
+            })
+
+    rooms = [
+        {"id": i + 1, "nom": f"Salle {chr(65 + i % 6)}{i + 1:03d}", "capacite": ROOM_CAPACITY}
+        for i in range(max(1, round(40 * scale)))
+    ]
+
+    professors = []
+    for dept in departments:
+        for _ in range(max(1, round(10 * scale))):
+            professors.append({
+                "id": len(professors) + 1,
+                "nom": f"Pr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {len(professors) + 1}",
+                "dept_id": dept["id"],
+            })
+    profs_by_dept = {}
+    for prof in professors:
+        profs_by_dept.setdefault(prof["dept_id"], []).append(prof["id"])
+
+    # ---------------- EXAMS ----------------
+    # Exams are scheduled per MODULE, on distinct slots of its formation
+    slots = [(day, slot) for day in range(exam_days) for slot in range(len(SLOTS))]
+    dept_of = {f["id"]: f["dept_id"] for f in formations}
+    by_formation = {}
+    for module in modules:
+        by_formation.setdefault(module["formation_id"], []).append(module)
+
+    exams = []
+    rooms_taken = {}
+    for formation_id, own in by_formation.items():
+        chosen = rng.sample(slots, min(len(own), len(slots)))
+        for i, module in enumerate(own):
+            day, slot = chosen[i % len(chosen)]
+            if i and rng.random() < conflict_rate:
+                # Same slot as the formation's previous exam
+                day, slot = chosen[(i - 1) % len(chosen)]
+            room = rooms_taken.get((day, slot), 0)
+            rooms_taken[(day, slot)] = room + 1
+            hour, minute = SLOTS[slot]
+            start = datetime.datetime.combine(start_date + datetime.timedelta(days=day), datetime.time(hour, minute))
+            exams.append({
+                "id": len(exams) + 1,
+                "module_id": module["id"],
+                "prof_id": rng.choice(profs_by_dept[dept_of[formation_id]]),
+                "salle_id": rooms[room % len(rooms)]["id"],
+                "date_heure": start.isoformat(),
+                "duree_minutes": rng.choice(DURATIONS),
+            })
+
+    data = {
+        "departments": departments,
+        "formations": formations,
+        "modules": modules,
+        "students": students,
+        "rooms": rooms,
+        "professors": professors,
+        "exam_schedule": exams,
+    }
+    data.update(analytics(data, exam_days))
+    return data
+
+
+def analytics(data, exam_days):
+    """The three /analytics/* payloads, derived from the generated data."""
+    formation_dept = {f["id"]: f["dept_id"] for f in data["formations"]}
+    module_formation = {m["id"]: m["formation_id"] for m in data["modules"]}
+    dept_names = {d["id"]: d["nom"] for d in data["departments"]}
+
+    busy, hours, slots = {}, {}, {}
+    for exam in data["exam_schedule"]:
+        busy[exam["salle_id"]] = busy.get(exam["salle_id"], 0) + exam["duree_minutes"]
+        hours[exam["prof_id"]] = hours.get(exam["prof_id"], 0) + exam["duree_minutes"] / 60
+        key = (module_formation[exam["module_id"]], exam["date_heure"])
+        slots[key] = slots.get(key, 0) + 1
+
+    conflicts = {}
+    for (formation_id, _), count in slots.items():
+        if count > 1:
+            dept = formation_dept[formation_id]
+            conflicts[dept] = conflicts.get(dept, 0) + count
+
+    available = exam_days * 8 * 60
+    return {
+        "rooms_usage": [
+            {
+                "room": room["nom"],
+                "usage_rate": round(100 * busy.get(room["id"], 0) / available, 1),
+                "capacity_check": "OK",
+            }
+            for room in data["rooms"]
+        ],
+        "department_conflicts": [
+            {"department": name, "conflicts": conflicts.get(dept_id, 0)} for dept_id, name in dept_names.items()
+        ],
+        "professor_workload": [
+            {
+                "professor": prof["nom"],
+                "hours": round(hours.get(prof["id"], 0), 1),
+                "status": "Overload" if hours.get(prof["id"], 0) > 12 else "OK",
+            }
+            for prof in data["professors"]
+        ],
+    }
+
+
+def save(data, directory):
+    """Write one ``<collection>.json`` file per collection."""
+    os.makedirs(directory, exist_ok=True)
+    for name, payload in data.items():
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+
+def load(directory):
+    data = {}
+    for name in ENDPOINTS:
+        with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+            data[name] = json.load(f)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="directory to write the JSON files to")
+    args = parser.parse_args(argv)
+
+    data = generate(args.scale, args.seed)
+    save(data, args.out)
+    for name, payload in data.items():
+        print(f"{name:22} {len(payload):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_backend  # noqa: E402
+import synthetic_data  # noqa: E402
+from data_store import DataStore  # noqa: E402
+
+
+@pytest.fixture
+def backend():
+    """A small synthetic dataset served by ``local_backend``; yields ``(backend, url)``."""
+    backend = local_backend.Backend(synthetic_data.generate(0.3))
+    server, url = local_backend.serve(backend)
+    yield backend, url
+    server.shutdown()
+
+
+@pytest.fixture
+def snapshot(backend):
+    """Every collection of ``backend``, loaded into one snapshot."""
+    _, url = backend
+    return DataStore(url, ttl=0, delta_sync=False).snapshot()
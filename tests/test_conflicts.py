@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from conflicts import exam_conflicts, find_conflicts, sweep
+from timetable import master_timetable
+
+
+def brute_force(group, start, end):
+    """``{position: overlap}`` of every interval overlapping one before it (in sweep order)."""
+    order = np.lexsort((start, group)).tolist()
+    found = {}
+    for rank, i in enumerate(order):
+        earlier = [j for j in order[:rank] if group[j] == group[i]]
+        latest = max((end[j] for j in earlier), default=None)
+        if latest is not None and start[i] < latest:
+            found[i] = min(end[i], latest) - start[i]
+    return found
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 60))
+    group = rng.integers(0, 5, n).astype(np.int64)
+    start = rng.integers(0, 600, n).astype(np.int64) // 15 * 15
+    end = start + rng.choice([30, 60, 90, 120, 240], n)
+
+    hit, other, overlap = sweep(group, start, end)
+
+    expected = brute_force(group, start, end)
+    assert dict(zip(hit.tolist(), overlap.tolist())) == expected
+    for i, j in zip(hit.tolist(), other.tolist()):
+        # Paired with an interval of the same group it really overlaps
+        assert i != j and group[i] == group[j]
+        assert start[j] < end[i] and start[i] < end[j]
+
+
+def test_find_conflicts_matches_brute_force(snapshot):
+    master = master_timetable(snapshot)
+    conflicts = exam_conflicts(snapshot)
+    start = master["Start"].to_numpy().astype("datetime64[m]").astype(np.int64)
+    end = master["End"].to_numpy().astype("datetime64[m]").astype(np.int64)
+    for kind, key in [("Formation", "formation_id"), ("Professor", "prof_id"), ("Room", "salle_id")]:
+        expected = brute_force(master[key].to_numpy(dtype=np.int64), start, end)
+        rows = conflicts[conflicts["Type"] == kind]
+        assert sorted(rows["exam_id"].tolist()) == sorted(master["exam_id"].to_numpy()[list(expected)].tolist())
+    assert len(find_conflicts(master.iloc[:0])) == 0
@@ -0,0 +1,35 @@
+import pytest
+
+from conflicts import department_conflicts, exam_conflicts
+from cube import exam_cube
+from timetable import master_timetable
+
+
+def test_module_counts_match_the_timetable(snapshot):
+    master = master_timetable(snapshot)
+    cube = exam_cube(snapshot)
+    assert cube.modules() == master["module_id"].nunique()
+    for department in master["Department"].unique():
+        rows = master[master["Department"] == department]
+        assert cube.modules(Department=department) == rows["Module"].nunique()
+        date = rows["Date"].iloc[0]
+        assert cube.modules(Department=department, Date=date) == rows.loc[rows["Date"] == date, "module_id"].nunique()
+    assert cube.modules(Department="No such department") == 0
+
+
+def test_rollup_matches_the_timetable(snapshot):
+    master = master_timetable(snapshot)
+    by_department = exam_cube(snapshot).rollup("Department")
+    for department, rows in master.groupby("Department", observed=True):
+        assert by_department.loc[department, "exams"] == len(rows)
+        assert by_department.loc[department, "minutes"] == rows["Duration"].sum()
+        hours = rows.loc[rows["prof_id"].notna(), "Duration"].sum() / 60
+        assert by_department.loc[department, "prof_hours"] == pytest.approx(hours, abs=0.01)
+
+
+def test_department_conflicts(snapshot):
+    conflicts = exam_conflicts(snapshot)
+    for department in conflicts["Department"].unique():
+        rows = department_conflicts(snapshot, department)
+        assert rows.equals(conflicts[conflicts["Department"] == department])
+        assert department_conflicts(snapshot, department) is rows
@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from data_loader import iter_json_array
+
+TEXT = '[12345, 67, true, -0.5e10, "a, \\"b\\"]", {"id": 1, "nom": "Ünïcode"}, [1, [2]], null, 890]'
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", range(1, len(TEXT) + 1))
+def test_items_split_across_chunks(size):
+    assert list(iter_json_array(chunked(TEXT, size))) == json.loads(TEXT)
+
+
+@pytest.mark.parametrize("text", ['[1, 2', '[12345', '[{"id": 1}'])
+def test_truncated_array(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(text, 2)))
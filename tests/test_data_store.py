@@ -0,0 +1,64 @@
+from data_loader import ENDPOINTS
+from data_store import DataStore
+from disk_cache import DiskCache
+
+NAMES = ["rooms", "students", "exam_schedule"]
+
+
+def _requests(backend, name):
+    return backend.stats().get(ENDPOINTS[name], 0)
+
+
+def test_cold_load_then_reload_from_disk(backend, tmp_path):
+    backend, url = backend
+    cache = DiskCache(str(tmp_path))
+
+    cold = DataStore(url, ttl=0, cache=cache, delta_sync=False).snapshot()
+    cold.prefetch(NAMES)
+    assert all(_requests(backend, name) == 1 for name in NAMES)
+    assert all(cache.validators(name)["etag"] for name in NAMES)
+
+    # A restarted server shows the cached copy without asking the backend
+    warm = DataStore(url, ttl=0, cache=cache, delta_sync=False)
+    snapshot = warm._current
+    snapshot.prefetch(NAMES)
+    assert all(_requests(backend, name) == 1 for name in NAMES)
+    assert snapshot.get("rooms") == cold.get("rooms")
+    assert snapshot.get("exam_schedule") == cold.get("exam_schedule")
+    assert snapshot.get("students")["id"].tolist() == cold.get("students")["id"].tolist()
+
+
+def test_revalidation_is_304_and_keeps_the_snapshot(backend, tmp_path):
+    backend, url = backend
+    store = DataStore(url, ttl=0, cache=DiskCache(str(tmp_path)), delta_sync=False)
+    first = store.snapshot()
+    first.prefetch(NAMES)
+
+    store.refresh(wait=True)
+
+    # Asked again, answered 304: same snapshot, nothing re-downloaded
+    assert all(_requests(backend, name) == 2 for name in NAMES)
+    assert store.snapshot() is first
+    assert store.last_error is None
+
+
+def test_change_is_downloaded_with_200(backend, tmp_path):
+    backend, url = backend
+    cache = DiskCache(str(tmp_path))
+    store = DataStore(url, ttl=0, cache=cache, delta_sync=False)
+    first = store.snapshot()
+    first.prefetch(NAMES)
+    etag = cache.validators("rooms")["etag"]
+
+    rooms = first.get("rooms") + [{"id": 9999, "nom": "Salle Z999", "capacite": 20}]
+    backend.set("rooms", rooms)
+    store.refresh(wait=True)
+
+    second = store.snapshot()
+    assert second is not first
+    assert second.get("rooms") == rooms
+    assert "rooms" not in second.not_modified
+    assert {"students", "exam_schedule"} <= second.not_modified
+    # The new copy and its validators replace the cached ones
+    assert cache.validators("rooms")["etag"] != etag
+    assert cache.load("rooms") == rooms
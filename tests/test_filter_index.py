@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from filter_index import filter_index
+from grid import sort_positions
+
+
+@pytest.mark.parametrize("column", ["Room", "Professor", "Duration", "Module"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_filtered_sort_matches_sorting_the_filtered_frame(snapshot, column, descending):
+    index = filter_index(snapshot)
+    department = index.options["Department"][0]
+    for criteria in [{}, {"Department": department}, {"Department": department, "Date": index.options["Date"][0]}]:
+        expected = sort_positions(index.filter(**criteria), column, descending)
+        assert np.array_equal(index.sorter(**criteria)(column, descending), expected)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from data_store import DataStore
+from seating import admin_timetable, exam_seating, seat_allocation
+from timetable import formation_sizes, master_timetable
+
+
+def test_no_room_is_booked_twice_at_once(snapshot):
+    allocation = seat_allocation(snapshot)
+    for _, rows in allocation.groupby("salle_id"):
+        rows = rows.sort_values("Start")
+        assert (rows["Start"].to_numpy()[1:] >= rows["End"].to_numpy()[:-1]).all()
+    assert (allocation["Seats"] <= allocation["Capacity"]).all()
+
+
+def test_seat_ranges_cover_each_formation(snapshot):
+    master = master_timetable(snapshot)
+    allocation = seat_allocation(snapshot)
+    seating = exam_seating(snapshot)
+    demand = master.set_index("exam_id")["formation_id"].map(formation_sizes(snapshot)).fillna(0).astype(int)
+    students = snapshot.get("students")
+
+    for exam_id, rows in allocation.groupby("exam_id"):
+        seated = rows[rows["Seats"] > 0]
+        seats = [seat for start, end in zip(seated["Seat From"], seated["Seat To"]) for seat in range(start, end + 1)]
+        assert seats == list(range(1, demand[exam_id] - seating.loc[exam_id, "Unseated"] + 1))
+
+        formation_id = master.loc[master["exam_id"] == exam_id, "formation_id"].iloc[0]
+        ids = np.sort(students.loc[students["formation_id"] == formation_id, "id"].to_numpy())
+        assert (ids[seated["Seat From"] - 1] == seated["First Student"]).all()
+        assert (ids[seated["Seat To"] - 1] == seated["Last Student"]).all()
+
+
+def test_occupancy_without_seats_is_unknown(backend):
+    backend, url = backend
+    rooms = DataStore(url, ttl=0, delta_sync=False).snapshot().get("rooms")
+    backend.set("rooms", [dict(room, capacite=0) for room in rooms])
+    admin = admin_timetable(DataStore(url, ttl=0, delta_sync=False).snapshot())
+    assert (admin["Capacity"] == 0).all()
+    assert admin["Occupancy"].isna().all()
+
+
+def test_rooms_without_seats_are_not_used(backend):
+    backend, url = backend
+    snapshot = DataStore(url, ttl=0, delta_sync=False).snapshot()
+    rooms = snapshot.get("rooms")
+    # Half the rooms have no seat, and one formation has no student
+    backend.set("rooms", [dict(room, capacite=0) if i % 2 else room for i, room in enumerate(rooms)])
+    empty = snapshot.get("formations")[0]["id"]
+    backend.set("students", [s for s in snapshot.get("students").to_dict("records") if s["formation_id"] != empty])
+    allocation = seat_allocation(DataStore(url, ttl=0, delta_sync=False).snapshot())
+
+    assert (allocation["Capacity"] > 0).all()
+    assert (allocation.loc[allocation["Seats"] == 0, "Invigilators"] == 0).all()
+    assert (allocation.loc[allocation["Seats"] > 0, "Invigilators"] >= 1).all()
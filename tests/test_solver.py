@@ -0,0 +1,58 @@
+import datetime
+from dataclasses import replace
+
+import pytest
+
+import solver
+from conflicts import find_conflicts
+from data_store import DataStore
+from timetable import build_master_timetable
+
+
+@pytest.fixture
+def hourly(backend):
+    """The snapshot with exams starting on the hour but lasting 90 or 120 minutes."""
+    backend, url = backend
+    exams = DataStore(url, ttl=0, delta_sync=False).snapshot().get("exam_schedule")
+    backend.set("exam_schedule", [
+        dict(
+            exam,
+            date_heure=datetime.datetime.fromisoformat(str(exam["date_heure"])).replace(hour=8 + i % 6, minute=0).isoformat(),
+            duree_minutes=(90, 120)[i % 2],
+        )
+        for i, exam in enumerate(exams)
+    ])
+    return DataStore(url, ttl=0, delta_sync=False).snapshot()
+
+
+@pytest.mark.parametrize("mode", ["repair", "generate"])
+def test_solution_has_only_the_overlaps_it_reports(hourly, mode):
+    problem = solver.build_problem(hourly)
+    solution = solver.solve(problem, mode, time_limit=5)
+    found = find_conflicts(build_master_timetable(hourly, exams=solution.exams))["Type"].value_counts()
+
+    assert solution.breakdown["professor_overlap"] == 0
+    assert solution.breakdown["room_overflow"] == 0
+    assert found.get("Professor", 0) == 0
+    assert found.get("Room", 0) == 0
+    assert found.get("Formation", 0) <= solution.breakdown["formation_overlap"]
+
+
+def test_long_exams_clash_with_later_slots(hourly):
+    problem = solver.build_problem(hourly)
+    slots = problem.slot_minutes
+    # Two exams of one professor, the second starting an hour into the first
+    a, b = 0, 1
+    professor, durations = problem.professor.copy(), problem.durations.copy()
+    professor[b], durations[a] = professor[a], 120
+    problem = replace(problem, professor=professor, durations=durations)
+    later, after = slots.searchsorted([slots[0] + 60, slots[0] + 120])
+    assert slots[later] - slots[0] == 60 and slots[after] - slots[0] == 120
+
+    def overlaps(b_slot):
+        placement = problem.current.copy()
+        placement[:] = problem.n_slots - 1
+        placement[a], placement[b] = 0, b_slot
+        return solver.penalty(problem, placement, problem.professor)[1]["professor_overlap"]
+
+    assert overlaps(later) == overlaps(after) + 1
@@ -0,0 +1,28 @@
+import csv
+import io
+import re
+import zipfile
+
+from data_store import DataStore
+from student_export import export_zip, formation_exports
+from timetable import master_timetable
+
+
+def test_missing_room_and_professor_are_left_empty(backend):
+    backend, url = backend
+    exams = DataStore(url, ttl=0, delta_sync=False).snapshot().get("exam_schedule")
+    backend.apply("exam_schedule", upserts=[dict(exams[0], salle_id=None, prof_id=None)])
+    snapshot = DataStore(url, ttl=0, delta_sync=False).snapshot()
+    master = master_timetable(snapshot)
+    formation_id = int(master.loc[master["exam_id"] == exams[0]["id"], "formation_id"].iloc[0])
+
+    export = formation_exports(snapshot)[formation_id]
+    assert not re.search(r"\bnan\b", "".join(export.rows) + export.events)
+    assert ["", ""] in [row[4:6] for row in csv.reader(io.StringIO("".join(export.rows)))]
+    event = next(e for e in export.events.split("END:VEVENT") if f"UID:exam-{exams[0]['id']}@" in e)
+    assert "LOCATION:" not in event
+
+    buffer = io.BytesIO()
+    export_zip(snapshot, buffer, [formation_id])
+    with zipfile.ZipFile(buffer) as archive:
+        assert not any(re.search(rb"\bnan\b", archive.read(name)) for name in archive.namelist())
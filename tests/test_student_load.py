@@ -0,0 +1,63 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from student_load import BACK_TO_BACK_MINUTES, student_load
+from timetable import master_timetable
+
+
+def brute_force(exams):
+    """Load metrics of one formation's exams (in start order) straight from their definitions."""
+    starts, ends = exams["Start"].tolist(), exams["End"].tolist()
+    days = [start.normalize() for start in starts]
+    gaps, back_to_back = [], 0
+    for i in range(1, len(starts)):
+        # Rest since the latest end among the earlier exams
+        gap = (starts[i] - max(ends[:i])) // pd.Timedelta(minutes=1)
+        gaps.append(gap)
+        back_to_back += days[i] == days[i - 1] and gap <= BACK_TO_BACK_MINUTES
+    return {
+        "Exams": len(starts),
+        "Max Exams/Day": max(Counter(days).values(), default=0),
+        "Back-to-Back": back_to_back,
+        "Min Gap (min)": min(gaps, default=np.nan),
+        "Span (days)": (days[-1] - days[0]).days + 1 if days else 0,
+    }
+
+
+def test_loads_match_brute_force(backend):
+    backend, url = backend
+    exams = DataStore(url, ttl=0, delta_sync=False).snapshot().get("exam_schedule")
+    # A long exam overlapping the next two, which are 90 minutes apart: the
+    # third one's rest runs from the long exam's end, not the second one's
+    new_id = max(e["id"] for e in exams) + 1
+    backend.apply("exam_schedule", upserts=[
+        dict(exams[0], id=new_id, date_heure="2027-01-04T08:00:00", duree_minutes=600),
+        dict(exams[0], id=new_id + 1, date_heure="2027-01-04T08:30:00", duree_minutes=60),
+        dict(exams[0], id=new_id + 2, date_heure="2027-01-04T11:00:00", duree_minutes=60),
+    ])
+    snapshot = DataStore(url, ttl=0, delta_sync=False).snapshot()
+    master = master_timetable(snapshot)
+    load = student_load(snapshot)
+
+    for formation_id, row in load.formations.iterrows():
+        exams = master[master["formation_id"] == formation_id].sort_values("Start", kind="stable")
+        expected = brute_force(exams)
+        actual = {column: row[column] for column in expected}
+        assert actual == expected or (
+            np.isnan(expected["Min Gap (min)"]) and np.isnan(actual.pop("Min Gap (min)"))
+            and actual == {k: v for k, v in expected.items() if k != "Min Gap (min)"}
+        ), formation_id
+        assert master.iloc[load.exams(formation_id)]["exam_id"].tolist() == exams["exam_id"].tolist()
+
+
+def test_department_results_are_kept(snapshot):
+    load = student_load(snapshot)
+    department = load.formations["Department"].iloc[0]
+    assert load.worst(department=department) is load.worst(department=department)
+    assert load.distribution("Min Gap (min)", department) is load.distribution("Min Gap (min)", department)
+    assert load.distribution("Back-to-Back").sum() == load.formations["Students"].sum() - load.formations.loc[
+        load.formations["Exams"] == 0, "Students"
+    ].sum()
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from student_search import StudentIndex
+
+
+@pytest.fixture
+def index():
+    students = pd.DataFrame({
+        "id": [7, 12, 42],
+        "nom": ["Élodie Martin", "Karim Benali", "Lina Saidi"],
+        "formation_id": [1, 1, 2],
+    })
+    return StudentIndex(students, [{"id": 1, "nom": "L1 Info"}, {"id": 2, "nom": "L2 Math"}])
+
+
+def test_prefix_search_ignores_case_and_accents(index):
+    assert index.search("elo")[0] == [7]
+    assert index.search("KARIM ben")[0] == [12]
+
+
+def test_id_search(index):
+    assert index.search(" 42 ")[0] == [42]
+
+
+@pytest.mark.parametrize("query", ["²", "4²", "①", "x²"])
+def test_digit_like_text_is_not_parsed_as_an_id(index, query):
+    assert index.search(query) == ([], 0)
@@ -0,0 +1,122 @@
+import datetime
+import random
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from seating import admin_timetable, allocate
+from timetable import master_timetable
+from what_if import Change, timeline_index
+
+
+def placements(master, changes):
+    """``{exam_id: (start, end, {kind: key})}`` of every exam once ``changes`` are applied."""
+    def key(value):
+        return None if pd.isna(value) else int(value)
+
+    placed = {}
+    for row in master.itertuples():
+        placed[row.exam_id] = (row.Start, row.End, {
+            "Formation": key(row.formation_id), "Professor": key(row.prof_id), "Room": key(row.salle_id)
+        })
+    for change in changes:
+        keys = dict(placed[change.exam_id][2], Professor=change.prof_id, Room=change.salle_id)
+        placed[change.exam_id] = (pd.Timestamp(change.start), pd.Timestamp(change.end), keys)
+    return placed
+
+
+def all_conflicts(placed):
+    """``{(kind, key, exam_a, exam_b): overlap minutes}`` over every pair of exams."""
+    found = {}
+    for (a, (a_start, a_end, a_keys)), (b, (b_start, b_end, b_keys)) in combinations(placed.items(), 2):
+        if a_start >= b_end or b_start >= a_end:
+            continue
+        overlap = (min(a_end, b_end) - max(a_start, b_start)) // pd.Timedelta(minutes=1)
+        for kind, key in a_keys.items():
+            if key is not None and key == b_keys[kind]:
+                found[(kind, key) + tuple(sorted((a, b)))] = overlap
+    return found
+
+
+def hours(placed):
+    totals = {}
+    for start, end, keys in placed.values():
+        if keys["Professor"] is not None:
+            totals[keys["Professor"]] = totals.get(keys["Professor"], 0) + (end - start) / pd.Timedelta(hours=1)
+    return totals
+
+
+def random_changes(index, rng):
+    exam_ids = index.exam_ids.tolist()
+    rooms, professors = list(index.room_names), list(index.professor_names)
+    changes = []
+    for _ in range(rng.randint(1, 6)):
+        exam_id = rng.choice(exam_ids)
+        current = index.current(exam_id, changes)
+        changes.append(Change(
+            exam_id,
+            current.start + datetime.timedelta(minutes=rng.choice([-180, -90, 0, 90, 1440])),
+            rng.choice([60, 90, 120]),
+            rng.choice(rooms + [None]),
+            rng.choice(professors + [None]),
+        ))
+    return changes
+
+
+def conflict_rows(pairs, conflicts, index):
+    return sorted(
+        (kind, index.names[kind].get(key, key), index.label(a), index.label(b), conflicts[(kind, key, a, b)])
+        for kind, key, a, b in pairs
+    )
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_evaluate_matches_a_full_recompute(snapshot, seed):
+    master = master_timetable(snapshot)
+    index = timeline_index(snapshot)
+    changes = random_changes(index, random.Random(seed))
+
+    # Whole change set against the published timetable, then the last change on its own
+    for baseline in [[], changes[:-1]]:
+        impact = index.evaluate(changes, baseline=baseline)
+        before, after = placements(master, baseline), placements(master, changes)
+        conflicts_before, conflicts_after = all_conflicts(before), all_conflicts(after)
+
+        new = set(conflicts_after) - set(conflicts_before)
+        resolved = set(conflicts_before) - set(conflicts_after)
+        assert sorted(map(tuple, impact.new.itertuples(index=False))) == conflict_rows(new, conflicts_after, index)
+        assert sorted(map(tuple, impact.resolved.itertuples(index=False))) == conflict_rows(
+            resolved, conflicts_before, index
+        )
+
+        hours_before, hours_after = hours(before), hours(after)
+        changed = {
+            index.professor_names.get(prof, prof): round(hours_after.get(prof, 0) - hours_before.get(prof, 0), 2)
+            for prof in set(hours_before) | set(hours_after)
+            if round(hours_after.get(prof, 0) - hours_before.get(prof, 0), 2)
+        }
+        assert dict(zip(impact.hours["Professor"], impact.hours["Change (h)"])) == changed
+
+
+def test_occupancy_is_over_the_seat_allocation(snapshot):
+    index = timeline_index(snapshot)
+    admin = admin_timetable(snapshot).set_index("exam_id")
+    rooms = snapshot.get("rooms")
+    capacities = np.array([room["capacite"] for room in rooms], dtype=np.int64)
+    rng = random.Random(0)
+    for exam_id in rng.sample(index.exam_ids.tolist(), 20):
+        current = index.current(exam_id)
+        room = rng.choice([room["id"] for room in rooms if room["id"] != current.salle_id])
+        # A year on, nothing else is seated at that time
+        change = Change(exam_id, current.start + datetime.timedelta(days=365), current.duration, room, current.prof_id)
+        row = index.evaluate([change]).occupancy.iloc[0]
+
+        assert row["Occupancy Before"] == pytest.approx(admin.loc[exam_id, "Occupancy"], nan_ok=True)
+        seats = index.seats[index._position[exam_id]]
+        _, used, _ = allocate(
+            np.array([0]), np.array([current.duration]), np.array([seats], dtype=np.int64),
+            np.array([[r["id"] for r in rooms].index(room)]), capacities,
+        )
+        assert row["Occupancy After"] == pytest.approx(seats / capacities[used].sum())
@@ -0,0 +1,115 @@
+import pandas as pd
+
+from schema import compact, concat
+
+# Collections the master timetable is joined from
+SOURCES = ("exam_schedule", "modules", "formations", "departments", "rooms", "professors")
+
+# Column layout every page sees, whatever it displays
+COLUMNS = [
+    "exam_id", "module_id", "formation_id", "dept_id", "salle_id", "prof_id",
+    "Department", "Formation", "Module", "Professor", "Room", "Capacity",
+    "Start", "End", "Date", "Time", "Duration",
+]
+
+
+def _frame(snapshot, name, columns):
+    return pd.DataFrame(snapshot.get(name), columns=columns)
+
+
+def _lookup(table, keys, columns):
+    """``table`` rows matching each id in ``keys``, aligned with ``keys`` (NaN when missing).
+
+    ``table`` is indexed by its ``id`` once, so every join is a single
+    positional take instead of a hash merge.
+    """
+    rows = table.set_index("id")[columns].reindex(pd.Index(keys))
+    return rows.reset_index(drop=True)
+
+
+def build_master_timetable(snapshot, exams=None):
+    """Join ``exams`` (every exam of the snapshot by default) with the other sources."""
+    snapshot.prefetch(SOURCES)
+    records = snapshot.get("exam_schedule") if exams is None else exams
+    exams = pd.DataFrame(records, columns=["id", "module_id", "prof_id", "salle_id", "date_heure", "duree_minutes"])
+    # Numeric even when empty or all missing, so any selection of exams joins to the same dtypes
+    for column in ["id", "module_id", "prof_id", "salle_id", "duree_minutes"]:
+        exams[column] = pd.to_numeric(exams[column])
+    modules = _frame(snapshot, "modules", ["id", "nom", "formation_id"])
+    formations = _frame(snapshot, "formations", ["id", "nom", "dept_id"])
+    departments = _frame(snapshot, "departments", ["id", "nom"])
+    rooms = _frame(snapshot, "rooms", ["id", "nom", "capacite"])
+    professors = _frame(snapshot, "professors", ["id", "nom"])
+
+    # exams -> modules -> formations -> departments (an exam without them is dropped)
+    module = _lookup(modules, exams["module_id"], ["nom", "formation_id"])
+    formation = _lookup(formations, module["formation_id"], ["nom", "dept_id"])
+    department = _lookup(departments, formation["dept_id"], ["nom"])
+    # rooms and professors are optional
+    room = _lookup(rooms, exams["salle_id"], ["nom", "capacite"])
+    professor = _lookup(professors, exams["prof_id"], ["nom"])
+
+    start = pd.to_datetime(exams["date_heure"]).astype("datetime64[us]")
+    duration = exams["duree_minutes"]
+
+    master = pd.DataFrame({
+        "exam_id": exams["id"],
+        "module_id": exams["module_id"],
+        "formation_id": module["formation_id"],
+        "dept_id": formation["dept_id"],
+        "salle_id": exams["salle_id"],
+        "prof_id": exams["prof_id"],
+        "Department": department["nom"],
+        "Formation": formation["nom"],
+        "Module": module["nom"],
+        "Professor": professor["nom"],
+        "Room": room["nom"],
+        "Capacity": room["capacite"],
+        "Start": start,
+        "End": start + pd.to_timedelta(duration, unit="m"),
+        "Date": start.dt.date,
+        "Time": start.dt.time,
+        "Duration": duration,
+    })
+
+    master = master[master["Module"].notna() & master["Formation"].notna() & master["Department"].notna()]
+    # Kept in chronological order so pages rarely need to sort it again; ties
+    # by exam id so a patched timetable comes out in the same order
+    master = master.sort_values(["Start", "exam_id"]).reset_index(drop=True)
+    return compact(master)
+
+
+def patch_master_timetable(master, snapshot, delta):
+    """``master`` with only the changed exams dropped, re-joined and merged back.
+
+    Changes to the collections exams are joined with need a full rebuild.
+    """
+    if delta.collections != {"exam_schedule"}:
+        return None
+    kept = master[~master["exam_id"].isin(list(delta.ids("exam_schedule")))]
+    items = delta.items("exam_schedule")
+    if items:
+        added = build_master_timetable(snapshot, exams=items)
+        kept = concat([kept, added]).sort_values(["Start", "exam_id"])
+    # Compacted again: once the last exam without a room is dropped, its columns are whole numbers again
+    return compact(kept.reset_index(drop=True))
+
+
+def master_timetable(snapshot):
+    """Exams enriched with module, formation, department, room and professor.
+
+    Built once per snapshot and shared by every session and rerun. The
+    frame is shared too: pages must treat it as read-only and work on
+    selections of it.
+    """
+    return snapshot.derived("master_timetable", build_master_timetable, patch_master_timetable).copy(deep=False)
+
+
+def build_formation_sizes(snapshot):
+    # /etudiants is ingested as a columnar frame already
+    return snapshot.get("students").groupby("formation_id").size()
+
+
+def formation_sizes(snapshot):
+    """Number of students enrolled in each formation, indexed by formation id."""
+    return snapshot.derived("formation_sizes", build_formation_sizes)
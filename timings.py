@@ -0,0 +1,245 @@
+"""Timing spans for the hot path of a page rerun.
+
+    with timings.span("filter", "schedule") as s:
+        frame = index.filter(...)
+        s.rows = len(frame)
+
+Phases used across the app:
+
+- fetch: HTTP request to the backend, up to the response headers
+- decode: reading and decoding a response body
+- join: anything built from the collections and memoized on the snapshot
+  (joined timetable, indexes, aggregates)
+- filter: narrowing a frame down to what a session asked for
+- render: handing a frame to streamlit (Arrow serialization included)
+
+Spans are only measured while the sidebar "Timings" panel is on for the
+session, or when an exporter is configured:
+
+    EXAM_SCHEDULER_METRICS_PORT=9464          Prometheus text on /metrics
+    EXAM_SCHEDULER_METRICS_FILE=spans.jsonl   one JSON line per span
+
+Otherwise ``span`` returns straight away without reading the clock.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PHASES = ("fetch", "decode", "join", "filter", "render")
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC = "exam_scheduler_span_seconds"
+
+# Spans of the rerun running in this context, None when not collecting
+_trace = contextvars.ContextVar("timings_trace", default=None)
+
+
+class Span:
+    __slots__ = ("phase", "name", "rows", "start", "seconds")
+
+    def __init__(self, phase, name, rows=None):
+        self.phase = phase
+        self.name = name
+        self.rows = rows
+        self.start = time.perf_counter()
+        self.seconds = None
+
+
+class _NullSpan:
+    """Stand-in yielded when nothing is collecting; attribute writes are dropped."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Trace:
+    """Spans recorded during one rerun of one session."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def add(self, span):
+        # list.append is atomic, fetch threads may add concurrently
+        self.spans.append(span)
+
+    def rows(self):
+        """``(phase, name, rows, start ms, ms)`` per span, in start order."""
+        return [
+            (s.phase, s.name, s.rows, round((s.start - self.start) * 1000, 2), round(s.seconds * 1000, 2))
+            for s in sorted(self.spans, key=lambda s: s.start)
+        ]
+
+
+class Histograms:
+    """Cumulative per ``(phase, name)`` latency histograms and row totals."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase, name, seconds, rows=None):
+        with self._lock:
+            series = self._series.get((phase, name))
+            if series is None:
+                series = self._series[(phase, name)] = {
+                    "counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0, "rows": 0,
+                }
+            series["counts"][bisect_left(self.buckets, seconds)] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+            series["rows"] += rows or 0
+
+    def snapshot(self):
+        """``{(phase, name): {"counts", "sum", "count", "rows"}}``, copied."""
+        with self._lock:
+            return {key: dict(series, counts=list(series["counts"])) for key, series in self._series.items()}
+
+    def prometheus(self):
+        """The histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {METRIC} Time spent in each hot-path phase of a page rerun.",
+            f"# TYPE {METRIC} histogram",
+        ]
+        rows = [
+            "# HELP exam_scheduler_span_rows_total Rows produced by each span.",
+            "# TYPE exam_scheduler_span_rows_total counter",
+        ]
+        for (phase, name), series in sorted(self.snapshot().items()):
+            labels = f'phase="{phase}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{METRIC}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{METRIC}_sum{{{labels}}} {series['sum']:.6f}")
+            lines.append(f"{METRIC}_count{{{labels}}} {series['count']}")
+            rows.append(f"exam_scheduler_span_rows_total{{{labels}}} {series['rows']}")
+        return "\n".join(lines + rows) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ---------------- EXPORT ----------------
+histograms = Histograms()
+_exporting = False
+_jsonl = None
+_jsonl_lock = threading.Lock()
+
+
+def _export(span):
+    histograms.observe(span.phase, span.name, span.seconds, span.rows)
+    if _jsonl is not None:
+        line = json.dumps({
+            "ts": round(time.time(), 3), "phase": span.phase, "name": span.name,
+            "rows": span.rows, "seconds": round(span.seconds, 6),
+        })
+        with _jsonl_lock:
+            _jsonl.write(line + "\n")
+            _jsonl.flush()
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve ``histograms`` as Prometheus text on ``/metrics`` from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = histograms.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def configure(port=None, path=None):
+    """Record every span into ``histograms``, exposed on ``port`` and/or appended to ``path``."""
+    global _exporting, _jsonl
+    if port:
+        serve_metrics(int(port))
+    if path:
+        _jsonl = open(path, "a", encoding="utf-8")
+    _exporting = bool(port or path)
+
+
+# ---------------- SPANS ----------------
+@contextmanager
+def span(phase, name="", rows=None):
+    """Time the enclosed block; set ``.rows`` on the yielded span to attach a row count."""
+    trace = _trace.get()
+    if trace is None and not _exporting:
+        yield _NULL
+        return
+    record = Span(phase, name, rows)
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - record.start
+        if trace is not None:
+            trace.add(record)
+        if _exporting:
+            _export(record)
+
+
+def bind(fn):
+    """``fn`` run in a copy of the caller's context, so spans it records in a
+    worker thread join the caller's trace."""
+    return partial(contextvars.copy_context().run, fn)
+
+
+# ---------------- SIDEBAR PANEL ----------------
+def start_rerun():
+    """Start collecting this rerun's spans if the session turned the panel on.
+
+    Call it right after ``st.set_page_config`` and pair it with
+    ``show_panel()`` at the end of the page.
+    """
+    import streamlit as st
+
+    enabled = st.sidebar.toggle("⏱️ Timings", key="timings_panel", help="Time the fetch, join, filter and render phases of each rerun")
+    _trace.set(Trace() if enabled else None)
+
+
+def show_panel():
+    """Show the spans collected since ``start_rerun`` in the sidebar, and stop collecting."""
+    trace = _trace.get()
+    _trace.set(None)
+    if trace is None:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    total = (time.perf_counter() - trace.start) * 1000
+    with st.sidebar.expander(f"Rerun: {total:.0f} ms", expanded=True):
+        if not trace.spans:
+            st.caption("Nothing measured: every collection and derived frame was already cached.")
+            return
+        frame = pd.DataFrame(trace.rows(), columns=["Phase", "Span", "Rows", "Start (ms)", "ms"])
+        st.dataframe(frame, hide_index=True, use_container_width=True)
+        st.caption("Spans can nest (a derived frame fetches what it needs), so phases do not add up to the total.")
+
+
+configure(os.environ.get("EXAM_SCHEDULER_METRICS_PORT"), os.environ.get("EXAM_SCHEDULER_METRICS_FILE"))
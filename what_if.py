@@ -0,0 +1,339 @@
+"""What-if edits of the exam timetable, scored as they are typed.
+
+Each formation, professor and room has a timeline of its exams sorted by
+start. Moving, retiming or reassigning an exam only asks the timelines it
+leaves and joins which exams overlap it, before and after the change, so
+a change set is scored in milliseconds whatever the size of the timetable.
+
+Occupancy is over every room an exam is seated in, as on Exam Admin: an
+unchanged exam keeps its seat allocation, a changed one is re-seated the
+way ``seating.allocate`` would, around the rooms other exams hold then.
+"""
+import bisect
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from conflicts import GROUPINGS
+from seating import exam_seating, seat_allocation
+from timetable import formation_sizes, master_timetable
+
+
+def _minutes(values):
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+@dataclass(frozen=True)
+class Change:
+    """One exam moved, retimed or reassigned: its full new placement."""
+    exam_id: int
+    start: datetime.datetime
+    duration: int
+    salle_id: int
+    prof_id: int
+
+    @property
+    def end(self):
+        return self.start + datetime.timedelta(minutes=self.duration)
+
+
+class Timeline:
+    """The exams of one formation, professor or room, sorted by start (minutes)."""
+
+    def __init__(self, starts, ends, exam_ids):
+        self.starts = starts
+        self.ends = ends
+        self.exam_ids = exam_ids
+        self.max_length = int((ends - starts).max()) if len(starts) else 0
+
+    def overlapping(self, start, end):
+        """Ids of the exams overlapping ``[start, end)``, by binary search.
+
+        No exam lasts longer than ``max_length``, so only those starting in
+        ``(start - max_length, end)`` can overlap.
+        """
+        lo = np.searchsorted(self.starts, start - self.max_length, side="right")
+        hi = np.searchsorted(self.starts, end, side="left")
+        return self.exam_ids[lo + np.flatnonzero(self.ends[lo:hi] > start)]
+
+
+class TimelineIndex:
+    """Per-formation, per-professor and per-room timelines of one timetable.
+
+    A what-if change set only ever looks at the timelines the changed exams
+    leave or join, so scoring it does not depend on the timetable size.
+    """
+
+    def __init__(self, master, sizes, rooms, professors, allocation, seating):
+        self.exam_ids = master["exam_id"].to_numpy()
+        self._position = {exam_id: pos for pos, exam_id in enumerate(self.exam_ids.tolist())}
+        self.starts = _minutes(master["Start"].to_numpy())
+        self.ends = _minutes(master["End"].to_numpy())
+        self.durations = master["Duration"].to_numpy()
+        self.module_ids = master["module_id"].to_numpy()
+        self.modules = master["Module"].astype(str).to_numpy()
+        self.formations = master["Formation"].astype(str).to_numpy()
+        self.keys = {kind: master[key].to_numpy(dtype="float64") for kind, (key, _) in GROUPINGS.items()}
+        self.seats = master["formation_id"].map(sizes).fillna(0).to_numpy()
+
+        self.room_names = {r["id"]: r["nom"] for r in rooms}
+        self.professor_names = {p["id"]: p["nom"] for p in professors}
+        self.names = {
+            "Formation": dict(zip(master["formation_id"].tolist(), self.formations.tolist())),
+            "Professor": self.professor_names,
+            "Room": self.room_names,
+        }
+
+        # The master timetable is sorted by start, so each group's positions are too
+        self.timelines = {}
+        for kind, (key, _) in GROUPINGS.items():
+            groups = master.groupby(key, observed=True).indices
+            self.timelines[kind] = {
+                int(group): Timeline(self.starts[rows], self.ends[rows], self.exam_ids[rows])
+                for group, rows in groups.items()
+            }
+        self.hours = pd.Series(self.durations / 60).groupby(self.keys["Professor"]).sum().to_dict()
+        self.room_minutes = pd.Series(self.durations).groupby(self.keys["Room"]).sum().to_dict()
+
+        # Seats: every room of the allocation as one timeline of (exam, room) rows
+        self.seat_capacity = seating["Seat_Capacity"].to_dict()
+        self._room_ids = [r["id"] for r in rooms]
+        self._room_position = {room: pos for pos, room in enumerate(self._room_ids)}
+        self._room_capacity = pd.Series([r["capacite"] for r in rooms], dtype="float64").fillna(0).to_numpy(np.int64)
+        held_starts = _minutes(allocation["Start"].to_numpy())
+        held = np.argsort(held_starts, kind="stable")
+        self.held = Timeline(held_starts[held], _minutes(allocation["End"].to_numpy())[held], held)
+        self._held_exam = allocation["exam_id"].to_numpy()
+        self._held_room = pd.Index(self._room_ids).get_indexer(allocation["salle_id"])
+
+    def __contains__(self, exam_id):
+        return exam_id in self._position
+
+    def exams_of(self, kind, key):
+        """Exam ids on the ``kind`` timeline of ``key`` (e.g. one formation), in start order."""
+        timeline = self.timelines[kind].get(key)
+        return [] if timeline is None else timeline.exam_ids.tolist()
+
+    def label(self, exam_id):
+        pos = self._position[exam_id]
+        return f"{self.modules[pos]} ({self.formations[pos]})"
+
+    def current(self, exam_id, changes=()):
+        """``Change`` describing where ``exam_id`` stands once ``changes`` are applied."""
+        for change in reversed(changes):
+            if change.exam_id == exam_id:
+                return change
+        pos = self._position[exam_id]
+        room, prof = self.keys["Room"][pos], self.keys["Professor"][pos]
+        return Change(
+            exam_id=exam_id,
+            start=pd.Timestamp(self.starts[pos] * 60, unit="s").to_pydatetime(),
+            duration=int(self.durations[pos]),
+            salle_id=None if np.isnan(room) else int(room),
+            prof_id=None if np.isnan(prof) else int(prof),
+        )
+
+    def seats_offered(self, exam_id, state):
+        """Seat capacity of the rooms ``exam_id`` is seated in where ``state`` puts it.
+
+        An exam left where it was published keeps its seat allocation.
+        Otherwise its booked room comes first (when free), then the smallest
+        free room holding the rest of its students, or else the largest, as
+        in ``seating.allocate``. Rooms the allocation gives other exams at
+        that time, and rooms other changed exams are booked in, are not free.
+        """
+        placement = self._placement(exam_id, state)
+        if placement == self._placement(exam_id, {}):
+            return self.seat_capacity.get(exam_id, 0)
+        start, end, keys = placement
+        rows = self.held.overlapping(start, end)
+        busy = set(self._held_room[rows[~np.isin(self._held_exam[rows], list(state))]].tolist())
+        for other, (o_start, o_end, o_keys) in state.items():
+            if other != exam_id and o_start < end and o_end > start and o_keys["Room"] in self._room_position:
+                busy.add(self._room_position[o_keys["Room"]])
+
+        remaining, offered = self.seats[self._position[exam_id]], 0
+        booked = self._room_position.get(keys["Room"])
+        if booked is not None and booked not in busy and self._room_capacity[booked] > 0:
+            busy.add(booked)
+            offered += self._room_capacity[booked]
+            remaining -= self._room_capacity[booked]
+        free = [pos for pos in np.argsort(self._room_capacity, kind="stable").tolist()
+                if pos not in busy and self._room_capacity[pos] > 0]
+        caps = self._room_capacity[free].tolist()
+        while remaining > 0 and caps:
+            i = min(bisect.bisect_left(caps, remaining), len(caps) - 1)
+            cap = caps.pop(i)
+            offered += cap
+            remaining -= cap
+        return int(offered)
+
+    # ---------------- DELTA EVALUATION ----------------
+    def _state(self, changes):
+        """``{exam_id: (start, end, {kind: key})}`` of the exams ``changes`` touch (last change wins)."""
+        state = {}
+        for change in changes:
+            pos = self._position[change.exam_id]
+            start = int(_minutes(np.datetime64(change.start)))
+            state[change.exam_id] = (start, start + change.duration, {
+                "Formation": int(self.keys["Formation"][pos]),
+                "Professor": change.prof_id,
+                "Room": change.salle_id,
+            })
+        return state
+
+    def _placement(self, exam_id, state):
+        if exam_id in state:
+            return state[exam_id]
+        pos = self._position[exam_id]
+        keys = {kind: None if np.isnan(keys[pos]) else int(keys[pos]) for kind, keys in self.keys.items()}
+        return int(self.starts[pos]), int(self.ends[pos]), keys
+
+    def conflicts(self, exam_ids, state):
+        """``{(kind, key, exam_a, exam_b): overlap minutes}`` involving ``exam_ids`` in ``state``."""
+        found = {}
+        for exam_id in exam_ids:
+            start, end, keys = self._placement(exam_id, state)
+            for kind, key in keys.items():
+                if key is None:
+                    continue
+                others = []
+                timeline = self.timelines[kind].get(key)
+                if timeline is not None:
+                    # Exams changed in ``state`` are no longer where the timeline has them
+                    others = [other for other in timeline.overlapping(start, end).tolist() if other not in state]
+                for other, (o_start, o_end, o_keys) in state.items():
+                    if o_keys[kind] == key and o_start < end and o_end > start:
+                        others.append(other)
+                for other in others:
+                    if other == exam_id:
+                        continue
+                    o_start, o_end, _ = self._placement(other, state)
+                    pair = (kind, key) + tuple(sorted((exam_id, other)))
+                    found[pair] = min(end, o_end) - max(start, o_start)
+        return found
+
+    def _loads(self, state, professors, rooms):
+        """Professor hours and room minutes of ``professors`` / ``rooms`` in ``state``."""
+        hours = {prof: self.hours.get(prof, 0.0) for prof in professors}
+        minutes = {room: self.room_minutes.get(room, 0) for room in rooms}
+        for exam_id, (start, end, keys) in state.items():
+            pos = self._position[exam_id]
+            before = self._placement(exam_id, {})[2]
+            if before["Professor"] in hours:
+                hours[before["Professor"]] -= self.durations[pos] / 60
+            if keys["Professor"] in hours:
+                hours[keys["Professor"]] += (end - start) / 60
+            if before["Room"] in minutes:
+                minutes[before["Room"]] -= self.durations[pos]
+            if keys["Room"] in minutes:
+                minutes[keys["Room"]] += end - start
+        return hours, minutes
+
+    def evaluate(self, changes, baseline=()):
+        """What ``changes`` do compared to ``baseline`` (both lists of ``Change``)."""
+        after, before = self._state(changes), self._state(baseline)
+        exams = set(after) | set(before)
+        conflicts_after = self.conflicts(exams, after)
+        conflicts_before = self.conflicts(exams, before)
+
+        professors, rooms = set(), set()
+        for exam_id in exams:
+            for state in (after, before, {}):
+                keys = self._placement(exam_id, state)[2]
+                professors.add(keys["Professor"])
+                rooms.add(keys["Room"])
+        professors.discard(None)
+        rooms.discard(None)
+        hours_after, minutes_after = self._loads(after, professors, rooms)
+        hours_before, minutes_before = self._loads(before, professors, rooms)
+
+        return Impact(
+            new=self._conflict_frame(set(conflicts_after) - set(conflicts_before), conflicts_after),
+            resolved=self._conflict_frame(set(conflicts_before) - set(conflicts_after), conflicts_before),
+            occupancy=self._occupancy_frame(exams, before, after),
+            hours=pd.DataFrame([
+                {"Professor": self.professor_names.get(prof, prof), "Before (h)": round(hours_before[prof], 2),
+                 "After (h)": round(hours_after[prof], 2), "Change (h)": round(hours_after[prof] - hours_before[prof], 2)}
+                for prof in sorted(professors) if hours_after[prof] != hours_before[prof]
+            ], columns=["Professor", "Before (h)", "After (h)", "Change (h)"]),
+            rooms=pd.DataFrame([
+                {"Room": self.room_names.get(room, room), "Before (min)": int(minutes_before[room]),
+                 "After (min)": int(minutes_after[room]), "Change (min)": int(minutes_after[room] - minutes_before[room])}
+                for room in sorted(rooms) if minutes_after[room] != minutes_before[room]
+            ], columns=["Room", "Before (min)", "After (min)", "Change (min)"]),
+        )
+
+    def _conflict_frame(self, pairs, overlaps):
+        rows = []
+        for pair in sorted(pairs):
+            kind, key, a, b = pair
+            rows.append({
+                "Type": kind,
+                "Resource": self.names[kind].get(key, key),
+                "Exam": self.label(a),
+                "Other Exam": self.label(b),
+                "Overlap (min)": overlaps[pair],
+            })
+        return pd.DataFrame(rows, columns=["Type", "Resource", "Exam", "Other Exam", "Overlap (min)"])
+
+    def _occupancy_frame(self, exams, before, after):
+        rows = []
+        for exam_id in sorted(exams):
+            seats = self.seats[self._position[exam_id]]
+            old, new = self._placement(exam_id, before)[2]["Room"], self._placement(exam_id, after)[2]["Room"]
+            offered_before, offered_after = self.seats_offered(exam_id, before), self.seats_offered(exam_id, after)
+            if old == new and offered_before == offered_after:
+                continue
+            rows.append({
+                "Exam": self.label(exam_id),
+                "Room Before": self.room_names.get(old),
+                "Room After": self.room_names.get(new),
+                # Over every room seated, as on Exam Admin; unknown without a seat
+                "Occupancy Before": seats / offered_before if offered_before else None,
+                "Occupancy After": seats / offered_after if offered_after else None,
+            })
+        return pd.DataFrame(rows, columns=["Exam", "Room Before", "Room After", "Occupancy Before", "Occupancy After"])
+
+    def export(self, changes):
+        """The changed exams in the backend's ``/examens`` shape, one per exam."""
+        latest = {}
+        for change in changes:
+            latest[change.exam_id] = change
+        return [
+            {
+                "id": int(change.exam_id),
+                "module_id": int(self.module_ids[self._position[change.exam_id]]),
+                "prof_id": change.prof_id,
+                "salle_id": change.salle_id,
+                "date_heure": change.start.isoformat(),
+                "duree_minutes": int(change.duration),
+            }
+            for change in latest.values()
+        ]
+
+
+@dataclass
+class Impact:
+    # Conflicts the changes create / remove
+    new: pd.DataFrame
+    resolved: pd.DataFrame
+    # Exams whose room changed, with their occupancy in each room
+    occupancy: pd.DataFrame
+    # Supervision hours of professors whose load changed
+    hours: pd.DataFrame
+    # Busy minutes of rooms whose usage changed
+    rooms: pd.DataFrame
+
+
+def timeline_index(snapshot):
+    """The ``TimelineIndex`` of ``snapshot``'s timetable, built once per version."""
+    return snapshot.derived(
+        "timeline_index",
+        lambda snap: TimelineIndex(
+            master_timetable(snap), formation_sizes(snap), snap.get("rooms"), snap.get("professors"),
+            seat_allocation(snap), exam_seating(snap),
+        ),
+    )